@@ -0,0 +1 @@
+"""Offline benchmarks for Shibako Bot (no Discord or network access needed)."""
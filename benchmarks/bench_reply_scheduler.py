@@ -0,0 +1,68 @@
+"""
+Compares the old blocking trigger replies (time.sleep on the loop) with ReplyScheduler.
+
+Runs offline with fake channels. Usage:
+    python -m benchmarks.bench_reply_scheduler [--triggers N] [--channels N] [--delay SECONDS]
+"""
+import argparse
+import asyncio
+import time
+
+from utils.reply_scheduler import ReplyScheduler
+
+
+class FakeChannel:
+    """Stands in for a discord channel; records what would have been sent."""
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+
+async def run_blocking(channels, triggers, delay):
+    """The old behaviour: every trigger sleeps on the loop before replying."""
+    start = time.perf_counter()
+    for i in range(triggers):
+        time.sleep(delay)
+        await channels[i % len(channels)].send(f"reply {i}")
+    return time.perf_counter() - start
+
+
+async def run_scheduled(channels, triggers, delay):
+    """The new behaviour: replies are queued per channel and sent by worker tasks."""
+    scheduler = ReplyScheduler(default_delay=delay)
+    start = time.perf_counter()
+    for i in range(triggers):
+        scheduler.schedule(channels[i % len(channels)], f"reply {i}")
+    while scheduler.pending() or scheduler._workers:
+        await asyncio.sleep(delay / 10)
+    elapsed = time.perf_counter() - start
+    await scheduler.close()
+
+    # Replies must still arrive in order within each channel
+    for channel in channels:
+        numbers = [int(content.split()[1]) for content in channel.sent]
+        assert numbers == sorted(numbers), f"out of order replies in channel {channel.id}"
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--triggers", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.01, help="pause per reply (the bot uses 1.0)")
+    args = parser.parse_args()
+
+    blocking_time = await run_blocking([FakeChannel(i) for i in range(args.channels)], args.triggers, args.delay)
+    scheduled_time = await run_scheduled([FakeChannel(i) for i in range(args.channels)], args.triggers, args.delay)
+
+    print(f"{args.triggers} triggers over {args.channels} channels, {args.delay * 1000:.0f} ms pause")
+    print(f"  blocking sleep : {blocking_time:.3f}s ({args.triggers / blocking_time:.0f} replies/s)")
+    print(f"  ReplyScheduler : {scheduled_time:.3f}s ({args.triggers / scheduled_time:.0f} replies/s)")
+    print(f"  speedup        : {blocking_time / scheduled_time:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
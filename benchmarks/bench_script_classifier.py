@@ -0,0 +1,98 @@
+"""
+Language routing: utils.script_classifier vs the old emoji.demojize(text).isascii() check.
+
+Scores both against the labeled corpus in benchmarks/data/script_corpus.jsonl
+(`source_lang` is the DeepL source a person would pick, null for "let
+DeepL detect it"; `route` lists the expected (source, target) per segment
+for mixed-language messages, empty when no DeepL call is needed), then
+times both on English, Japanese and mixed messages of several lengths.
+Usage:
+    python -m benchmarks.bench_script_classifier [--iterations N]
+"""
+import argparse
+import json
+import os
+import time
+
+import emoji
+
+from utils.script_classifier import classify, route, translation_direction
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "script_corpus.jsonl")
+SAMPLES = {
+    "english": "I'll be there around seven… let's grab a café latte first! 😀 ",
+    "japanese": "今日は良い天気ですね。日本語の勉強は楽しいですが、漢字を覚えるのは大変です！😀 ",
+    "mixed": "今日はiPhoneを買った。 Tomorrow I'll try the camera out. ",
+}
+
+
+def load_corpus(path=CORPUS_FILE):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def old_source_lang(text):
+    """The check both translation paths used before the classifier."""
+    return "EN" if emoji.demojize(text).isascii() else "JA"
+
+
+def new_source_lang(text):
+    profile = classify(text)
+    return translation_direction(profile.language, profile.confidence)[0]
+
+
+def score(corpus):
+    """Returns (old correct, new correct, labeled count, route correct, route count, misses)."""
+    old_correct = new_correct = labeled = route_correct = routed = 0
+    misses = []
+    for row in corpus:
+        text = row["text"]
+        if "source_lang" in row:
+            labeled += 1
+            old_correct += old_source_lang(text) == row["source_lang"]
+            new = new_source_lang(text)
+            new_correct += new == row["source_lang"]
+            if new != row["source_lang"]:
+                misses.append((text, row["source_lang"], new))
+        if "route" in row:
+            routed += 1
+            plan = [[source, target] for _, source, target in route(text)]
+            route_correct += plan == row["route"]
+            if plan != row["route"]:
+                misses.append((text, row["route"], plan))
+    return old_correct, new_correct, labeled, route_correct, routed, misses
+
+
+def us_per_call(func, text, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(text)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    old_correct, new_correct, labeled, route_correct, routed, misses = score(corpus)
+    print(f"Accuracy on {labeled} labeled messages: demojize+isascii {old_correct}/{labeled}, classifier {new_correct}/{labeled}")
+    print(f"Mixed-language routing: {route_correct}/{routed} segment plans as labeled")
+    for text, expected, got in misses:
+        print(f"  miss: {text!r} expected {expected}, got {got}")
+
+    print()
+    print("Microseconds per message (old demojize+isascii / classify / route):")
+    for name, sample in SAMPLES.items():
+        for length in (16, 200, 2000):
+            text = (sample * (length // len(sample) + 1))[:length]
+            iterations = max(50, args.iterations * 16 // length)
+            old = us_per_call(old_source_lang, text, iterations)
+            new = us_per_call(classify, text, iterations)
+            routed_us = us_per_call(route, text, iterations)
+            print(f"  {name:<8} {length:>5} chars: {old:>9.1f} / {new:>8.1f} / {routed_us:>8.1f}  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Microbenchmark for TriggerMatcher.
+
+Shows that matching time depends on message length, not on how many
+triggers exist, and compares it with a naive "check every trigger" loop.
+Usage:
+    python -m benchmarks.bench_trigger_matcher [--messages N]
+"""
+import argparse
+import random
+import string
+import time
+
+from utils.trigger_matcher import TriggerMatcher, normalize_message
+
+
+def make_triggers(count, rng):
+    """Synthetic two/three word triggers, split across the three match modes."""
+    triggers = []
+    for i in range(count):
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))) for _ in range(rng.randint(2, 3))]
+        triggers.append((" ".join(words), ("exact", "prefix", "contains")[i % 3]))
+    return triggers
+
+
+def make_messages(count, length, triggers, rng):
+    """Random chat lines of roughly `length` characters; a few contain a trigger."""
+    messages = []
+    for i in range(count):
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))))
+        if i % 10 == 0:
+            words.insert(rng.randint(0, len(words)), rng.choice(triggers)[0])
+        messages.append(" ".join(words))
+    return messages
+
+
+def build_matcher(triggers):
+    matcher = TriggerMatcher()
+    for index, (trigger, mode) in enumerate(triggers):
+        matcher.add(trigger, {"name": f"phrase_{index}"}, mode)
+    matcher.compile()
+    return matcher
+
+
+def naive_match(triggers, message):
+    """What substring matching would cost without an index: O(triggers x length)."""
+    text = normalize_message(message)
+    for trigger, mode in triggers:
+        if mode == "exact" and text == trigger:
+            return trigger
+        if mode == "prefix" and text.startswith(trigger):
+            return trigger
+        if mode == "contains" and trigger in text:
+            return trigger
+    return None
+
+
+def time_per_message(func, messages):
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    return (time.perf_counter() - start) / len(messages) * 1e6 # microseconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(1234)
+
+    print("Trigger count scaling (80-char messages), microseconds per message:")
+    print(f"{'triggers':>10} {'build s':>9} {'matcher':>9} {'naive':>9}")
+    for trigger_count in (100, 1000, 10000, 100000):
+        triggers = make_triggers(trigger_count, rng)
+        messages = make_messages(args.messages, 80, triggers, rng)
+        start = time.perf_counter()
+        matcher = build_matcher(triggers)
+        build_time = time.perf_counter() - start
+        matcher_us = time_per_message(matcher.match, messages)
+        # The naive loop gets slow quickly; sample fewer messages for large trigger sets
+        naive_sample = messages[: max(20, args.messages * 100 // trigger_count)]
+        naive_us = time_per_message(lambda message: naive_match(triggers, message), naive_sample)
+        print(f"{trigger_count:>10} {build_time:>9.2f} {matcher_us:>9.1f} {naive_us:>9.1f}")
+
+    print()
+    print("Message length scaling (10k triggers), microseconds per message:")
+    triggers = make_triggers(10000, rng)
+    matcher = build_matcher(triggers)
+    for length in (20, 80, 320, 1280):
+        messages = make_messages(args.messages // 4, length, triggers, rng)
+        print(f"{length:>6} chars: {time_per_message(matcher.match, messages):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Local stand-in for the DeepL API, for load tests and offline runs.
+
+Serves POST /v2/translate (form-encoded, repeated `text` fields, like
+DeepLClient sends) and GET /v2/usage. Latency, 429 (too many requests) and
+456 (quota exceeded) responses are configurable. "Translations" are the
+input prefixed with the target language, so responses are easy to check.
+Usage:
+    python -m benchmarks.fake_deepl [--port 8765] [--latency 0.1] [--rate-429 0.05] [--rate-456 0]
+"""
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+
+class FakeDeepL:
+    """Configurable fake DeepL server; counts everything it was asked to do."""
+    def __init__(self, latency=0.1, jitter=0.0, rate_429=0.0, rate_456=0.0, retry_after=1, character_limit=500000, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_456 = rate_456
+        self.retry_after = retry_after
+        self.character_limit = character_limit
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.texts = 0
+        self.characters = 0
+        self.responses = {} # HTTP status -> count
+        self._runner = None
+        self.url = None
+
+    def _count(self, status):
+        self.responses[status] = self.responses.get(status, 0) + 1
+
+    async def translate(self, request):
+        self.requests += 1
+        if not request.headers.get("Authorization", "").startswith("DeepL-Auth-Key "):
+            self._count(403)
+            return web.json_response({"message": "Wrong auth key"}, status=403)
+        form = await request.post()
+        texts = form.getall("text", [])
+        target_lang = form.get("target_lang")
+        if not texts or not target_lang:
+            self._count(400)
+            return web.json_response({"message": "Parameter 'text' and 'target_lang' are required"}, status=400)
+
+        await asyncio.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+        roll = self.random.random()
+        if roll < self.rate_429:
+            self._count(429)
+            return web.json_response({"message": "Too many requests"}, status=429, headers={"Retry-After": str(self.retry_after)})
+        if roll < self.rate_429 + self.rate_456:
+            self._count(456)
+            return web.json_response({"message": "Quota exceeded"}, status=456)
+
+        self.texts += len(texts)
+        self.characters += sum(len(text) for text in texts)
+        self._count(200)
+        source_lang = form.get("source_lang") or "EN"
+        return web.json_response({
+            "translations": [{"detected_source_language": source_lang, "text": f"[{target_lang}] {text}"} for text in texts]
+        })
+
+    async def usage(self, request):
+        return web.json_response({"character_count": self.characters, "character_limit": self.character_limit})
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Starts serving; port 0 picks a free port. Returns the translate URL."""
+        app = web.Application()
+        app.router.add_post("/v2/translate", self.translate)
+        app.router.add_get("/v2/usage", self.usage)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}/v2/translate"
+        return self.url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def stats(self):
+        return {"requests": self.requests, "texts": self.texts, "characters": self.characters, "responses": dict(self.responses)}
+
+
+async def _serve(args):
+    server = FakeDeepL(latency=args.latency, jitter=args.jitter, rate_429=args.rate_429, rate_456=args.rate_456)
+    url = await server.start(port=args.port)
+    print(f"Fake DeepL listening on {url} (set DEEPL_API_URL to this)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of random latency")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered 429 Too Many Requests")
+    parser.add_argument("--rate-456", type=float, default=0.0, help="share of requests answered 456 Quota Exceeded")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
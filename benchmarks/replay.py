@@ -0,0 +1,419 @@
+"""
+End-to-end load replay: pushes a message stream through the real bot, offline.
+
+Builds the bot with shibako_bot.create_bot() and loads every cog, then
+dispatches fake messages with bot.dispatch("message", ...), exactly like the
+gateway would, so bot.on_message, ListenerCog, command parsing, checks,
+caches and batching all run for real. Commands get a Context whose send()
+is captured instead of calling Discord; DeepL is a local FakeDeepL server.
+Reports throughput, response latency (p50/p99, per command and for
+triggers) and event loop lag while under load. Trigger latency includes
+ReplyScheduler's deliberate pause and is approximate: a triggered reply is
+credited to the oldest unanswered trigger message in its channel.
+
+Usage:
+    python -m benchmarks.replay [--messages 2000] [--rate 100] [--deepl-latency 0.15] [--rate-429 0.05]
+    python -m benchmarks.replay --record stream.jsonl --messages 5000   # save the synthetic stream
+    python -m benchmarks.replay --input stream.jsonl --speed 2           # replay a recorded stream
+
+A stream file has one JSON object per line: {"t": seconds, "channel": id,
+"guild": id, "author": id, "content": "..."}; "t" is optional (--rate is
+used instead).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+
+os.environ.setdefault("METRICS_PORT", "0")
+
+from discord.ext import commands
+
+import shibako_bot
+from utils.kakasi_loader import kakasi_loader
+from benchmarks.fake_deepl import FakeDeepL
+
+JAPANESE_TEXTS = [
+    "今日は良い天気ですね",
+    "日本語の勉強は楽しいです",
+    "漢字を覚えるのは大変です",
+    "柴犬の芝子は散歩が大好き",
+    "東京駅で友達に会いました",
+    "明日は雨が降るかもしれません",
+    "このラーメンはとても美味しい",
+    "週末に映画を見に行きましょう",
+]
+ENGLISH_TEXTS = [
+    "good morning everyone",
+    "where is the nearest station",
+    "I would like some coffee please",
+    "this dog is very cute",
+    "see you tomorrow",
+]
+CHATTER_WORDS = "lol ok yeah nice what when the game is today tonight ramen dog cat play again later".split()
+# Share of messages per kind in a synthetic stream
+MESSAGE_MIX = {"chatter": 60, "trigger": 15, "romaji": 8, "furigana": 5, "translate": 7, "full": 5}
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+# --- Fake Discord objects ---
+class FakeUser:
+    def __init__(self, user_id, bot=False):
+        self.id = user_id
+        self.bot = bot
+        self.name = f"user{user_id}"
+        self.mention = f"<@{user_id}>"
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.shard_id = 0
+        self.name = f"guild{guild_id}"
+
+
+class FakeSentMessage:
+    """What channel.send() returns; edits are captured too."""
+    _ids = itertools.count(10**12)
+
+    def __init__(self, channel, content):
+        self.id = next(self._ids)
+        self.channel = channel
+        self.content = content
+        self.edits = 0
+
+    async def edit(self, content=None, **kwargs):
+        self.edits += 1
+        if content is not None:
+            self.content = content
+            self.channel.harness.record(self.channel, content, source=None, edit=True)
+        return self
+
+    async def delete(self):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, channel_id, guild, harness):
+        self.id = channel_id
+        self.guild = guild
+        self.harness = harness
+
+    async def send(self, content=None, *, source=None, **kwargs):
+        if self.harness.send_latency:
+            await asyncio.sleep(self.harness.send_latency) # Discord's REST round trip
+        self.harness.record(self, content, source=source)
+        return FakeSentMessage(self, content)
+
+    async def fetch_message(self, message_id):
+        raise LookupError(f"Message {message_id} is not known to the replay harness")
+
+
+class FakeMessage:
+    _ids = itertools.count(10**9)
+
+    def __init__(self, content, author, channel, state):
+        self.id = next(self._ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.reference = None
+        self.attachments = []
+        self.mentions = []
+        self.embeds = []
+        self._state = state
+
+
+class ReplayContext(commands.Context):
+    """Context whose replies go to the harness instead of Discord."""
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, source=self.message, **kwargs)
+
+    async def reply(self, content=None, **kwargs):
+        return await self.send(content, **kwargs)
+
+
+class ReplayBot(shibako_bot.ShibakoBot):
+    async def get_context(self, origin, *, cls=ReplayContext):
+        return await super().get_context(origin, cls=cls)
+
+
+# --- Streams ---
+def synthetic_stream(count, trigger_phrases, rng, channels=20, guilds=4, authors=200, unique_ratio=0.3):
+    """A mix of chatter, trigger phrases and commands; some command texts repeat so caches get hits."""
+    kinds, weights = zip(*MESSAGE_MIX.items())
+    for index in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "chatter":
+            content = " ".join(rng.choices(CHATTER_WORDS, k=rng.randint(2, 10)))
+        elif kind == "trigger":
+            content = rng.choice(trigger_phrases)
+        else:
+            text = rng.choice(ENGLISH_TEXTS if kind == "translate" and rng.random() < 0.4 else JAPANESE_TEXTS)
+            if rng.random() < unique_ratio:
+                text = f"{text} {index}" # Forces a cache miss
+            content = f"!{kind} {text}"
+        channel = rng.randrange(channels)
+        yield {"channel": 1000 + channel, "guild": 100 + channel % guilds, "author": 5000 + rng.randrange(authors), "content": content}
+
+
+def read_stream(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# --- Harness ---
+class ReplayHarness:
+    def __init__(self, bot, send_latency=0.0):
+        self.bot = bot
+        self.send_latency = send_latency
+        self.bot_user = FakeUser(1, bot=True)
+        self.channels = {}
+        self.guilds = {}
+        self.users = {}
+        self.dispatched = {} # message id -> (dispatch time, kind)
+        self.responded = set()
+        self.latencies = {} # kind -> [seconds]
+        self.awaiting_trigger = {} # channel id -> deque of trigger message ids not yet answered
+        self.sends = []
+        self.edits = 0
+        self.last_send = time.perf_counter()
+        self.lag_samples = []
+
+    def _channel(self, channel_id, guild_id):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            guild = self.guilds.setdefault(guild_id, FakeGuild(guild_id))
+            channel = self.channels[channel_id] = FakeChannel(channel_id, guild, self)
+        return channel
+
+    def _user(self, user_id):
+        return self.users.setdefault(user_id, FakeUser(user_id))
+
+    def classify(self, content):
+        if content.startswith(self.bot.command_prefix):
+            return "!" + content[1:].split(" ", 1)[0]
+        if self.bot.trigger_matcher is not None and self.bot.trigger_matcher.match(content):
+            return "trigger"
+        return "chatter"
+
+    def dispatch(self, entry):
+        channel = self._channel(entry["channel"], entry.get("guild", 100))
+        message = FakeMessage(entry["content"], self._user(entry.get("author", 5000)), channel, self.bot._connection)
+        kind = self.classify(message.content)
+        self.dispatched[message.id] = (time.perf_counter(), kind)
+        if kind == "trigger":
+            self.awaiting_trigger.setdefault(channel.id, deque()).append(message.id)
+        self.bot.dispatch("message", message)
+
+    def record(self, channel, content, source=None, edit=False):
+        now = time.perf_counter()
+        self.last_send = now
+        if edit:
+            self.edits += 1
+            return
+        self.sends.append((now, channel.id, content))
+        if source is None: # Triggered replies don't say which message they answer; take the oldest waiting one
+            waiting = self.awaiting_trigger.get(channel.id)
+            message_id = waiting.popleft() if waiting else None
+        else:
+            message_id = source.id
+        if message_id is None or message_id in self.responded or message_id not in self.dispatched:
+            return
+        self.responded.add(message_id)
+        dispatched_at, kind = self.dispatched[message_id]
+        self.latencies.setdefault(kind, []).append(now - dispatched_at)
+
+    async def sample_loop_lag(self, interval=0.02):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.lag_samples.append(max(0.0, time.perf_counter() - started - interval))
+
+    def busy(self):
+        """True while anything inside the bot still has queued work."""
+        listener_cog = self.bot.get_cog("Message Listeners")
+        if listener_cog is not None and listener_cog.reply_scheduler.pending():
+            return True
+        jp_cog = self.bot.get_cog("JpCog")
+        if jp_cog is not None and (jp_cog.translation_batcher.stats()["pending"] or jp_cog.kks_pool.queue_depth):
+            return True
+        if jp_cog is not None and jp_cog.deepl_dispatcher is not None:
+            dispatch = jp_cog.deepl_dispatcher.stats()
+            if dispatch["queue_depth"] or dispatch["waiting_retry"]:
+                return True
+        return False
+
+    async def settle(self, quiet_for, timeout=60.0):
+        """Waits until nothing was sent for quiet_for seconds and no work is queued."""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if time.perf_counter() - self.last_send >= quiet_for and not self.busy():
+                return
+            await asyncio.sleep(0.05)
+        print("Warning: bot still busy at the settle timeout; results are partial.", file=sys.stderr)
+
+
+async def replay(args):
+    deepl = FakeDeepL(latency=args.deepl_latency, jitter=args.deepl_latency / 2, rate_429=args.rate_429, rate_456=args.rate_456, seed=args.seed)
+    deepl_url = await deepl.start()
+
+    bot = shibako_bot.create_bot(bot_class=ReplayBot)
+    bot.config["deepl_api_url"] = deepl_url
+    bot.config["deepl_api_key"] = bot.config.get("deepl_api_key") or "replay"
+    bot.config["translation_cache_db"] = args.cache_db # None: memory tier only, so every run starts cold
+    bot.config["deepl_usage_db"] = None # Don't bill replayed traffic to the real usage file
+    bot.config["phrases_watch_interval"] = 0
+    bot.config["memory_report_interval"] = 0
+    if args.unlimited:
+        for key in ("trigger_channel_rate", "trigger_guild_rate", "command_channel_rate"):
+            bot.config[key] = 1e9
+        for key in ("trigger_channel_burst", "trigger_guild_burst", "command_channel_burst"):
+            bot.config[key] = 10**9
+        bot.config["trigger_coalesce_window"] = 0
+        for key in ("deepl_daily_limit", "deepl_guild_daily_limit", "deepl_user_daily_limit"):
+            bot.config[key] = 0
+
+    harness = ReplayHarness(bot, send_latency=args.send_latency)
+    async with bot:
+        bot._connection.user = harness.bot_user # What the gateway's READY would have set
+        await bot.setup_hook()
+        if not args.cold:
+            await asyncio.to_thread(kakasi_loader.get)
+
+        rng = random.Random(args.seed)
+        if args.input:
+            stream = list(read_stream(args.input))
+        else:
+            stream = list(synthetic_stream(args.messages, list(bot.trigger_map) or ["hello shibako"], rng, unique_ratio=args.unique_ratio))
+        if args.record:
+            with open(args.record, "w", encoding="utf-8") as f:
+                for offset, entry in enumerate(stream):
+                    f.write(json.dumps(dict(entry, t=round(offset / args.rate, 4)), ensure_ascii=False) + "\n")
+            print(f"Recorded {len(stream)} messages to {args.record}")
+
+        lag_task = asyncio.create_task(harness.sample_loop_lag())
+        started = time.perf_counter()
+        for offset, entry in enumerate(stream):
+            due = started + (entry["t"] / args.speed if "t" in entry else offset / args.rate)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            harness.dispatch(entry)
+        dispatch_seconds = time.perf_counter() - started
+        await harness.settle(args.settle)
+        finished = harness.last_send if harness.sends else time.perf_counter()
+        lag_task.cancel()
+
+        report = build_report(harness, bot, deepl, len(stream), dispatch_seconds, finished - started)
+        await deepl.close()
+    return report
+
+
+def build_report(harness, bot, deepl, message_count, dispatch_seconds, total_seconds):
+    all_latencies = [latency for latencies in harness.latencies.values() for latency in latencies]
+    kinds = {}
+    for kind, latencies in sorted(harness.latencies.items()):
+        kinds[kind] = {
+            "responses": len(latencies),
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+        }
+    offered = {}
+    for _, kind in harness.dispatched.values():
+        offered[kind] = offered.get(kind, 0) + 1
+    report = {
+        "messages": message_count,
+        "dispatch_seconds": dispatch_seconds,
+        "total_seconds": total_seconds,
+        "offered_rate": message_count / dispatch_seconds if dispatch_seconds else 0.0,
+        "throughput": message_count / total_seconds if total_seconds else 0.0,
+        "sends": len(harness.sends),
+        "edits": harness.edits,
+        "answered": len(harness.responded),
+        "offered_by_kind": offered,
+        "latency": {
+            "p50_ms": percentile(all_latencies, 0.50) * 1000,
+            "p99_ms": percentile(all_latencies, 0.99) * 1000,
+            "by_kind": kinds,
+        },
+        "loop_lag": {
+            "p50_ms": percentile(harness.lag_samples, 0.50) * 1000,
+            "p99_ms": percentile(harness.lag_samples, 0.99) * 1000,
+            "max_ms": max(harness.lag_samples, default=0.0) * 1000,
+        },
+        "deepl": deepl.stats(),
+    }
+    jp_cog = bot.get_cog("JpCog")
+    if jp_cog is not None:
+        report["translation_cache"] = jp_cog.translation_cache.stats()
+        report["batcher"] = jp_cog.translation_batcher.stats()
+        if jp_cog.deepl_dispatcher is not None:
+            report["deepl_dispatcher"] = jp_cog.deepl_dispatcher.stats()
+        report["kks_pool"] = jp_cog.kks_pool.stats()
+        report["commands_suppressed"] = jp_cog.commands_suppressed
+    listener_cog = bot.get_cog("Message Listeners")
+    if listener_cog is not None:
+        report["trigger_limits"] = listener_cog.reply_limiter.stats()
+    return report
+
+
+def print_report(report):
+    print(f"Messages: {report['messages']} offered at {report['offered_rate']:.0f}/s, "
+          f"processed at {report['throughput']:.0f}/s ({report['total_seconds']:.1f}s until the last reply)")
+    print(f"Replies: {report['sends']} sends, {report['edits']} edits, {report['answered']} messages answered")
+    print(f"Response latency: p50 {report['latency']['p50_ms']:.1f} ms, p99 {report['latency']['p99_ms']:.1f} ms")
+    for kind, stats in report["latency"]["by_kind"].items():
+        offered = report["offered_by_kind"].get(kind, 0)
+        print(f"  {kind:<12} {stats['responses']:>5}/{offered:<5} p50 {stats['p50_ms']:>8.1f} ms  p99 {stats['p99_ms']:>8.1f} ms")
+    lag = report["loop_lag"]
+    print(f"Event loop lag: p50 {lag['p50_ms']:.1f} ms, p99 {lag['p99_ms']:.1f} ms, max {lag['max_ms']:.1f} ms")
+    print(f"Fake DeepL: {report['deepl']}")
+    for key in ("translation_cache", "batcher", "deepl_dispatcher", "kks_pool", "trigger_limits", "commands_suppressed"):
+        if key in report:
+            print(f"{key}: {report[key]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000, help="synthetic messages to generate")
+    parser.add_argument("--input", metavar="FILE", help="replay this JSONL stream instead of a synthetic one")
+    parser.add_argument("--record", metavar="FILE", help="write the stream that is replayed to FILE")
+    parser.add_argument("--rate", type=float, default=100.0, help="messages per second when the stream has no timestamps")
+    parser.add_argument("--speed", type=float, default=1.0, help="time scale for recorded timestamps (2 = twice as fast)")
+    parser.add_argument("--unique-ratio", type=float, default=0.3, help="share of command texts made unique (cache misses)")
+    parser.add_argument("--deepl-latency", type=float, default=0.15, help="fake DeepL seconds per request")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of DeepL requests answered 429")
+    parser.add_argument("--rate-456", type=float, default=0.0, help="share of DeepL requests answered 456")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="simulated seconds per Discord send")
+    parser.add_argument("--unlimited", action="store_true", help="disable the trigger and command rate limits")
+    parser.add_argument("--cache-db", metavar="FILE", default=None, help="use a SQLite translation cache file (default: memory only)")
+    parser.add_argument("--cold", action="store_true", help="don't wait for PyKakasi to warm up before replaying")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds of silence that mean the bot is done")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(replay(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
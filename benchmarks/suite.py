@@ -0,0 +1,343 @@
+"""
+Offline benchmark suite with JSON baselines.
+
+Covers trigger lookup (the matcher alone and ListenerCog.on_message end to
+end), kakasi conversion and romaji/furigana/full rendering, language
+routing, phrases file loading and !phrases page rendering. Nothing touches Discord or the network.
+Every result is seconds per operation (lower is better), best of several runs.
+
+Usage:
+    python -m benchmarks.suite run [--full] [--only PREFIX] [--save FILE]
+    python -m benchmarks.suite compare BASELINE [--current FILE] [--threshold 0.15] [--full] [--only PREFIX]
+
+`run --save benchmarks/baselines/<machine>.json` records a baseline;
+`compare` runs the suite again (or reads --current) and exits with status 1
+if any result is more than `threshold` slower than the baseline. --full
+scales trigger lookup up to 1M messages and 100k triggers (takes minutes).
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from utils.config_loader import load_phrase_config
+from utils.kakasi_loader import kakasi_loader
+from utils.paginator import paginate, with_page_numbers
+from utils.readings import build_readings, render_romaji, render_furigana, full_body
+from utils.script_classifier import classify, route
+from benchmarks.bench_trigger_matcher import make_triggers, make_messages, build_matcher
+from benchmarks.bench_script_classifier import SAMPLES as SCRIPT_SAMPLES
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHRASES_FILE = os.path.join(REPO_ROOT, "shibako_phrases.json")
+UNIQUE_MESSAGES = 20000 # Larger corpora cycle through this many distinct messages (matching keeps no state)
+JAPANESE_SAMPLE = "今日は良い天気ですね。日本語の勉強は楽しいですが、漢字を覚えるのは大変です！柴犬の芝子は散歩が大好き。"
+
+
+def best_per_op(func, number, repeat=3):
+    """Runs func() `number` times per round and returns the fastest round's seconds per call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def corpus(messages, unique):
+    """`messages` items drawn cyclically from `unique`, without materializing a huge list."""
+    return (unique[index % len(unique)] for index in range(messages))
+
+
+# --- Fakes for running cogs without Discord ---
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+
+
+class FakeMessage:
+    def __init__(self, content, author, channel, guild):
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+
+
+class FakeBot:
+    """Just the attributes ListenerCog and GeneralCog read."""
+    def __init__(self, phrase_config):
+        self.phrase_config = phrase_config
+        self.user = FakeUser(0)
+        self.command_prefix = "!"
+        self.config = {
+            "shiba_emoji_string": phrase_config.shiba_emoji,
+            # Effectively unlimited, so every match goes all the way to scheduling a reply
+            "trigger_channel_rate": 1e9, "trigger_channel_burst": 10**9,
+            "trigger_guild_rate": 1e9, "trigger_guild_burst": 10**9,
+            "trigger_coalesce_window": 0,
+        }
+
+
+class CountingScheduler:
+    """Replaces ReplyScheduler so the benchmark measures the listener, not sending."""
+    def __init__(self):
+        self.scheduled = 0
+
+    def schedule(self, channel, content, delay=None):
+        self.scheduled += 1
+
+
+# --- Benchmarks ---
+def bench_trigger_lookup(full, results):
+    rng = random.Random(1234)
+    trigger_counts = (100, 1000, 10000, 100000) if full else (100, 10000)
+    message_counts = (10000, 100000, 1000000) if full else (10000,)
+    for trigger_count in trigger_counts:
+        triggers = make_triggers(trigger_count, rng)
+        unique = make_messages(min(UNIQUE_MESSAGES, max(message_counts)), 80, triggers, rng)
+        matcher = build_matcher(triggers)
+        for message_count in message_counts:
+            match = matcher.match
+
+            def run():
+                for message in corpus(message_count, unique):
+                    match(message)
+
+            results[f"trigger_lookup/matcher/triggers={trigger_count}/messages={message_count}"] = best_per_op(run, 1, repeat=2) / message_count
+
+
+def bench_on_message(full, results):
+    """ListenerCog.on_message end to end: config snapshot read, match, rate limiter, reply scheduling."""
+    from cogs.listeners import ListenerCog
+
+    phrase_config = load_phrase_config(PHRASES_FILE)
+    bot = FakeBot(phrase_config)
+    cog = ListenerCog(bot)
+    cog.reply_scheduler = CountingScheduler()
+    rng = random.Random(99)
+    triggers = [trigger for trigger in phrase_config.trigger_map]
+    channels = [FakeChannel(1000 + index) for index in range(50)]
+    guilds = [FakeGuild(index) for index in range(5)]
+    author = FakeUser(42)
+    messages = []
+    for index in range(UNIQUE_MESSAGES):
+        words = " ".join("".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 8))) for _ in range(10))
+        content = rng.choice(triggers) if index % 10 == 0 else words
+        messages.append(FakeMessage(content, author, channels[index % 50], guilds[index % 5]))
+
+    message_count = 100000 if full else 10000
+
+    async def run_all():
+        for message in corpus(message_count, messages):
+            await cog.on_message(message)
+
+    results[f"trigger_lookup/on_message/messages={message_count}"] = best_per_op(lambda: asyncio.run(run_all()), 1, repeat=2) / message_count
+
+
+def render_full_pages(readings, translation):
+    """The !full pages, built the way JpCog.respond_full builds them."""
+    body = full_body(readings.text, render_furigana(readings), render_romaji(readings), translation)
+    return with_page_numbers(paginate(body, header="```\n", footer="\n```"))
+
+
+def bench_rendering(full, results):
+    kks = kakasi_loader.get() # Loading the dictionaries is a one-off cost and isn't measured here
+    for length in (16, 128, 1024):
+        text = (JAPANESE_SAMPLE * (length // len(JAPANESE_SAMPLE) + 1))[:length]
+        number = max(5, 2000 // length)
+        results[f"render/convert/chars={length}"] = best_per_op(lambda: build_readings(text, kks.convert(text)), number)
+        readings = build_readings(text, kks.convert(text))
+        number *= 20
+        results[f"render/romaji/chars={length}"] = best_per_op(lambda: render_romaji(readings), number)
+        results[f"render/furigana/chars={length}"] = best_per_op(lambda: render_furigana(readings), number)
+        results[f"render/full/chars={length}"] = best_per_op(lambda: render_full_pages(readings, "(translation)"), number)
+
+
+def bench_script(full, results):
+    for name, sample in SCRIPT_SAMPLES.items():
+        for length in (16, 200, 2000):
+            text = (sample * (length // len(sample) + 1))[:length]
+            number = max(20, 20000 // length)
+            results[f"script/classify/{name}/chars={length}"] = best_per_op(lambda: classify(text), number)
+            results[f"script/route/{name}/chars={length}"] = best_per_op(lambda: route(text), number)
+
+
+def write_synthetic_phrases(path, phrase_count, rng):
+    """A valid phrases file with phrase_count phrases of three triggers each."""
+    with open(PHRASES_FILE, encoding="utf-8") as f:
+        data = json.load(f)
+    data["phrases"] = [
+        {
+            "name": f"phrase_{index}",
+            "triggers": [" ".join("".join(rng.choices("abcdefghijklmnop", k=5)) for _ in range(3)) for _ in range(3)],
+            "response": f"response {index}",
+            "allow_rude_response": index % 2 == 0,
+        }
+        for index in range(phrase_count)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def bench_load_config(full, results):
+    rng = random.Random(7)
+    results["load_config/shibako_phrases.json"] = best_per_op(lambda: load_phrase_config(PHRASES_FILE), 20)
+    with tempfile.TemporaryDirectory() as directory:
+        for phrase_count in (1000, 10000):
+            path = os.path.join(directory, f"phrases_{phrase_count}.json")
+            write_synthetic_phrases(path, phrase_count, rng)
+            results[f"load_config/phrases={phrase_count}"] = best_per_op(lambda: load_phrase_config(path), max(1, 10000 // phrase_count))
+
+
+def bench_phrases_pages(full, results):
+    from cogs.general import GeneralCog
+
+    rng = random.Random(11)
+    configs = [("shibako_phrases.json", load_phrase_config(PHRASES_FILE))]
+    with tempfile.TemporaryDirectory() as directory:
+        for phrase_count in (1000, 10000):
+            path = os.path.join(directory, f"phrases_{phrase_count}.json")
+            write_synthetic_phrases(path, phrase_count, rng)
+            configs.append((f"triggers={phrase_count * 3}", load_phrase_config(path)))
+
+    for label, phrase_config in configs:
+        cog = GeneralCog(FakeBot(phrase_config))
+
+        def render():
+            cog._phrase_pages = (None, []) # Force a re-render; a cache hit would measure nothing
+            cog.render_phrase_pages(phrase_config)
+
+        results[f"phrases_pages/{label}"] = best_per_op(render, max(1, 3000 // len(phrase_config.trigger_map)))
+        results[f"phrases_pages/{label}/cached"] = best_per_op(lambda: cog.render_phrase_pages(phrase_config), 10000)
+
+
+BENCHMARKS = {
+    "trigger_lookup/matcher": bench_trigger_lookup,
+    "trigger_lookup/on_message": bench_on_message,
+    "render": bench_rendering,
+    "script": bench_script,
+    "load_config": bench_load_config,
+    "phrases_pages": bench_phrases_pages,
+}
+
+
+def run_suite(full=False, only=None):
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if only and not name.startswith(only) and not only.startswith(name):
+            continue
+        started = time.perf_counter()
+        bench(full, results)
+        print(f"  {name}: done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    if only:
+        results = {key: value for key, value in results.items() if key.startswith(only)}
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.node(),
+            "full": full,
+        },
+        "results": results,
+    }
+
+
+def format_seconds(value):
+    if value >= 1:
+        return f"{value:.2f} s"
+    if value >= 1e-3:
+        return f"{value * 1e3:.2f} ms"
+    if value >= 1e-6:
+        return f"{value * 1e6:.2f} us"
+    return f"{value * 1e9:.0f} ns"
+
+
+def print_results(report):
+    width = max((len(key) for key in report["results"]), default=10)
+    for key, value in report["results"].items():
+        print(f"{key:<{width}}  {format_seconds(value):>10}")
+
+
+def compare(baseline, current, threshold):
+    """Prints old vs new per result; returns the keys that got slower by more than `threshold`."""
+    old, new = baseline["results"], current["results"]
+    width = max((len(key) for key in set(old) | set(new)), default=10)
+    regressions = []
+    for key in sorted(set(old) | set(new)):
+        if key not in new:
+            print(f"{key:<{width}}  {format_seconds(old[key]):>10}  {'(not run)':>10}")
+            continue
+        if key not in old:
+            print(f"{key:<{width}}  {'(new)':>10}  {format_seconds(new[key]):>10}")
+            continue
+        change = new[key] / old[key] - 1 if old[key] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{key:<{width}}  {format_seconds(old[key]):>10}  {format_seconds(new[key]):>10}  {change * 100:+6.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the suite and print (and optionally save) the results")
+    run_parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    compare_parser = commands.add_parser("compare", help="compare against a saved baseline")
+    compare_parser.add_argument("baseline", help="baseline JSON written by `run --save`")
+    compare_parser.add_argument("--current", metavar="FILE", help="compare this saved run instead of running the suite now")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="slowdown that counts as a regression (0.15 = 15%%)")
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--full", action="store_true", help="use the large corpora (up to 1M messages, 100k triggers)")
+        sub.add_argument("--only", metavar="PREFIX", help="only run benchmarks whose name starts with PREFIX")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_suite(args.full, args.only)
+        print_results(report)
+        if args.save:
+            os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Saved {len(report['results'])} results to {args.save}")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args.full or baseline["meta"].get("full", False), args.only)
+    if baseline["meta"].get("machine") != current["meta"].get("machine"):
+        print(f"Note: baseline is from {baseline['meta'].get('machine')}, timings across machines are not comparable.")
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold * 100:.0f}%.")
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
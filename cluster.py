@@ -0,0 +1,320 @@
+"""
+Cluster launcher: spreads Shibako's shards over several worker processes.
+
+    python cluster.py --workers 2 --shards 4
+    python cluster.py --workers 2 --shards 4 --fake-gateway
+    python cluster.py --workers 3 --shards 8 --fake-gateway 5000
+
+Every worker is a normal ShardedShibakoBot running a contiguous slice of the
+shards, with its own caches, conversion pool and DeepL session. The launcher
+watches shibako_phrases.json, validates edits once and tells every worker to
+reload, and collects per-shard latency and guild counts from all workers.
+With --fake-gateway [GUILDS] the workers load their cogs and answer the
+launcher but never connect to Discord. Instead each one reports GUILDS
+(default 100) fake guilds spread over the shards with Discord's shard formula
+and jittered heartbeat latencies (see FakeGateway), so the stats reports,
+!shards and reload relays can be exercised locally with real-looking data.
+
+DeepL budgets are shared: every worker writes its billed characters to the
+same DEEPL_USAGE_DB and re-reads the cluster-wide totals from it every
+DEEPL_USAGE_REFRESH seconds (5 unless set), so DEEPL_DAILY_LIMIT,
+DEEPL_GUILD_DAILY_LIMIT and DEEPL_USER_DAILY_LIMIT apply to the cluster as a
+whole. Between re-reads a worker only sees its own spend, so the workers can
+overshoot a limit by what the others spent in that window. The account total
+is corrected from DeepL's /v2/usage on every sync.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import time
+import urllib.request
+
+import shibako_bot
+from utils.config_loader import ConfigError, load_phrase_config
+
+CLUSTER_WORKERS = int(os.getenv("CLUSTER_WORKERS", "2")) # Worker processes
+CLUSTER_STATS_INTERVAL = float(os.getenv("CLUSTER_STATS_INTERVAL", "60")) # Seconds between shard stats reports
+CLUSTER_FAKE_GUILDS = 100 # Guilds --fake-gateway pretends the whole cluster has when no count is given
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot" # Tells us Discord's recommended shard count
+
+
+def plan_shards(shard_count, workers):
+    """Splits shard ids 0..shard_count-1 into at most `workers` contiguous, near-equal ranges."""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    plan = []
+    start = 0
+    for worker_id in range(workers):
+        end = start + size + (1 if worker_id < extra else 0)
+        plan.append(list(range(start, end)))
+        start = end
+    return plan
+
+
+def recommended_shard_count(token):
+    """Asks Discord how many shards this bot should run."""
+    request = urllib.request.Request(GATEWAY_BOT_URL, headers={"Authorization": f"Bot {token}", "User-Agent": "ShibakoBot"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)["shards"]
+
+
+# --- Worker side ---
+class FakeGateway:
+    """
+    Stands in for Discord under --fake-gateway: `guilds` guilds across the whole cluster, each on
+    the shard Discord would put it on ((guild_id >> 22) % shard_count), and a jittered latency per shard.
+    """
+    def __init__(self, shard_ids, shard_count, guilds, seed=None):
+        self.shard_ids = list(shard_ids)
+        self.random = random.Random(seed)
+        self.guilds = {shard_id: 0 for shard_id in self.shard_ids}
+        for index in range(guilds):
+            guild_id = (index + 1) << 22 # Snowflake whose timestamp part is the index
+            shard_id = (guild_id >> 22) % shard_count
+            if shard_id in self.guilds:
+                self.guilds[shard_id] += 1
+
+    def shard_stats(self):
+        """Same shape as ShibakoBotMixin.shard_stats."""
+        return {
+            shard_id: {"latency_ms": round(self.random.uniform(20, 120), 1), "guilds": guilds}
+            for shard_id, guilds in self.guilds.items()
+        }
+
+
+class ClusterLink:
+    """A worker's end of the control pipe to the launcher (fake_gateway, if given, provides the shard stats)."""
+    def __init__(self, bot, worker_id, conn, fake_gateway=None):
+        self.bot = bot
+        self.worker_id = worker_id
+        self.conn = conn
+        self.fake_gateway = fake_gateway
+        self.cluster_stats = {} # worker id -> last stats the launcher shared, for !shards
+
+    def send(self, kind, payload=None):
+        try:
+            self.conn.send((kind, self.worker_id, payload))
+        except (OSError, ValueError) as e:
+            print(f"Error (worker {self.worker_id}): Lost connection to the cluster launcher: {e}")
+
+    def request_reload(self):
+        """Asks the launcher to make every other worker reload the phrases file too."""
+        self.send("reload_all")
+
+    def stats(self):
+        if self.fake_gateway is not None:
+            shards = self.fake_gateway.shard_stats()
+            return {"pid": os.getpid(), "shards": shards, "guilds": sum(shard["guilds"] for shard in shards.values())}
+        return {"pid": os.getpid(), "shards": self.bot.shard_stats(), "guilds": len(self.bot.guilds)}
+
+    def _on_readable(self, inbox):
+        try:
+            while self.conn.poll():
+                inbox.put_nowait(self.conn.recv())
+        except (EOFError, OSError):
+            asyncio.get_running_loop().remove_reader(self.conn.fileno())
+            inbox.put_nowait(("shutdown", None, None)) # Launcher is gone, so nobody supervises us anymore
+
+    async def serve(self):
+        """Handles launcher messages until told to shut down, then closes the bot."""
+        loop = asyncio.get_running_loop()
+        inbox = asyncio.Queue()
+        loop.add_reader(self.conn.fileno(), self._on_readable, inbox)
+        try:
+            while True:
+                kind, _, payload = await inbox.get()
+                if kind == "reload":
+                    admin_cog = self.bot.get_cog("Admin")
+                    if admin_cog is not None:
+                        await admin_cog.reload_phrases()
+                elif kind == "stats":
+                    self.send("stats", self.stats())
+                elif kind == "cluster_stats":
+                    self.cluster_stats = payload
+                elif kind == "shutdown":
+                    break
+        finally:
+            if not self.conn.closed:
+                loop.remove_reader(self.conn.fileno())
+            await self.bot.close()
+
+
+async def _worker_main(worker_id, workers, shard_ids, shard_count, conn, fake_gateway):
+    bot = shibako_bot.create_bot(shard_ids=shard_ids, shard_count=shard_count)
+    bot.config["phrases_watch_interval"] = 0 # The launcher watches the file and tells every worker to reload
+    if bot.config.get("metrics_port"):
+        bot.config["metrics_port"] += worker_id # One metrics endpoint per worker
+    if bot.config.get("deepl_usage_db"): # Budgets are shared through the usage database (see the module docstring)
+        bot.config["deepl_usage_refresh"] = bot.config.get("deepl_usage_refresh") or 5
+    elif workers > 1:
+        print(f"Warning (worker {worker_id}): DEEPL_USAGE_DB is empty, so DeepL budgets are counted per worker, not for the cluster.")
+    fake = FakeGateway(shard_ids, shard_count, fake_gateway, seed=worker_id) if fake_gateway else None
+    bot.cluster_link = link = ClusterLink(bot, worker_id, conn, fake_gateway=fake)
+    print(f"Worker {worker_id} (pid {os.getpid()}) starting shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}.")
+
+    async with bot:
+        if fake_gateway:
+            await bot.setup_hook() # bot.start() would do this right before connecting
+            link.send("stats", link.stats())
+            await link.serve()
+        else:
+            control = asyncio.create_task(link.serve())
+            try:
+                await bot.start(shibako_bot.BOT_TOKEN)
+            finally:
+                control.cancel()
+
+
+def run_worker(worker_id, workers, shard_ids, shard_count, conn, fake_gateway=0):
+    """Process entry point for one worker (fake_gateway: guilds to pretend the cluster has, 0 connects for real)."""
+    try:
+        asyncio.run(_worker_main(worker_id, workers, shard_ids, shard_count, conn, fake_gateway))
+    except KeyboardInterrupt:
+        pass # The launcher handles Ctrl+C and shuts us down over the pipe
+
+
+# --- Launcher side ---
+class ClusterLauncher:
+    """Starts the workers, relays config reloads to them and collects their shard stats."""
+    def __init__(self, shard_count, workers, fake_gateway=0, stats_interval=CLUSTER_STATS_INTERVAL):
+        self.shard_count = shard_count
+        self.plan = plan_shards(shard_count, workers)
+        self.fake_gateway = fake_gateway
+        self.stats_interval = stats_interval
+        self.config_file = shibako_bot.CONFIG_FILE
+        self.watch_interval = shibako_bot.PHRASES_WATCH_INTERVAL
+        self.processes = {} # worker id -> Process
+        self.conns = {} # worker id -> launcher end of the pipe
+        self.worker_stats = {} # worker id -> last stats received
+        self._config_mtime = self._mtime()
+        self._failed_mtime = None
+
+    def _mtime(self):
+        try:
+            return os.stat(self.config_file).st_mtime
+        except OSError:
+            return None
+
+    def start(self):
+        context = multiprocessing.get_context("spawn") # Fresh interpreters: no inherited event loop or sockets
+        for worker_id, shard_ids in enumerate(self.plan):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=run_worker, name=f"shibako-worker-{worker_id}",
+                args=(worker_id, len(self.plan), shard_ids, self.shard_count, child_conn, self.fake_gateway),
+            )
+            process.start()
+            child_conn.close()
+            self.processes[worker_id] = process
+            self.conns[worker_id] = parent_conn
+        print(f"Cluster started: {self.shard_count} shards over {len(self.plan)} workers.")
+
+    def broadcast(self, kind, payload=None, exclude=None):
+        for worker_id, conn in list(self.conns.items()):
+            if worker_id == exclude:
+                continue
+            try:
+                conn.send((kind, None, payload))
+            except (OSError, ValueError):
+                self._drop(worker_id)
+
+    def _drop(self, worker_id):
+        conn = self.conns.pop(worker_id, None)
+        if conn is not None:
+            conn.close()
+            print(f"Worker {worker_id} disconnected (exit code {self.processes[worker_id].exitcode}).")
+
+    def check_config(self):
+        """Validates an edited phrases file once here, then has every worker reload it."""
+        mtime = self._mtime()
+        if mtime is None or mtime == self._config_mtime or mtime == self._failed_mtime:
+            return
+        try:
+            load_phrase_config(self.config_file)
+        except ConfigError as e:
+            print(f"Error (cluster): {self.config_file} is invalid, workers keep their current config: {e}")
+            self._failed_mtime = mtime
+            return
+        self._config_mtime = mtime
+        self._failed_mtime = None
+        print(f"{self.config_file} changed, reloading on all workers.")
+        self.broadcast("reload")
+
+    def poll_workers(self):
+        for worker_id, conn in list(self.conns.items()):
+            try:
+                while conn.poll():
+                    kind, sender, payload = conn.recv()
+                    if kind == "stats":
+                        self.worker_stats[sender] = payload
+                    elif kind == "reload_all": # !reload on one worker; it already reloaded itself
+                        self.broadcast("reload", exclude=sender)
+            except (EOFError, OSError):
+                self._drop(worker_id)
+
+    def report(self):
+        """Prints per-shard latency and guild counts and shares them with the workers (for !shards)."""
+        for worker_id in sorted(self.worker_stats):
+            stats = self.worker_stats[worker_id]
+            shards = ", ".join(
+                f"#{shard_id} {'?' if shard['latency_ms'] is None else shard['latency_ms']}ms/{shard['guilds']}g"
+                for shard_id, shard in sorted(stats["shards"].items())
+            )
+            print(f"Worker {worker_id} (pid {stats['pid']}): {stats['guilds']} guilds | {shards}")
+        self.broadcast("cluster_stats", dict(self.worker_stats))
+
+    def run(self):
+        """Supervises until every worker has exited or Ctrl+C is pressed."""
+        self.start()
+        next_config_check = time.monotonic() + self.watch_interval
+        next_stats = time.monotonic() + min(self.stats_interval, 5) # First report soon after startup
+        try:
+            while any(process.is_alive() for process in self.processes.values()):
+                self.poll_workers()
+                now = time.monotonic()
+                if self.watch_interval > 0 and now >= next_config_check:
+                    self.check_config()
+                    next_config_check = now + self.watch_interval
+                if now >= next_stats:
+                    self.report()
+                    self.broadcast("stats") # Answers arrive before the next report
+                    next_stats = now + self.stats_interval
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            print("Shutting down cluster...")
+        finally:
+            self.shutdown()
+
+    def shutdown(self, timeout=10):
+        self.broadcast("shutdown")
+        for worker_id, process in self.processes.items():
+            process.join(timeout)
+            if process.is_alive():
+                print(f"Worker {worker_id} did not stop in {timeout}s, terminating.")
+                process.terminate()
+        for worker_id in list(self.conns):
+            self.conns.pop(worker_id).close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Shibako as a cluster of sharded worker processes.")
+    parser.add_argument("--workers", type=int, default=CLUSTER_WORKERS, help="worker processes to start")
+    parser.add_argument("--shards", type=int, default=shibako_bot.SHARD_COUNT, help="total shards (default: Discord's recommendation)")
+    parser.add_argument("--fake-gateway", type=int, nargs="?", const=CLUSTER_FAKE_GUILDS, default=0, metavar="GUILDS",
+                        help=f"load everything but never connect to Discord; report GUILDS fake guilds (default {CLUSTER_FAKE_GUILDS})")
+    parser.add_argument("--stats-interval", type=float, default=CLUSTER_STATS_INTERVAL, help="seconds between shard stats reports")
+    args = parser.parse_args()
+
+    if not args.fake_gateway:
+        shibako_bot.require_token()
+    shard_count = args.shards
+    if shard_count is None:
+        shard_count = args.workers if args.fake_gateway else recommended_shard_count(shibako_bot.BOT_TOKEN)
+    ClusterLauncher(shard_count, args.workers, fake_gateway=args.fake_gateway, stats_interval=args.stats_interval).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import asyncio
+import os
+
+import discord
+from discord.ext import commands, tasks
+
+from utils.config_loader import ConfigError, load_phrase_config, diff_configs
+from utils.memory import memory_report, rss_bytes, cache_sizes
+from utils.paginator import paginate, with_page_numbers, send_pages
+
+
+class AdminCog(commands.Cog, name="Admin"):
+    """
+    Owner tools. Hot-reloads shibako_phrases.json without restarting the bot.
+
+    The new config is parsed, validated and compiled in a worker thread; only
+    the final reference swap happens on the event loop. If anything fails the
+    old config stays in place.
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.config_file = bot.config.get('phrases_file', 'shibako_phrases.json')
+        self._reload_lock = asyncio.Lock() # One reload at a time (watcher and !reload can race)
+        self._failed_mtime = None # Don't retry (and re-log) the same broken edit on every tick
+
+        watch_interval = bot.config.get('phrases_watch_interval', 0)
+        if watch_interval and watch_interval > 0:
+            self.watch_phrases.change_interval(seconds=watch_interval)
+            self.watch_phrases.start()
+
+        report_interval = bot.config.get('memory_report_interval', 0)
+        if report_interval and report_interval > 0:
+            self.report_memory.change_interval(seconds=report_interval)
+            self.report_memory.start()
+
+    async def cog_unload(self):
+        self.watch_phrases.cancel()
+        self.report_memory.cancel()
+
+    async def reload_phrases(self):
+        """
+        Builds a new config snapshot off the loop and swaps it in.
+        Returns (changes, errors): a diff on success, or the problems found on failure.
+        """
+        async with self._reload_lock:
+            old_config = self.bot.phrase_config
+            try:
+                new_config = await asyncio.to_thread(load_phrase_config, self.config_file, old_config.version + 1)
+            except ConfigError as e:
+                print(f"Error (AdminCog): Reload of {self.config_file} failed, keeping version {old_config.version}: {e}")
+                return [], e.errors
+            except Exception as e:
+                print(f"Error (AdminCog): Unexpected error reloading {self.config_file}: {e}")
+                return [], [f"{e.__class__.__name__}: {e}"]
+
+            self.bot.swap_phrase_config(new_config)
+            changes = diff_configs(old_config, new_config)
+            print(f"Reloaded {self.config_file} (version {new_config.version}, {len(new_config.trigger_map)} triggers).")
+            for change in changes:
+                print(f"  {change}")
+            return changes, []
+
+    # --- File watcher ---
+    @tasks.loop(seconds=5)
+    async def watch_phrases(self):
+        """Reloads the phrases file when its modification time changes."""
+        try:
+            mtime = os.stat(self.config_file).st_mtime
+        except OSError:
+            return # File is being replaced or was removed; keep the current config
+        if mtime != self.bot.phrase_config.mtime and mtime != self._failed_mtime:
+            _, errors = await self.reload_phrases()
+            self._failed_mtime = mtime if errors else None
+
+    # --- Memory report ---
+    @tasks.loop(seconds=300)
+    async def report_memory(self):
+        """Logs RSS and cache sizes so memory per guild can be tracked as the bot grows."""
+        print(f"Memory: {memory_report(self.bot)}")
+
+    @report_memory.before_loop
+    async def before_report_memory(self):
+        await self.bot.wait_until_ready() # Cache sizes mean nothing before the guilds have arrived
+
+    async def send_report(self, ctx, title, lines):
+        """Sends lines as a code block under title, paginated instead of cut off when it is too long."""
+        shiba_emoji = self.bot.config.get('shiba_emoji_string', '...')
+        body = "\n".join(lines)
+        await send_pages(ctx, with_page_numbers(paginate(body, header=f"{shiba_emoji} {title}\n```\n", footer="\n```")))
+
+    # --- !reload command (owner only) ---
+    @commands.command(name='reload', hidden=True)
+    @commands.is_owner()
+    async def reload_command(self, ctx):
+        """Reloads shibako_phrases.json and reports what changed."""
+        changes, errors = await self.reload_phrases()
+        cluster_link = getattr(self.bot, 'cluster_link', None)
+        if cluster_link is not None and not errors:
+            cluster_link.request_reload() # Other worker processes reload from the same file
+
+        if errors:
+            title = f"Reload failed, still using version {self.bot.phrase_config.version}:"
+            lines = [f"- {error}" for error in errors]
+        else:
+            title = f"Reloaded phrases (version {self.bot.phrase_config.version}):"
+            lines = changes or ["(no changes)"]
+
+        try:
+            await self.send_report(ctx, title, lines)
+        except discord.errors.Forbidden:
+            print(f"Error: Cannot send !reload result in channel {ctx.channel.id}. Missing permissions?")
+
+    # --- !limits command (owner only) ---
+    @commands.command(name='limits', hidden=True)
+    @commands.is_owner()
+    async def limits_command(self, ctx):
+        """Shows how many trigger and command replies the rate limits suppressed."""
+        lines = []
+        listener_cog = self.bot.get_cog("Message Listeners")
+        if listener_cog is not None:
+            stats = listener_cog.reply_limiter.stats()
+            by_phrase = stats.pop("suppressed_by_phrase")
+            lines += [f"triggers.{key}: {value}" for key, value in stats.items()]
+            lines.append(f"triggers.dropped_from_queue: {listener_cog.reply_scheduler.dropped}")
+            lines += [f"  {name}: {count}" for name, count in sorted(by_phrase.items(), key=lambda item: -item[1])[:10]]
+        jp_cog = self.bot.get_cog("JpCog")
+        if jp_cog is not None:
+            lines.append(f"commands.suppressed: {jp_cog.commands_suppressed}")
+
+        await self.send_report(ctx, "Rate limits", lines or ["(no rate-limited cogs loaded)"])
+
+    # --- !shards command (owner only) ---
+    @commands.command(name='shards', hidden=True)
+    @commands.is_owner()
+    async def shards_command(self, ctx):
+        """Shows gateway latency and guild count per shard (for the whole cluster when running under cluster.py)."""
+        cluster_link = getattr(self.bot, 'cluster_link', None)
+        workers = dict(cluster_link.cluster_stats) if cluster_link is not None else {}
+        if cluster_link is not None:
+            workers[cluster_link.worker_id] = cluster_link.stats() # Our own numbers are always fresh
+        else:
+            workers[0] = {"pid": os.getpid(), "shards": self.bot.shard_stats(), "guilds": len(self.bot.guilds)}
+
+        lines = []
+        for worker_id in sorted(workers):
+            stats = workers[worker_id]
+            lines.append(f"worker {worker_id} (pid {stats['pid']}): {stats['guilds']} guilds")
+            for shard_id, shard in sorted(stats["shards"].items()):
+                latency = "n/a" if shard["latency_ms"] is None else f"{shard['latency_ms']} ms"
+                lines.append(f"  shard {shard_id}: {latency}, {shard['guilds']} guilds")
+
+        here = f" (this is shard {ctx.guild.shard_id})" if ctx.guild else ""
+        await self.send_report(ctx, f"Shards{here}", lines)
+
+    # --- !memory command (owner only) ---
+    @commands.command(name='memory', hidden=True)
+    @commands.is_owner()
+    async def memory_command(self, ctx):
+        """Shows process RSS and the size of every cache."""
+        rss = rss_bytes()
+        sizes = cache_sizes(self.bot)
+        lines = [f"rss: {'n/a' if rss is None else f'{rss / 2**20:.1f} MiB'}"]
+        if rss is not None and sizes["guilds"]:
+            lines.append(f"rss per guild: {rss / sizes['guilds'] / 1024:.1f} KiB")
+        lines.append(f"max_messages: {self.bot._connection.max_messages}")
+        lines += [f"{name}: {count}" for name, count in sizes.items()]
+        await ctx.send(f"{self.bot.config.get('shiba_emoji_string', '...')} Memory\n```\n" + "\n".join(lines) + "\n```")
+
+    # --- !stalls command (owner only) ---
+    @commands.command(name='stalls', hidden=True)
+    @commands.is_owner()
+    async def stalls_command(self, ctx):
+        """Lists where the event loop was blocked since startup, worst first."""
+        watchdog = getattr(self.bot, 'loop_watchdog', None)
+        if watchdog is None:
+            await ctx.send(f"{self.bot.config.get('shiba_emoji_string', '...')} The loop watchdog is disabled (LOOP_STALL_THRESHOLD=0).")
+            return
+        lines = [f"{watchdog.stalls} stalls over {watchdog.threshold}s"]
+        for site in watchdog.top_sites():
+            lines.append(f"{site.count}x total {site.total:.2f}s worst {site.worst:.2f}s")
+            lines.append(f"  {site.handler}")
+            lines.append(f"  {site.site}")
+        await self.send_report(ctx, "Event loop stalls", lines)
+
+# This setup function is required for the cog to be loaded
+async def setup(bot: commands.Bot):
+    await bot.add_cog(AdminCog(bot))
+    print("AdminCog loaded.")
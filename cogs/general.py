@@ -1,10 +1,35 @@
 import discord
 from discord.ext import commands
 import textwrap
+from utils.paginator import paginate, with_page_numbers, send_pages
 
 class GeneralCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._phrase_pages = (None, []) # (config version, rendered pages) for !phrases
+
+    def render_phrase_pages(self, phrase_config):
+        """Renders the !phrases pages for a config snapshot; cached until the config version changes."""
+        version, pages = self._phrase_pages
+        if version == phrase_config.version and pages:
+            return pages
+
+        shiba_emoji = self.bot.config.get('shiba_emoji_string', '...')
+        header = f"{shiba_emoji} わたしが　はんのうする　かもしれない　フレーズ： (Phrases I might react to:)\n```\n"
+        footer = "\n```"
+        body = "\n".join(sorted(phrase_config.trigger_map.keys())) # Get and sort triggers
+        pages = with_page_numbers(paginate(body, header=header, footer=footer))
+        self._phrase_pages = (phrase_config.version, pages)
+        return pages
+
+    async def cog_load(self):
+        # Pre-render so the first !phrases doesn't pay for it
+        self.render_phrase_pages(self.bot.phrase_config)
+
+    @commands.Cog.listener()
+    async def on_phrase_config_swapped(self, phrase_config):
+        """Re-renders the !phrases pages as soon as a reloaded config is installed."""
+        self.render_phrase_pages(phrase_config)
 
     @commands.command(name='tasukete', aliases=['h'])
     async def help_command(self, ctx):
@@ -14,7 +39,7 @@ class GeneralCog(commands.Cog):
 
         わたしができること： (Things I can do:)
         `!tasukete` - Shows this help message.
-        `!phrases` - Shows all the phrases I might react to.
+        `!phrases [page]` - Shows all the phrases I might react to.
         `!romaji <japanese text>` - Converts Japanese text to Romaji. (e.g., `!romaji こんにちは`)
 
         いろいろな　フレーズの　れい： (Examples of various phrases I might react to:)
@@ -35,34 +60,24 @@ class GeneralCog(commands.Cog):
             print(f"Error sending help message: {e}")
 
     @commands.command(name ='phrases', aliases=['p'])
-    async def phrases_command(self, ctx):
+    async def phrases_command(self, ctx, page: int = 1):
         """Prints all possible phrases to trigger shibako."""
 
-        trigger_map = self.bot.trigger_map
-        if not trigger_map:
-            error_msg = self.bot.error_messages.get("phrases_list_empty", "...")
+        phrase_config = self.bot.phrase_config
+        if not phrase_config.trigger_map:
+            error_msg = phrase_config.error_messages.get("phrases_list_empty", "...")
             await ctx.send(f"{self.bot.config.get('shiba_emoji_string', '...')} {error_msg}")
             return
 
-        all_triggers = sorted(list(trigger_map.keys())) # Get and sort triggers
+        # Pages are rendered once per config version and split under Discord's limit
+        pages = self.render_phrase_pages(phrase_config)
 
-        header = f"{self.bot.config.get('shiba_emoji_string', '...')} わたしが　はんのうする　かもしれない　フレーズ： (Phrases I might react to:)\n```\n"
-        footer = "\n```"
-        body = "\n".join(all_triggers)
-        full_message = header + body + footer
-
-        # Check if the message exceeds Discord's approx limit
-        if len(full_message) > 1900: # Leave some buffer room
-            limit_msg = self.bot.error_messages.get("phrases_list_too_long", "たくさん　ありすぎて　ぜんぶは　みせられない！")
-            await ctx.send(f"{self.bot.config.get('shiba_emoji_string', '...')} {limit_msg}")
-
-        else:
-            try:
-                await ctx.send(full_message)
-            except discord.errors.Forbidden:
-                 print(f"Error: Cannot send !phrases list in channel {ctx.channel.id}. Missing permissions?")
-            except Exception as e:
-                print(f"Error sending phrases list message: {e}")
+        try:
+            await send_pages(ctx, pages, start_page=page - 1)
+        except discord.errors.Forbidden:
+             print(f"Error: Cannot send !phrases list in channel {ctx.channel.id}. Missing permissions?")
+        except Exception as e:
+            print(f"Error sending phrases list message: {e}")
 
 # This setup function is required for the cog to be loaded
 async def setup(bot):
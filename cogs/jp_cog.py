@@ -1,32 +1,395 @@
+import asyncio
 import discord
-from discord.ext import commands # Import commands module
-import pykakasi # For Romaji/Furigana conversion
-import os
-import requests # For DeepL Translation
-import emoji # For language detection
-
-# --- Instantiate PyKakasi (Singleton Initialization for the Cog) ---
-# Initialize this resource once when the cog file is first imported.
-try:
-    kks_instance = pykakasi.kakasi()
-    kks_available = True
-    print("PyKakasi converter initialized for JpCog.") # Renamed print statement
-except Exception as e:
-    print(f"Error initializing PyKakasi in JpCog: {e}") # Renamed print statement
-    print("Furigana and Romaji conversion will not be available.")
-    kks_instance = None
-    kks_available = False
+from discord import app_commands # Slash commands and message context menus
+from discord.ext import commands, tasks # Import commands module
+import time
+from utils.deepl_client import DeepLClient, DeepLError, DeepLFormatError, DEFAULT_DEEPL_URL # For DeepL Translation
+from utils.translation_cache import TranslationCache # Memory + SQLite cache for DeepL results
+from utils.translation_batcher import TranslationBatcher # Groups concurrent translations into one DeepL call
+from utils.conversion_pool import ConversionPool, ConversionBusy, ConversionTimeout # Keeps kks.convert off the event loop
+from utils.lru_cache import LRUCache # Memoizes conversion results per input text
+from utils.readings import build_readings, render_romaji, render_furigana, full_body # One conversion, several renderers
+from utils.paginator import paginate, with_page_numbers, send_pages, send_updatable_pages, update_pages # Long output is split into pages, never truncated
+from utils.rate_limit import BucketMap, ResponseBudgetExceeded # Command replies get their own budget
+from utils.message_resolver import MessageResolver # Cache-first lookup of replied-to messages
+from utils.kakasi_loader import kakasi_loader, KakasiLoader # PyKakasi warms up in the background
+from utils.metrics import REGISTRY # Prometheus-style counters and histograms
+from utils.deepl_dispatcher import DeepLDispatcher, DeepLUnavailable, CircuitBreaker, INTERACTIVE, NORMAL # Retries, breaker and priorities
+from utils.markup import split_markup, split_placeholders, strip_placeholders, restore, restore_readings, has_placeholders, to_xml, from_xml, missing_spans # Keeps emoji/mentions/URLs/code away from kakasi and DeepL
+from utils.script_classifier import route # Picks the translation direction, per segment for mixed messages
+from utils.sentences import segment # Long inputs are translated a few sentences at a time
+from utils.progressive_reply import ProgressiveReply # Placeholder reply that is edited as segments arrive
+from utils.quota import QuotaAccountant, SQLiteUsageStore, QuotaExceeded, SHORTENED, CACHE_ONLY, shorten_text # DeepL character budgets
+
+KAKASI_SECONDS = REGISTRY.histogram("shibako_kakasi_conversion_seconds", "PyKakasi conversions including pool queue wait (memo misses only).")
+MARKUP_SAVED = REGISTRY.histogram(
+    "shibako_markup_saved_characters", "Characters of markup (emoji, mentions, URLs, code) kept out of each conversion or translation.",
+    ("stage",), buckets=(0, 10, 25, 50, 100, 250, 500, 1000, 2000),
+)
+TIME_TO_FIRST_OUTPUT = REGISTRY.histogram(
+    "shibako_time_to_first_output_seconds", "From command start until the first translated text is visible.", ("command", "mode"),
+)
+
+# --- PyKakasi (Singleton for the Cog) ---
+# The converter is built by kakasi_loader in a background thread (started in setup),
+# so importing this file no longer waits for the dictionaries to load.
+class ConverterWarmingUp(Exception):
+    """Raised when a conversion is requested before PyKakasi has finished loading."""
+
+def convert_with_kakasi(text):
+    """
+    Runs pykakasi on text and returns a compact ReadingResult. Module-level so the pool can run it in a thread or a process.
+    Markup placeholders never reach pykakasi (it mangles the text around them); each becomes a token that reads as itself.
+    """
+    kks = kakasi_loader.get()
+    if not has_placeholders(text):
+        return build_readings(text, kks.convert(text))
+    items = []
+    for index, piece in enumerate(split_placeholders(text)):
+        if index % 2:
+            items.append({'orig': piece, 'hira': piece, 'hepburn': piece})
+        elif piece:
+            items.extend(kks.convert(piece))
+    return build_readings(text, items)
 # --- ---
 
 class JpCog(commands.Cog):
-    def __init__(self, bot, error_messages, shiba_emoji):
+    UNBUDGETED_COMMANDS = frozenset({"cachestats", "quota", "poolstats"}) # Owner-only; never charged to the channel budget
+
+    def __init__(self, bot, deepl_client, translation_cache, translation_batcher, kks_pool, readings_cache_size=256,
+                 command_channel_rate=1.0, command_channel_burst=5, message_cache_size=512, quota=None, quota_sync_interval=900,
+                 deepl_dispatcher=None, segment_chars=400, progressive_min_chars=800, progressive_edit_interval=1.0):
         self.bot = bot # Store bot instance
-        self.error_messages = error_messages # Store error messages dictionary
-        self.shiba_emoji = shiba_emoji # Store SHIBA emoji
+        self.deepl = deepl_client # Shared pooled DeepL client, created in setup()
+        self.deepl_dispatcher = deepl_dispatcher # Queues, retries and fails fast in front of the client; None if the batcher calls it directly
+        self.translation_cache = translation_cache # Checked before every DeepL call
+        self.translation_batcher = translation_batcher # Cache misses are batched per language pair
+        self.segment_chars = segment_chars # Long inputs are split into segments of about this many characters
+        self.progressive_min_chars = progressive_min_chars # !translate inputs this long get a reply that fills in as segments finish
+        self.progressive_edit_interval = progressive_edit_interval
+
+        self.kks_pool = kks_pool # Bounded worker pool that runs every conversion
+        self.readings_cache = LRUCache(max_size=readings_cache_size) # text -> ReadingResult, so !rj then !furi converts once
+        self.readings_hits = 0
+        self.readings_misses = 0
+
+        # Per-channel budget for command responses, kept apart from the trigger reply budget
+        self.command_budget = BucketMap(command_channel_rate, command_channel_burst)
+        self.commands_suppressed = 0
+
+        # Replied-to messages: resolved reference -> client cache -> our LRU -> REST
+        self.message_resolver = MessageResolver(bot, max_size=message_cache_size)
+
+        # Characters of markup kept away from each stage (also per request in MARKUP_SAVED)
+        self.markup_saved = {"kakasi": 0, "deepl": 0}
+
+        # DeepL character budgets per guild/user/day; None disables accounting
+        self.quota = quota
+        self.quota_sync_interval = quota_sync_interval
+
+        # Message context menus can't be declared in a cog; they are added to the tree in cog_load
+        self.context_menus = [
+            app_commands.ContextMenu(name="Translate", callback=self.translate_message_menu),
+            app_commands.ContextMenu(name="Furigana", callback=self.furigana_message_menu),
+        ]
+
+    @property
+    def error_messages(self):
+        """Error messages from the bot's current config (follows hot reloads)."""
+        return getattr(self.bot, 'error_messages', {})
+
+    @property
+    def shiba_emoji(self):
+        """SHIBA emoji from the bot's current config (follows hot reloads)."""
+        return self.bot.config.get('shiba_emoji_string', '<:shiba:default_id>') # Use a default in case config wasn't loaded
+
+    @property
+    def kks_available(self):
+        """False only if PyKakasi failed to load; while it is still warming up commands say so instead."""
+        return kakasi_loader.state != KakasiLoader.FAILED
+
+    async def cog_before_invoke(self, ctx):
+        """
+        Every JpCog command spends one token from its channel's command budget when it runs.
+        Not a cog_check: !help runs checks for every command it lists, which would spend the budget too.
+        """
+        if ctx.command.name in self.UNBUDGETED_COMMANDS:
+            return
+        if not self.command_budget.try_acquire(ctx.channel.id):
+            self.commands_suppressed += 1
+            raise ResponseBudgetExceeded(f"Command response budget exhausted in channel {ctx.channel.id}")
+
+    async def cog_load(self):
+        for menu in self.context_menus:
+            self.bot.tree.add_command(menu)
+        if self.quota is not None:
+            await self.quota.load()
+            if self.deepl.api_key and self.quota_sync_interval > 0:
+                self.sync_quota.change_interval(seconds=self.quota_sync_interval)
+                self.sync_quota.start()
+
+    async def cog_unload(self):
+        """Flushes pending batches, then closes the DeepL connections and the translation cache."""
+        for menu in self.context_menus:
+            self.bot.tree.remove_command(menu.name, type=menu.type)
+        self.sync_quota.cancel()
+        await self.translation_batcher.close()
+        if self.deepl_dispatcher is not None:
+            await self.deepl_dispatcher.close()
+        await self.deepl.close()
+        self.translation_cache.close()
+        self.kks_pool.shutdown()
+        if self.quota is not None:
+            self.quota.close()
+
+    @tasks.loop(seconds=900)
+    async def sync_quota(self):
+        """Replaces our running estimate with DeepL's own character count."""
+        try:
+            count, limit = await self.deepl.usage()
+        except DeepLError as e:
+            print(f"Error (JpCog): DeepL usage sync failed: {e}")
+            return
+        self.quota.apply_usage(count, limit)
+
+    def cache_sizes(self):
+        """Entries held by this cog, for the memory report."""
+        return {
+            "readings_cache": len(self.readings_cache),
+            "translation_cache": len(self.translation_cache.memory),
+            "replied_messages": len(self.message_resolver.fetched),
+            "command_buckets": len(self.command_budget),
+        }
 
-        # Store the initialized PyKakasi instance and its availability
-        self.kks = kks_instance
-        self.kks_available = kks_available
+    @staticmethod
+    def deepl_payload(text):
+        """What DeepL is sent (and bills) for text: (payload, tag_handling). Placeholders go as XML tags."""
+        return (to_xml(text), "xml") if has_placeholders(text) else (text, None)
+
+    async def translate_text(self, text, source_lang, target_lang, guild_id=None, user_id=None, priority=NORMAL, batch=True, decision=None):
+        """
+        Translates text, serving repeats from the cache. Raises DeepLError on failure
+        (DeepLUnavailable when the dispatcher fails fast). `priority` orders cache misses in the DeepL queue;
+        batch=False sends the text in a request of its own so it comes back as soon as DeepL is done with it.
+        Cache misses are charged to guild_id/user_id, except a duplicate that shared another caller's batched text.
+        `decision` is the request's QuotaDecision from budget_segments; with CACHE_ONLY a miss raises
+        QuotaExceeded instead of calling DeepL.
+        Markup placeholders in text are sent as XML tags and come back as placeholders.
+        """
+        payload, tag_handling = self.deepl_payload(text)
+        cached = await self.translation_cache.get(payload, source_lang, target_lang)
+        if cached is not None:
+            return from_xml(cached) if tag_handling else cached
+        if decision is not None and decision.mode == CACHE_ONLY:
+            raise QuotaExceeded(f"DeepL {decision.reason} budget exhausted and no cached translation", decision.reason)
+
+        billed = True
+        try:
+            if batch: # An identical text in the same batch is billed to whoever sent it first
+                result, billed = await self.translation_batcher.translate_billed(payload, source_lang, target_lang, priority, tag_handling)
+            elif self.deepl_dispatcher is not None:
+                result = (await self.deepl_dispatcher.translate_many([payload], source_lang, target_lang, priority=priority, tag_handling=tag_handling))[0]
+            else:
+                result = (await self.deepl.translate_many([payload], source_lang, target_lang, tag_handling=tag_handling))[0]
+        except DeepLError as e:
+            if e.status == 456 and self.quota is not None: # Quota exceeded on DeepL's side
+                self.quota.mark_exhausted()
+            raise
+        if self.quota is not None and billed: # Unbilled characters stay reserved until release_budget returns them
+            await self.quota.record(guild_id, user_id, len(payload), decision.reservation if decision is not None else None)
+        await self.translation_cache.put(payload, source_lang, target_lang, result)
+        return from_xml(result) if tag_handling else result
+
+    async def budget_segments(self, segments, guild_id=None, user_id=None):
+        """
+        Decides once per request what DeepL may spend on the segments that aren't cached.
+        Returns (segments, decision, shortened). When the budget only allows part of the request
+        (SHORTENED), segments are kept in order while they fit, the first one that doesn't is cut
+        and the rest are dropped. decision is None when nothing needs DeepL or accounting is off;
+        otherwise the caller must release its reservation (release_budget) once the segments are done.
+        """
+        if self.quota is None:
+            return segments, None, False
+        billed = [] # Billed characters per segment, 0 for cached/markup-only ones
+        for text, source_lang, target_lang, _ in segments:
+            payload, _ = self.deepl_payload(text)
+            needs_deepl = strip_placeholders(text).strip() and await self.translation_cache.peek(payload, source_lang, target_lang) is None
+            billed.append(len(payload) if needs_deepl else 0)
+        if not any(billed):
+            return segments, None, False
+
+        await self.quota.refresh() # Picks up what other cluster workers spent
+        decision = self.quota.check(guild_id, user_id, sum(billed))
+        if decision.mode != SHORTENED or decision.limit >= sum(billed):
+            return segments, decision, False
+        kept = []
+        room = decision.limit
+        for plan, characters in zip(segments, billed):
+            if characters <= room:
+                kept.append(plan)
+                room -= characters
+                continue
+            text = plan[0]
+            # The limit is in billed (payload) characters; XML escaping makes the payload longer than the text
+            cut = shorten_text(text, max(0, room - (characters - len(text))))
+            if cut.strip():
+                kept.append((cut,) + plan[1:])
+            break
+        if not kept:
+            self.quota.release(decision.reservation)
+            raise QuotaExceeded(f"DeepL {decision.reason} budget too low for this translation", decision.reason)
+        return kept, decision, True
+
+    def release_budget(self, decision):
+        """Returns the characters budget_segments reserved but the request did not bill."""
+        if decision is not None:
+            self.quota.release(decision.reservation)
+
+    def with_shortened_note(self, translation, shortened):
+        """Adds the "translation shortened" note (once per request) when the budget cut the input."""
+        if not shortened:
+            return translation
+        note = self.error_messages.get("translation_shortened", "(Translation shortened: the translation budget is running low.)")
+        return f"{translation}\n{note}"
+
+    def plan_translation(self, text):
+        """
+        Prepares text for DeepL: markup is cut out, each language gets its own direction (see route),
+        and pieces longer than segment_chars are split into segments of whole sentences.
+        Returns (markup, segments) with segments as [(text, source_lang, target_lang, separator)];
+        `separator` goes after that segment's translation when they are joined.
+        """
+        markup = split_markup(text)
+        if markup.spans:
+            self.markup_saved["deepl"] += markup.saved
+            MARKUP_SAVED.observe(markup.saved, "deepl")
+
+        segments = []
+        for piece, source_lang, target_lang in route(markup.text):
+            if segments: # A change of language starts a new line, as with mixed messages before
+                segments[-1] = segments[-1][:3] + ("\n",)
+            parts = segment(piece, self.segment_chars) if len(piece) > self.segment_chars else [piece]
+            for part in parts:
+                trailing = part[len(part.rstrip()):]
+                separator = "\n" if "\n" in trailing else (" " if target_lang == "EN" else "")
+                if part.strip():
+                    segments.append((part.strip(), source_lang, target_lang, separator))
+        return markup, segments
+
+    @staticmethod
+    def join_translations(markup, segments, results, final=True):
+        """Joins segment translations in order and puts the markup back (results may still hold "…" for pending ones)."""
+        translation = "".join(result + separator for result, (_, _, _, separator) in zip(results, segments)).strip()
+        if not markup.spans:
+            return translation
+        dropped = []
+        if final: # DeepL occasionally drops a tag; keep the span rather than losing it
+            dropped = [markup.spans[index] for index in missing_spans(translation, markup.spans)]
+        return restore(translation, markup.spans) + "".join(f" {span}" for span in dropped)
+
+    async def translate_segment(self, segment_plan, guild_id=None, user_id=None, priority=NORMAL, batch=True, decision=None):
+        """Translates one planned segment; a segment that is only markup is returned as it is."""
+        text, source_lang, target_lang, _ = segment_plan
+        if not strip_placeholders(text).strip():
+            return text
+        return await self.translate_text(text, source_lang, target_lang, guild_id, user_id, priority=priority, batch=batch, decision=decision)
+
+    async def translate_routed(self, text, guild_id=None, user_id=None, priority=NORMAL):
+        """
+        Translates text in the direction its script says (Japanese -> English, anything else -> Japanese).
+        Mixed-language messages and long inputs are translated segment by segment, concurrently, and each
+        segment is cached on its own. Custom emoji, mentions, URLs and code are not sent; they are put back.
+        """
+        markup, segments = self.plan_translation(text)
+        if not segments: # Nothing but markup: there is nothing to translate
+            return text
+        return await self.translate_planned(markup, segments, guild_id, user_id, priority)
+
+    async def translate_planned(self, markup, segments, guild_id=None, user_id=None, priority=NORMAL):
+        """Translates the segments of a plan_translation() concurrently and joins the result."""
+        segments, decision, shortened = await self.budget_segments(segments, guild_id, user_id)
+        try:
+            results = await asyncio.gather(*(self.translate_segment(plan, guild_id, user_id, priority, decision=decision) for plan in segments))
+        finally:
+            self.release_budget(decision)
+        return self.with_shortened_note(self.join_translations(markup, segments, results), shortened)
+
+    async def translate_progressively(self, ctx, markup, segments, started, guild_id=None, user_id=None):
+        """
+        Replies with a placeholder at once, translates the segments concurrently in separate DeepL
+        requests, and edits the reply (overflowing into follow-ups) as they finish. Returns the final text.
+        """
+        segments, decision, shortened = await self.budget_segments(segments, guild_id, user_id)
+        total = len(segments)
+        reply = ProgressiveReply(ctx, edit_interval=self.progressive_edit_interval)
+        progress = self.error_messages.get("translate_in_progress", "翻訳中…")
+        try:
+            await reply.start(f"{self.shiba_emoji} {progress} (0/{total})")
+
+            results = ["…"] * total
+            errors = []
+
+            async def run(index, segment_plan):
+                try:
+                    results[index] = await self.translate_segment(segment_plan, guild_id, user_id, INTERACTIVE, batch=False, decision=decision)
+                except Exception as e:
+                    errors.append(e)
+                    results[index] = f"[{self.translation_error_message(e)}]"
+                finished = total - results.count("…")
+                if finished < total:
+                    reply.update(f"{self.join_translations(markup, segments, results, final=False)}\n{self.shiba_emoji} {progress} ({finished}/{total})")
+
+            await asyncio.gather(*(run(index, segment_plan) for index, segment_plan in enumerate(segments)))
+        finally:
+            self.release_budget(decision)
+        if len(errors) == total: # Nothing came back; one error beats a wall of them
+            final = f"{self.shiba_emoji} {self.translation_error_message(errors[0], log=False)}"
+        else:
+            final = self.with_shortened_note(self.join_translations(markup, segments, results), shortened)
+        await reply.finish(final)
+        if reply.first_output_at is not None:
+            TIME_TO_FIRST_OUTPUT.observe(reply.first_output_at - started, "translate", "progressive")
+        return final
+
+    def translation_error_message(self, error, log=True):
+        """Logs a failed !translate and returns the message to show for it."""
+        if isinstance(error, DeepLFormatError): # Missing keys/indices in the response
+            key, default, log_line = "translate_format_error", "翻訳結果の形式が予期せぬものでした。", f"Unexpected API response format: {error}"
+        elif isinstance(error, QuotaExceeded):
+            key, default, log_line = "translate_quota_exhausted", "翻訳の上限に達しました。しばらくしてからもう一度お試しください。", f"Translation skipped, {error}"
+        elif isinstance(error, DeepLUnavailable):
+            key, default, log_line = "translate_unavailable", "翻訳APIが一時的に利用できません。しばらくしてからもう一度お試しください。", f"Translation skipped, {error}"
+        elif isinstance(error, DeepLError):
+            key, default, log_line = "translate_api_error", "翻訳APIでエラーが発生しました。", f"Translation API error: {error}"
+        else:
+            key, default, log_line = "translate_unknown_error", "翻訳中に未知のエラーが発生しました。", f"Unexpected translation error: {error}"
+        if log:
+            print(log_line)
+        return self.error_messages.get(key, default)
+
+    async def get_readings(self, text):
+        """
+        Returns the ReadingResult for text, converting in the pool only on a memo miss.
+        Markup spans are converted as single placeholder characters and read as themselves.
+        """
+        result = self.readings_cache.get(text)
+        if result is not None:
+            self.readings_hits += 1
+            return result
+
+        if not kakasi_loader.ready:
+            raise ConverterWarmingUp(f"PyKakasi is {kakasi_loader.state}")
+
+        self.readings_misses += 1
+        markup = split_markup(text)
+        if markup.spans:
+            self.markup_saved["kakasi"] += markup.saved
+            MARKUP_SAVED.observe(markup.saved, "kakasi")
+        started = time.perf_counter()
+        result = restore_readings(await self.kks_pool.run(convert_with_kakasi, markup.text), markup)
+        KAKASI_SECONDS.observe(time.perf_counter() - started)
+        self.readings_cache.put(text, result)
+        return result
 
     async def get_text_from_context(self, ctx, text_args):
         """Helper to get text from command args or reply."""
@@ -35,8 +398,8 @@ class JpCog(commands.Cog):
         # If no text provided, check for reply
         if not text and ctx.message.reference:
             try:
-                # Fetch the replied message
-                replied_message = await ctx.channel.fetch_message(ctx.message.reference.message_id)
+                # Find the replied message, only hitting the REST API if no cache has it
+                replied_message = await self.message_resolver.resolve(ctx.channel, ctx.message.reference)
                 text = replied_message.content.strip()
             except Exception as e:
                 print(f"Error fetching replied message: {e}")
@@ -47,6 +410,21 @@ class JpCog(commands.Cog):
         return text # Return the gathered text (could still be empty)
 
 
+    # --- Keep the replied-message LRU honest ---
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload):
+        self.message_resolver.invalidate(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        self.message_resolver.invalidate(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        for message_id in payload.message_ids:
+            self.message_resolver.invalidate(message_id)
+
+
     # --- !romaji command ---
     @commands.command(name='romaji', aliases=['rj'])
     async def romaji_command(self, ctx, *text):
@@ -59,25 +437,29 @@ class JpCog(commands.Cog):
             await ctx.send(f"{self.shiba_emoji} {error_msg}")
             return
 
-        if self.kks_available and self.kks: # Check if the converter is available
-            try:
-                result = self.kks.convert(text_to_convert)
-                romaji_parts = [item['hepburn'] for item in result] # Extract Hepburn romaji
-                romaji_text = ' '.join(romaji_parts) # Join parts with spaces manually
-                response = f'{self.shiba_emoji} "{romaji_text}"'
-                await ctx.send(response) # Use ctx.send
-
-            except KeyError as e:
-                print(f"KeyError during Romaji conversion: 'hepburn' key missing in result for '{text_to_convert}'. Result: {result}")
-                error_msg = self.error_messages.get("romaji_conversion_failed", "へんかんできませんでした。")
-                await ctx.send(f"{self.shiba_emoji} {error_msg}")
-            except Exception as e:
-                print(f"Error during Romaji conversion for '{text_to_convert}': {e}")
-                error_msg = self.error_messages.get("romaji_conversion_failed", "へんかんできませんでした。")
-                await ctx.send(f"{self.shiba_emoji} {error_msg}")
-        else:
+        await ctx.send(await self.romaji_response(text_to_convert)) # Use ctx.send
+
+    async def romaji_response(self, text_to_convert):
+        """The !romaji reply for text (or the error to show instead)."""
+        if not self.kks_available: # Check if the converter is available
             error_msg = self.error_messages.get("romaji_converter_unavailable", "ローマジへんかんきはつかえません。")
-            await ctx.send(f"{self.shiba_emoji} {error_msg}")
+            return f"{self.shiba_emoji} {error_msg}"
+        try:
+            readings = await self.get_readings(text_to_convert)
+            romaji_text = render_romaji(readings) # Hepburn romaji joined with spaces
+            return f'{self.shiba_emoji} "{romaji_text}"'
+
+        except ConverterWarmingUp:
+            error_msg = self.error_messages.get("converter_warming_up", "じゅんびちゅう…すこし　まってね！ (Still warming up, try again in a moment!)")
+        except ConversionBusy:
+            error_msg = self.error_messages.get("converter_busy", "いま　いそがしいです。すこし　まってね！ (I'm busy, try again in a moment!)")
+        except ConversionTimeout:
+            print(f"Romaji conversion timed out for '{text_to_convert[:50]}...'")
+            error_msg = self.error_messages.get("conversion_timeout", "ながすぎて　へんかん　できませんでした。 (That took too long to convert.)")
+        except Exception as e:
+            print(f"Error during Romaji conversion for '{text_to_convert}': {e}")
+            error_msg = self.error_messages.get("romaji_conversion_failed", "へんかんできませんでした。")
+        return f"{self.shiba_emoji} {error_msg}"
 
 
     # --- !furigana command ---
@@ -92,39 +474,39 @@ class JpCog(commands.Cog):
             await ctx.send(f"{self.shiba_emoji} {error_msg}")
             return
 
-        if self.kks_available and self.kks: # Check if the converter is available
-            try:
-                result = self.kks.convert(text_to_convert)
-                furigana_parts = []
-                for item in result:
-                    # Check if a hiragana reading exists and is different from the original
-                    if item.get('hira') and item['orig'] != item['hira']:
-                        # Format as Original「ひらがな」
-                        furigana_parts.append(f"{item['orig']}「{item['hira']}」")
-                    else:
-                        # Otherwise, just keep the original text (already kana, punctuation, etc.)
-                        furigana_parts.append(item['orig'])
-
-                # Join the parts together
-                furigana_text = "".join(furigana_parts)
-                # Format the final response message
-                response = f"input: {text_to_convert}\nmessage: {furigana_text}"
-                await ctx.send(response) # Use ctx.send
+        await ctx.send(await self.furigana_response(text_to_convert)) # Use ctx.send
 
-            except Exception as e:
-                # Catching a general exception here, specific KeyError/IndexError might be helpful
-                print(f"Error during Furigana conversion for '{text_to_convert}': {e}")
-                error_msg = self.error_messages.get("furigana_conversion_failed", "Furigana conversion failed.")
-                await ctx.send(f"{self.shiba_emoji} {error_msg}")
-        else:
+    async def furigana_response(self, text_to_convert):
+        """The !furigana reply for text (or the error to show instead)."""
+        if not self.kks_available: # Check if the converter is available
             error_msg = self.error_messages.get("furigana_converter_unavailable", "Furigana conversion is unavailable.")
-            await ctx.send(f"{self.shiba_emoji} {error_msg}")
+            return f"{self.shiba_emoji} {error_msg}"
+        try:
+            readings = await self.get_readings(text_to_convert)
+            # Original「ひらがな」 wherever the reading differs from the original
+            furigana_text = render_furigana(readings)
+            # Format the final response message
+            return f"input: {text_to_convert}\nmessage: {furigana_text}"
+
+        except ConverterWarmingUp:
+            error_msg = self.error_messages.get("converter_warming_up", "じゅんびちゅう…すこし　まってね！ (Still warming up, try again in a moment!)")
+        except ConversionBusy:
+            error_msg = self.error_messages.get("converter_busy", "いま　いそがしいです。すこし　まってね！ (I'm busy, try again in a moment!)")
+        except ConversionTimeout:
+            print(f"Furigana conversion timed out for '{text_to_convert[:50]}...'")
+            error_msg = self.error_messages.get("conversion_timeout", "ながすぎて　へんかん　できませんでした。 (That took too long to convert.)")
+        except Exception as e:
+            # Catching a general exception here, specific KeyError/IndexError might be helpful
+            print(f"Error during Furigana conversion for '{text_to_convert}': {e}")
+            error_msg = self.error_messages.get("furigana_conversion_failed", "Furigana conversion failed.")
+        return f"{self.shiba_emoji} {error_msg}"
 
 
     # --- !translate command ---
     @commands.command(name='translate', aliases=['tl'])
     async def translate_command(self, ctx, *text):
         """Translates text using DeepL."""
+        started = time.perf_counter()
         translateMe = await self.get_text_from_context(ctx, text)
         if translateMe is None: # Error occurred while fetching reply
             return
@@ -133,59 +515,39 @@ class JpCog(commands.Cog):
             await ctx.send(f"{self.shiba_emoji} {error_msg}")
             return
 
-        # Detect language (reusing your logic)
-        # Assuming emoji.demojize handles emojis appropriately for ASCII check
-        if emoji.demojize(translateMe).isascii():
-            source_lang = 'EN'
-            target_lang = 'JA'
-        else:
-            source_lang = 'JA'
-            target_lang = 'EN'
-
-        # Get DeepL API key from environment (reusing your logic)
-        deepl_key = os.getenv('DEEPL_API_KEY')
-        if not deepl_key:
+        # Check the DeepL API key (loaded from the environment in main.py)
+        if not self.deepl.api_key:
             error_msg = self.error_messages.get("translate_no_api_key", "翻訳APIキーが設定されていません。")
             await ctx.send(f"{self.shiba_emoji} {error_msg}")
             return
 
-        url = "https://api-free.deepl.com/v2/translate" # Using the free API endpoint
-        params = {
-            'auth_key': deepl_key,
-            'text': translateMe,
-            'source_lang': source_lang,
-            'target_lang': target_lang,
-            'preserve_formatting': '0' # You might want to adjust this
-        }
-
+        guild_id = ctx.guild.id if ctx.guild else None
         try:
-            # Use aiohttp or httpx for async requests in a bot,
-            # but sticking to requests for consistency with your provided code
-            response = requests.post(url, data=params)
-            response.raise_for_status()  # Raises an HTTPError for bad responses
-            responseJSON = response.json()
-            result = responseJSON['translations'][0]['text']
+            markup, segments = self.plan_translation(translateMe)
+            if len(segments) > 1 and len(translateMe) >= self.progressive_min_chars:
+                # Long input: show each segment as soon as it is translated instead of waiting for all of them
+                result = await self.translate_progressively(ctx, markup, segments, started, guild_id, ctx.author.id)
+                print("Translated output: ", result)
+                return
+
+            if segments:
+                result = await self.translate_planned(markup, segments, guild_id, ctx.author.id, INTERACTIVE)
+            else: # Nothing but markup: there is nothing to translate
+                result = translateMe
             print("Translated output: ", result)
-            await ctx.reply(result) # Use ctx.reply
+            for page in paginate(result): # A long translation continues in follow-up messages instead of failing
+                await ctx.reply(page) # Use ctx.reply
+            TIME_TO_FIRST_OUTPUT.observe(time.perf_counter() - started, "translate", "single")
 
-        except requests.exceptions.RequestException as e:
-            print(f"Translation API error: {e}")
-            error_msg = self.error_messages.get("translate_api_error", "翻訳APIでエラーが発生しました。")
-            await ctx.send(f"{self.shiba_emoji} {error_msg}")
-        except (KeyError, IndexError): # Handle missing keys/indices in the response
-            print(f"Unexpected API response format: {response.text}")
-            error_msg = self.error_messages.get("translate_format_error", "翻訳結果の形式が予期せぬものでした。")
-            await ctx.send(f"{self.shiba_emoji} {error_msg}")
         except Exception as e:
-            print(f"Unexpected translation error: {e}")
-            error_msg = self.error_messages.get("translate_unknown_error", "翻訳中に未知のエラーが発生しました。")
-            await ctx.send(f"{self.shiba_emoji} {error_msg}")
+            await ctx.send(f"{self.shiba_emoji} {self.translation_error_message(e)}")
 
 
     # --- !full command ---
     @commands.command(name='full')
     async def full_command(self, ctx, *text):
         """Performs Furigana, Romaji, and Translation on text."""
+        started = time.perf_counter()
         original_text = await self.get_text_from_context(ctx, text)
         if original_text is None: # Error occurred while fetching reply
             return
@@ -194,116 +556,315 @@ class JpCog(commands.Cog):
             await ctx.send(f"{self.shiba_emoji} {error_msg}")
             return
 
-        # --- Perform Processing Steps ---
-        furigana_text = "Furigana conversion skipped." # Default if kks not available
-        romaji_text = "Romaji conversion skipped."   # Default if kks not available
-        deepl_translation = "Translation skipped."    # Default if API key missing or API fails
-
-        # 1. Furigana and Romaji (using kks)
-        if self.kks_available and self.kks:
-            try:
-                kks_result = self.kks.convert(original_text)
-
-                # Furigana Formatting (UPDATED)
-                furigana_parts = []
-                romaji_parts = [] # Keep romaji logic separate
-                for item in kks_result:
-                    # Furigana: orig「hira」 if hira exists and is different
-                    if item.get('hira') and item['orig'] != item['hira']:
-                        furigana_parts.append(f"{item['orig']}「{item['hira']}」")
-                    else:
-                        furigana_parts.append(item['orig']) # Keep original if no reading found
-
-                    # Romaji: collect hepburn reading (keep this as is)
-                    romaji_parts.append(item.get('hepburn', item['orig'])) # Use orig as fallback if hepburn missing
-
-                furigana_text = "".join(furigana_parts)
-                romaji_text = " ".join(romaji_parts) # Join romaji with spaces
-
-            except KeyError as e:
-                print(f"KeyError during kks conversion for !full: {e} in result: {kks_result}")
-                furigana_text = self.error_messages.get("full_conversion_failed", "Furigana/Romaji conversion failed (format error).")
-                romaji_text = self.error_messages.get("full_conversion_failed", "Furigana/Romaji conversion failed (format error).")
-            except Exception as e:
-                print(f"Error during kks conversion for !full: {e}")
-                furigana_text = self.error_messages.get("full_conversion_failed", "Furigana/Romaji conversion failed.")
-                romaji_text = self.error_messages.get("full_conversion_failed", "Furigana/Romaji conversion failed.")
-        else:
-            furigana_text = self.error_messages.get("full_converter_unavailable", "Japanese converter unavailable.")
-            romaji_text = self.error_messages.get("full_converter_unavailable", "Japanese converter unavailable.")
-
-
-        # 2. DeepL Translation
-        deepl_key = os.getenv('DEEPL_API_KEY')
-        if not deepl_key:
-            deepl_translation = self.error_messages.get("full_no_api_key", "Translation API key not set.")
-            # No return here, we want to send the partial result if available
-
-        else:
-            url = "https://api-free.deepl.com/v2/translate"
-            # Detect language for translation source/target (reusing your logic)
-            if emoji.demojize(original_text).isascii():
-                source_lang = 'EN'
-                target_lang = 'JA'
-            else:
-                source_lang = 'JA'
-                target_lang = 'EN'
-
-            params = {
-                'auth_key': deepl_key,
-                'text': original_text,
-                'source_lang': source_lang,
-                'target_lang': target_lang,
-                 'preserve_formatting': '0' # You might want to adjust this
-            }
-
-            try:
-                # Using requests as in your original code
-                response = requests.post(url, data=params)
-                response.raise_for_status() # Raises an HTTPError for bad responses
-                responseJSON = response.json()
-                deepl_translation = responseJSON.get('translations', [{}])[0].get('text', "Translation result not found in API response.")
-                print("DeepL Translation output: ", deepl_translation)
-
-            except requests.exceptions.RequestException as e:
-                print(f"DeepL API error for !full: {e}")
-                deepl_translation = self.error_messages.get("full_api_error", "Translation API error.")
-            except (KeyError, IndexError): # Handle missing keys/indices
-                print(f"Unexpected API response format for !full: {response.text}")
-                deepl_translation = self.error_messages.get("full_api_format_error", "Translation API format error.")
-            except Exception as e:
-                print(f"Unexpected translation error: {e}")
-                deepl_translation = self.error_messages.get("full_translation_unknown_error", "Unknown translation error.")
+        guild_id = ctx.guild.id if ctx.guild else None
+        await self.respond_full(ctx, original_text, guild_id, ctx.author.id, started, "full")
 
+    async def respond_full(self, messageable, original_text, guild_id, user_id, started, command, **send_kwargs):
+        """
+        Sends the !full output through messageable: readings as soon as kks is done, then the
+        translation edited into the same message. send_kwargs go to every send (see send_pages).
+        """
+        # The DeepL round trip starts now and runs while kks converts locally
+        translation_task = asyncio.create_task(self.full_translation(original_text, guild_id, user_id))
+        furigana_text, romaji_text = await self.full_readings(original_text)
 
         # --- Format and Send Final Response ---
-        # Using triple backticks for a clean code block format in Discord
-        response_message = f"""```
-{original_text}
-{furigana_text}
-{romaji_text}
+        # Discord has a message length limit (typically 2000 characters), so long output
+        # is split into code-block pages on line/word boundaries and served with buttons
+        def render_pages(translation):
+            body = full_body(original_text, furigana_text, romaji_text, translation)
+            return with_page_numbers(paginate(body, header="```\n", footer="\n```"))
+
+        if translation_task.done(): # Cached (or no API key): everything is ready, send it once
+            await send_pages(messageable, render_pages(translation_task.result()), author_id=user_id, **send_kwargs)
+            TIME_TO_FIRST_OUTPUT.observe(time.perf_counter() - started, command, "translation")
+            return
 
-{deepl_translation}
-```""" # Added a newline before translation for clarity
+        # Readings first, then the translation is edited into the same message
+        pending = self.error_messages.get("full_translation_pending", "Translating…")
+        try:
+            message, view = await send_updatable_pages(messageable, render_pages(pending), author_id=user_id, **send_kwargs)
+        except Exception:
+            translation_task.cancel()
+            raise
+        TIME_TO_FIRST_OUTPUT.observe(time.perf_counter() - started, command, "readings")
 
-        # Discord has a message length limit (typically 2000 characters)
-        if len(response_message) > 1900: # Leave some buffer
-            response_message = response_message[:1900] + "\n... (Output truncated due to length)"
+        deepl_translation = await translation_task
+        try:
+            await update_pages(message, render_pages(deepl_translation), view, author_id=user_id)
+        except discord.HTTPException as e:
+            print(f"Error editing the translation into {command} output: {e}")
+            return
+        TIME_TO_FIRST_OUTPUT.observe(time.perf_counter() - started, command, "translation")
 
-        await ctx.send(response_message)
+    async def full_readings(self, original_text):
+        """Furigana and romaji for !full; on failure both are the error message to show instead."""
+        if not self.kks_available:
+            unavailable = self.error_messages.get("full_converter_unavailable", "Japanese converter unavailable.")
+            return unavailable, unavailable
+        try:
+            # One conversion (memoized) feeds both renderers
+            readings = await self.get_readings(original_text)
+            return render_furigana(readings), render_romaji(readings)
+
+        except ConverterWarmingUp:
+            error_msg = self.error_messages.get("converter_warming_up", "Japanese converter is still warming up, try again in a moment.")
+        except ConversionBusy:
+            error_msg = self.error_messages.get("converter_busy", "Japanese converter is busy, try again in a moment.")
+        except ConversionTimeout:
+            print(f"kks conversion timed out for !full ({len(original_text)} chars)")
+            error_msg = self.error_messages.get("conversion_timeout", "Furigana/Romaji conversion took too long.")
+        except KeyError as e:
+            print(f"KeyError during kks conversion for !full: {e}")
+            error_msg = self.error_messages.get("full_conversion_failed", "Furigana/Romaji conversion failed (format error).")
+        except Exception as e:
+            print(f"Error during kks conversion for !full: {e}")
+            error_msg = self.error_messages.get("full_conversion_failed", "Furigana/Romaji conversion failed.")
+        return error_msg, error_msg
+
+    async def full_translation(self, original_text, guild_id=None, user_id=None):
+        """The translation for !full, or the error message to show in its place."""
+        if not self.deepl.api_key:
+            return self.error_messages.get("full_no_api_key", "Translation API key not set.")
+        try:
+            deepl_translation = await self.translate_routed(original_text, guild_id, user_id)
+            print("DeepL Translation output: ", deepl_translation)
+            return deepl_translation
+
+        except DeepLFormatError as e: # Handle missing keys/indices
+            print(f"Unexpected API response format for !full: {e}")
+            return self.error_messages.get("full_api_format_error", "Translation API format error.")
+        except QuotaExceeded as e:
+            print(f"Translation skipped for !full, {e}")
+            return self.error_messages.get("full_quota_exhausted", "Translation budget used up; only cached translations are available.")
+        except DeepLUnavailable as e:
+            print(f"Translation skipped for !full, {e}")
+            return self.error_messages.get("full_api_unavailable", "Translation API temporarily unavailable.")
+        except DeepLError as e:
+            print(f"DeepL API error for !full: {e}")
+            return self.error_messages.get("full_api_error", "Translation API error.")
+        except Exception as e:
+            print(f"Unexpected translation error: {e}")
+            return self.error_messages.get("full_translation_unknown_error", "Unknown translation error.")
+
+
+    # --- Slash commands and message context menus ---
+    # The text comes in the interaction payload (a context menu gets the whole target message), so nothing
+    # is fetched and no message content intent is needed. Every handler defers first, well inside Discord's
+    # 3 second deadline, and answers with ephemeral followups.
+    async def answer_interaction(self, interaction, text, respond, no_input_key, no_input_default):
+        """Defers, then sends `await respond(text)` (or the no-input error) as ephemeral followups."""
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        text = text.strip()
+        if not text: # Whitespace only, or a message with just attachments/embeds
+            response = f"{self.shiba_emoji} {self.error_messages.get(no_input_key, no_input_default)}"
+        else:
+            response = await respond(text)
+        for page in paginate(response): # Too long for one followup: continue in more
+            await interaction.followup.send(page, ephemeral=True)
+
+    async def translate_response(self, text, guild_id=None, user_id=None):
+        """The translation reply for slash commands and context menus (or the error to show instead)."""
+        if not self.deepl.api_key:
+            error_msg = self.error_messages.get("translate_no_api_key", "翻訳APIキーが設定されていません。")
+            return f"{self.shiba_emoji} {error_msg}"
+        try:
+            result = await self.translate_routed(text, guild_id, user_id, INTERACTIVE)
+            print("Translated output: ", result)
+            return result
+        except Exception as e:
+            return f"{self.shiba_emoji} {self.translation_error_message(e)}"
+
+    @app_commands.command(name="romaji", description="Converts Japanese text to romaji.")
+    @app_commands.describe(text="Japanese text to convert")
+    async def romaji_slash(self, interaction: discord.Interaction, text: str):
+        await self.answer_interaction(interaction, text, self.romaji_response, "romaji_no_input", "テキストをいれてください。")
+
+    @app_commands.command(name="furigana", description="Adds furigana readings to Japanese text.")
+    @app_commands.describe(text="Japanese text to convert")
+    async def furigana_slash(self, interaction: discord.Interaction, text: str):
+        await self.answer_interaction(interaction, text, self.furigana_response, "furigana_no_input", "Please provide Japanese text to convert to Furigana.")
+
+    @app_commands.command(name="translate", description="Translates Japanese to English, anything else to Japanese.")
+    @app_commands.describe(text="Text to translate")
+    async def translate_slash(self, interaction: discord.Interaction, text: str):
+        async def respond(text):
+            return await self.translate_response(text, interaction.guild_id, interaction.user.id)
+        await self.answer_interaction(interaction, text, respond, "translate_no_input", "翻訳するテキストを入力してください。")
+
+    @app_commands.command(name="full", description="Furigana, romaji and translation of text.")
+    @app_commands.describe(text="Text to process")
+    async def full_slash(self, interaction: discord.Interaction, text: str):
+        started = time.perf_counter()
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        text = text.strip()
+        if not text:
+            error_msg = self.error_messages.get("full_no_input", "Please provide text or reply to a message for full processing.")
+            await interaction.followup.send(f"{self.shiba_emoji} {error_msg}", ephemeral=True)
+            return
+        # wait=True returns the followup message, so the translation can be edited into it
+        await self.respond_full(interaction.followup, text, interaction.guild_id, interaction.user.id, started, "/full", ephemeral=True, wait=True)
+
+    async def translate_message_menu(self, interaction: discord.Interaction, message: discord.Message):
+        """Message context menu "Translate"."""
+        async def respond(text):
+            return await self.translate_response(text, interaction.guild_id, interaction.user.id)
+        await self.answer_interaction(interaction, message.content, respond, "translate_no_input", "翻訳するテキストを入力してください。")
+
+    async def furigana_message_menu(self, interaction: discord.Interaction, message: discord.Message):
+        """Message context menu "Furigana"."""
+        await self.answer_interaction(interaction, message.content, self.furigana_response, "furigana_no_input", "Please provide Japanese text to convert to Furigana.")
+
+    # --- !cachestats command (owner only) ---
+    @commands.command(name='cachestats', hidden=True)
+    @commands.is_owner()
+    async def cachestats_command(self, ctx):
+        """Shows translation cache hit/miss counters."""
+        stats = self.translation_cache.stats()
+        lines = [f"{key}: {value:.2%}" if key == "hit_rate" else f"{key}: {value}" for key, value in stats.items()]
+        batch_stats = self.translation_batcher.stats()
+        lines.append(f"batched_requests: {batch_stats['requests']} in {batch_stats['batches']} DeepL calls")
+        lines.append(f"markup_chars_saved: {self.markup_saved['deepl']} DeepL, {self.markup_saved['kakasi']} kakasi")
+        if self.deepl_dispatcher is not None:
+            dispatch = self.deepl_dispatcher.stats()
+            lines.append(
+                f"deepl: breaker {dispatch['breaker']}, queue {dispatch['queue_depth']}, {dispatch['retries']} retries, "
+                f"{dispatch['failed']} failed, {dispatch['rejected']} failed fast"
+            )
+        resolver_stats = self.message_resolver.stats()
+        lines.append(
+            f"replied_messages: {resolver_stats['lookups']} lookups, {resolver_stats['rest']} REST fetches "
+            f"({resolver_stats['rest_saved']} saved, {resolver_stats['hit_rate']:.2%})"
+        )
+        await ctx.send(f"{self.shiba_emoji} Translation cache\n```\n" + "\n".join(lines) + "\n```")
+
+    # --- !quota command (owner only) ---
+    @commands.command(name='quota', hidden=True)
+    @commands.is_owner()
+    async def quota_command(self, ctx):
+        """Shows the remaining DeepL budget and the biggest consumers over the last 30 days."""
+        if self.quota is None:
+            await ctx.send(f"{self.shiba_emoji} DeepL quota accounting is disabled.")
+            return
+        await self.quota.refresh()
+        stats = self.quota.stats()
+        synced = "never" if stats["synced_at"] is None else f"{(time.time() - stats['synced_at']) / 60:.0f} min ago"
+        remaining = self.quota.remaining(ctx.guild.id if ctx.guild else None, ctx.author.id)
+        guild_left = "unlimited" if remaining["guild"] is None else f"{remaining['guild']} left"
+        user_left = "unlimited" if remaining["user"] is None else f"{remaining['user']} left"
+        lines = [
+            f"account: {stats['account_remaining']} of {stats['account_limit']} characters left (synced {synced})"
+            + (" - EXHAUSTED, cache only" if stats["exhausted"] else ""),
+            f"today: {stats['today']} characters",
+            f"this guild today: {guild_left}",
+            f"you today: {user_left}",
+            f"decisions: {stats['decisions']}",
+        ]
+        for column, label in (("guild_id", "top guilds"), ("user_id", "top users")):
+            top = await self.quota.top_consumers(column, days=30)
+            lines.append(f"{label} (30 days):")
+            lines += [f"  {consumer_id}: {characters} chars in {requests} requests" for consumer_id, characters, requests in top] or ["  (none)"]
+        await ctx.send(f"{self.shiba_emoji} DeepL quota\n```\n" + "\n".join(lines) + "\n```")
+
+    # --- !poolstats command (owner only) ---
+    @commands.command(name='poolstats', hidden=True)
+    @commands.is_owner()
+    async def poolstats_command(self, ctx):
+        """Shows conversion pool latency and queue-wait metrics."""
+        stats = self.kks_pool.stats()
+        stats["readings_memo_hits"] = self.readings_hits
+        stats["readings_memo_misses"] = self.readings_misses
+        stats["kakasi_state"] = kakasi_loader.state
+        lines = [f"{key}: {value:.1f}" if isinstance(value, float) else f"{key}: {value}" for key, value in stats.items()]
+        await ctx.send(f"{self.shiba_emoji} Conversion pool\n```\n" + "\n".join(lines) + "\n```")
 
 
 # --- Setup function (Conventional for loading extensions) ---
 # This function is called by bot.load_extension
 async def setup(bot):
     """Adds the JpCog to the bot, retrieving resources from the bot instance."""
-    # Retrieve the resources that main.py attached to the bot instance
-    error_messages = getattr(bot, 'error_messages', {})
-    # Note: SHIBA_EMOJI is stored inside bot.config in main.py
-    shiba_emoji = bot.config.get('shiba_emoji_string', '<:shiba:default_id>') # Use a default in case config wasn't loaded
+    # Error messages and the SHIBA emoji are read from the bot on every use (see the properties on JpCog),
+    # so a config reload is picked up without reloading the cog.
+
+    # One pooled DeepL client shared by every translation path; closed in cog_unload
+    deepl_client = DeepLClient(
+        api_key=bot.config.get('deepl_api_key'),
+        url=bot.config.get('deepl_api_url', DEFAULT_DEEPL_URL),
+        timeout=bot.config.get('deepl_timeout', 10.0),
+        max_concurrency=bot.config.get('deepl_max_concurrency', 4),
+    )
+    await deepl_client.start()
+
+    # Priority queue, retries with backoff and a circuit breaker in front of the client
+    deepl_dispatcher = DeepLDispatcher(
+        deepl_client,
+        workers=bot.config.get('deepl_max_concurrency', 4),
+        max_queue=bot.config.get('deepl_queue_size', 256),
+        max_retries=bot.config.get('deepl_max_retries', 3),
+        base_delay=bot.config.get('deepl_retry_base_delay', 0.5),
+        max_wait=bot.config.get('deepl_retry_max_wait', 20.0),
+        breaker=CircuitBreaker(
+            failure_threshold=bot.config.get('deepl_breaker_threshold', 5),
+            cooldown=bot.config.get('deepl_breaker_cooldown', 30.0),
+        ),
+    )
+    await deepl_dispatcher.start()
+
+    # Two-tier translation cache: in-memory LRU plus an optional SQLite file that survives restarts
+    translation_cache = TranslationCache(
+        max_size=bot.config.get('translation_cache_size', 2048),
+        ttl=bot.config.get('translation_cache_ttl', 6 * 3600),
+        db_path=bot.config.get('translation_cache_db'),
+        db_max_rows=bot.config.get('translation_cache_db_max_rows', 50000),
+        db_ttl=bot.config.get('translation_cache_db_ttl', 30 * 86400),
+    )
+
+    # Micro-batching stage between the cache and DeepL
+    translation_batcher = TranslationBatcher(
+        deepl_dispatcher,
+        window=bot.config.get('deepl_batch_window', 0.05),
+        max_texts=bot.config.get('deepl_batch_max_texts', 50),
+        max_chars=bot.config.get('deepl_batch_max_chars', 30000),
+    )
+
+    # Load the PyKakasi dictionaries in the background; commands check kakasi_loader.state
+    kakasi_loader.start()
+
+    # Worker pool for pykakasi so long inputs never stall the gateway
+    kks_pool = ConversionPool(
+        mode=bot.config.get('kks_pool_mode', 'thread'),
+        max_workers=bot.config.get('kks_pool_workers', 2),
+        max_queue=bot.config.get('kks_pool_max_queue', 16),
+        timeout=bot.config.get('kks_pool_timeout', 5.0),
+    )
+
+    # DeepL character accounting (persistent per guild/user/day) with budgets and degrade modes
+    quota = QuotaAccountant(
+        SQLiteUsageStore(bot.config.get('deepl_usage_db')),
+        account_limit=bot.config.get('deepl_account_limit', 500000),
+        daily_limit=bot.config.get('deepl_daily_limit', 0),
+        guild_daily_limit=bot.config.get('deepl_guild_daily_limit', 0),
+        user_daily_limit=bot.config.get('deepl_user_daily_limit', 0),
+        low_watermark=bot.config.get('deepl_low_watermark', 0.05),
+        shorten_to=bot.config.get('deepl_shorten_to', 300),
+        exhausted_for=bot.config.get('deepl_exhausted_for', 3600),
+        shared_refresh=bot.config.get('deepl_usage_refresh', 0),
+    )
 
     # Create an instance of the cog, passing the bot and resources
-    cog_instance = JpCog(bot, error_messages, shiba_emoji)
+    cog_instance = JpCog(
+        bot, deepl_client, translation_cache, translation_batcher, kks_pool,
+        readings_cache_size=bot.config.get('readings_cache_size', 256),
+        command_channel_rate=bot.config.get('command_channel_rate', 1.0),
+        command_channel_burst=bot.config.get('command_channel_burst', 5),
+        message_cache_size=bot.config.get('message_cache_size', 512),
+        quota=quota,
+        quota_sync_interval=bot.config.get('deepl_usage_sync_interval', 900),
+        deepl_dispatcher=deepl_dispatcher,
+        segment_chars=bot.config.get('translate_segment_chars', 400),
+        progressive_min_chars=bot.config.get('translate_progressive_min_chars', 800),
+        progressive_edit_interval=bot.config.get('translate_edit_interval', 1.0),
+    )
 
     # Add the instance to the bot
     await bot.add_cog(cog_instance)
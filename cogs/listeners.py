@@ -1,7 +1,11 @@
 import discord
 from discord.ext import commands
 import random
-import time # For the sleep effect
+from utils.reply_scheduler import ReplyScheduler # For the non-blocking pause effect
+from utils.rate_limit import ReplyLimiter # Per-channel/per-guild budgets for triggered replies
+from utils.metrics import REGISTRY # Prometheus-style counters
+
+TRIGGER_HITS = REGISTRY.counter("shibako_trigger_hits_total", "Messages that matched a trigger phrase, by phrase name and outcome.", ("phrase", "outcome"))
 
 class ListenerCog(commands.Cog, name="Message Listeners"):
     """
@@ -9,6 +13,28 @@ class ListenerCog(commands.Cog, name="Message Listeners"):
     """
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Delayed replies are queued per channel instead of sleeping on the event loop
+        self.reply_scheduler = ReplyScheduler(default_delay=1.0, max_queue=bot.config.get('trigger_reply_queue', 20))
+        # Token buckets per channel and per guild, plus burst coalescing of identical triggers
+        self.reply_limiter = ReplyLimiter(
+            channel_rate=bot.config.get('trigger_channel_rate', 0.5),
+            channel_burst=bot.config.get('trigger_channel_burst', 3),
+            guild_rate=bot.config.get('trigger_guild_rate', 2.0),
+            guild_burst=bot.config.get('trigger_guild_burst', 10),
+            coalesce_window=bot.config.get('trigger_coalesce_window', 5.0),
+        )
+
+    async def cog_unload(self):
+        """Cancels any triggered replies that are still waiting to be sent."""
+        await self.reply_scheduler.close()
+
+    def cache_sizes(self):
+        """Entries held by this cog, for the memory report."""
+        return {
+            "trigger_channel_buckets": len(self.reply_limiter.channels),
+            "trigger_guild_buckets": len(self.reply_limiter.guilds),
+            "pending_trigger_replies": self.reply_scheduler.pending(),
+        }
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -25,16 +51,21 @@ class ListenerCog(commands.Cog, name="Message Listeners"):
         if message.content.startswith(self.bot.command_prefix):
             return
 
-        msg_lower = message.content.lower()
         message_sender_id = message.author.id
 
-        # Access trigger map and rude response config from the bot instance
-        # These should be attached to self.bot in your main shibako_bot.py
-        trigger_map = getattr(self.bot, 'trigger_map', {})
-        rude_response_config = getattr(self.bot, 'rude_response_config', {})
+        # Read the config snapshot once so a hot reload can't swap it halfway through this message
+        # (the snapshot is attached to self.bot in your main shibako_bot.py)
+        phrase_config = getattr(self.bot, 'phrase_config', None)
+        trigger_matcher = getattr(phrase_config, 'trigger_matcher', None)
+        trigger_map = getattr(phrase_config, 'trigger_map', {})
+        rude_response_config = getattr(phrase_config, 'rude_response_config', {})
         shiba_emoji = getattr(self.bot.config, 'shiba_emoji_string', '<:shiba:1363005589902589982>') # Default if not found
 
-        matched_config = trigger_map.get(msg_lower)
+        if trigger_matcher is not None:
+            # Single pass over the normalized message, however many triggers there are
+            matched_config = trigger_matcher.match(message.content)
+        else:
+            matched_config = trigger_map.get(message.content.lower())
 
         if matched_config:
             allow_rude = matched_config.get('allow_rude', False)
@@ -45,24 +76,27 @@ class ListenerCog(commands.Cog, name="Message Listeners"):
             rude_template = rude_response_config.get('message', '')
 
             should_be_rude = allow_rude and random.random() < rude_chance
+            rude_reply = should_be_rude and rude_template and '{message_sender}' in rude_template
+
+            # Drop the reply if this channel/guild is over budget or the same trigger just fired here
+            guild_id = message.guild.id if message.guild else None
+            reply_count = 2 if rude_reply and rude_prefix else 1
+            phrase_name = matched_config.get('name', 'unknown')
+            if not self.reply_limiter.allow(message.channel.id, guild_id, phrase_name, cost=reply_count):
+                TRIGGER_HITS.inc(phrase_name, "suppressed")
+                return
+            TRIGGER_HITS.inc(phrase_name, "rude" if rude_reply else "replied")
+
+            # Replies are queued per channel; the scheduler handles send errors itself
+            if rude_reply:
+                if rude_prefix:
+                    self.reply_scheduler.schedule(message.channel, rude_prefix) # Keep the pause effect
+
+                formatted_rude_message = rude_template.format(message_sender=f"<@{message_sender_id}>") # Mention user
+                self.reply_scheduler.schedule(message.channel, formatted_rude_message)
+            else:
+                self.reply_scheduler.schedule(message.channel, standard_response) # Keep the pause effect
 
-            try:
-                if should_be_rude and rude_template and '{message_sender}' in rude_template:
-                    if rude_prefix:
-                        time.sleep(1) # Keep the pause effect
-                        await message.channel.send(rude_prefix)
-                    
-                    formatted_rude_message = rude_template.format(message_sender=f"<@{message_sender_id}>") # Mention user
-                    time.sleep(1)
-                    await message.channel.send(formatted_rude_message)
-                else:
-                    time.sleep(1) # Keep the pause effect
-                    await message.channel.send(standard_response)
-            except discord.errors.Forbidden:
-                 print(f"Error (ListenerCog): Cannot send triggered response in channel {message.channel.id}. Missing permissions?")
-            except Exception as e:
-                 print(f"Error (ListenerCog) sending triggered response: {e}")
-            
             # Important: Do NOT call bot.process_commands(message) here.
             # That should be handled in your main bot file's on_message,
             # or this listener will prevent commands from being processed if it matches a trigger.
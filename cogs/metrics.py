@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+from discord.ext import commands
+
+from utils.deepl_dispatcher import BREAKER_STATES
+from utils.metrics import REGISTRY, MetricsServer
+
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+GATEWAY_LATENCY = REGISTRY.gauge("shibako_gateway_latency_seconds", "Heartbeat latency per shard (bot.latency).", ("shard",))
+GUILDS = REGISTRY.gauge("shibako_guilds", "Guilds per shard.", ("shard",))
+LOOP_LAG = REGISTRY.histogram("shibako_event_loop_lag_seconds", "How late the event loop woke a sleeping probe task.", buckets=LOOP_LAG_BUCKETS)
+LOOP_LAG_LAST = REGISTRY.gauge("shibako_event_loop_lag_last_seconds", "Most recent event loop lag sample.")
+CACHE_LOOKUPS = REGISTRY.counter("shibako_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+CACHE_HIT_RATE = REGISTRY.gauge("shibako_cache_hit_ratio", "Share of lookups served without the expensive path.", ("cache",))
+CACHE_ENTRIES = REGISTRY.gauge("shibako_cache_entries", "Entries held per cache.", ("cache",))
+KKS_POOL_QUEUE = REGISTRY.gauge("shibako_kakasi_pool_queue_depth", "Conversions waiting for a pool worker.")
+KKS_POOL_JOBS = REGISTRY.counter("shibako_kakasi_pool_jobs_total", "Conversion pool jobs by outcome.", ("outcome",))
+DEEPL_QUOTA_REMAINING = REGISTRY.gauge("shibako_deepl_quota_remaining_characters", "DeepL characters left in the billing period (estimate between syncs).")
+DEEPL_QUOTA_DECISIONS = REGISTRY.counter("shibako_deepl_quota_decisions_total", "Translation budget decisions by mode.", ("mode",))
+DEEPL_BREAKER = REGISTRY.gauge("shibako_deepl_breaker_state", "DeepL circuit breaker: 0 closed, 1 half-open, 2 open.")
+DEEPL_QUEUE = REGISTRY.gauge("shibako_deepl_queue_depth", "DeepL requests waiting for a dispatcher worker.")
+DEEPL_RETRY_WAITING = REGISTRY.gauge("shibako_deepl_retry_waiting", "DeepL requests sleeping through a backoff before their next try.")
+TRIGGER_SUPPRESSED = REGISTRY.counter("shibako_trigger_suppressed_total", "Trigger replies dropped by the rate limiter, by reason.", ("reason",))
+
+
+def _hit_rate(hits, total):
+    return hits / total if total else 0.0
+
+
+class MetricsCog(commands.Cog, name="Metrics"):
+    """
+    Serves Prometheus metrics and samples event-loop lag.
+
+    Counters and histograms on hot paths are recorded where they happen
+    (commands, triggers, DeepL, kakasi). Numbers other cogs already keep,
+    such as cache hit counts, are copied in only when /metrics is scraped.
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.server = None
+        self.lag_interval = bot.config.get('loop_lag_interval', 0.5)
+        self._lag_task = None
+
+    async def cog_load(self):
+        REGISTRY.add_collector(self.collect)
+        self._lag_task = asyncio.create_task(self.sample_loop_lag(), name="shibako-loop-lag")
+        port = self.bot.config.get('metrics_port', 0)
+        if port:
+            self.server = MetricsServer(REGISTRY, host=self.bot.config.get('metrics_host', '127.0.0.1'), port=port)
+            try:
+                await self.server.start()
+            except OSError as e:
+                print(f"Error (MetricsCog): Could not serve metrics on port {port}: {e}")
+                self.server = None
+
+    async def cog_unload(self):
+        REGISTRY.remove_collector(self.collect)
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self.server is not None:
+            await self.server.close()
+
+    async def sample_loop_lag(self):
+        """Sleeps for lag_interval over and over; any extra time before waking up is loop lag."""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, time.perf_counter() - started - self.lag_interval)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+
+    def collect(self):
+        """Copies gauges and counts kept elsewhere into the registry (runs on every scrape)."""
+        for shard_id, shard in self.bot.shard_stats().items():
+            if shard["latency_ms"] is not None:
+                GATEWAY_LATENCY.set(shard["latency_ms"] / 1000, shard_id)
+            GUILDS.set(shard["guilds"], shard_id)
+
+        jp_cog = self.bot.get_cog("JpCog")
+        if jp_cog is not None:
+            cache = jp_cog.translation_cache.stats()
+            CACHE_LOOKUPS.set(cache["memory_hits"], "translation", "memory_hit")
+            CACHE_LOOKUPS.set(cache["disk_hits"], "translation", "disk_hit")
+            CACHE_LOOKUPS.set(cache["misses"], "translation", "miss")
+            CACHE_HIT_RATE.set(cache["hit_rate"], "translation")
+
+            CACHE_LOOKUPS.set(jp_cog.readings_hits, "readings", "hit")
+            CACHE_LOOKUPS.set(jp_cog.readings_misses, "readings", "miss")
+            CACHE_HIT_RATE.set(_hit_rate(jp_cog.readings_hits, jp_cog.readings_hits + jp_cog.readings_misses), "readings")
+
+            resolver = jp_cog.message_resolver.stats()
+            for source in jp_cog.message_resolver.SOURCES:
+                CACHE_LOOKUPS.set(resolver[source], "replied_message", source)
+            CACHE_HIT_RATE.set(resolver["hit_rate"], "replied_message")
+
+            for name, count in jp_cog.cache_sizes().items():
+                CACHE_ENTRIES.set(count, name)
+
+            if jp_cog.quota is not None:
+                quota = jp_cog.quota.stats()
+                DEEPL_QUOTA_REMAINING.set(quota["account_remaining"])
+                for mode, count in quota["decisions"].items():
+                    DEEPL_QUOTA_DECISIONS.set(count, mode)
+
+            if jp_cog.deepl_dispatcher is not None:
+                dispatch = jp_cog.deepl_dispatcher.stats()
+                DEEPL_BREAKER.set(BREAKER_STATES.index(dispatch["breaker"]))
+                DEEPL_QUEUE.set(dispatch["queue_depth"])
+                DEEPL_RETRY_WAITING.set(dispatch["waiting_retry"])
+
+            pool = jp_cog.kks_pool.stats()
+            KKS_POOL_QUEUE.set(pool["queue_depth"])
+            for outcome in ("completed", "rejected", "timeouts", "failed"):
+                KKS_POOL_JOBS.set(pool[outcome], outcome)
+
+        listener_cog = self.bot.get_cog("Message Listeners")
+        if listener_cog is not None:
+            limiter = listener_cog.reply_limiter.stats()
+            for reason in ("coalesced", "suppressed_channel", "suppressed_guild"):
+                TRIGGER_SUPPRESSED.set(limiter[reason], reason)
+
+
+# This setup function is required for the cog to be loaded
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MetricsCog(bot))
+    print("MetricsCog loaded.")
@@ -1,72 +1,112 @@
 import discord
 from discord.ext import commands
 import os 
-import json
 import asyncio
+import time
 from dotenv import load_dotenv
+from utils.config_loader import PhraseConfig, ConfigError, load_phrase_config
+from utils.rate_limit import ResponseBudgetExceeded
+from utils.kakasi_loader import kakasi_loader, KakasiLoader
+from utils.memory import build_intents, client_cache_options
+from utils.metrics import REGISTRY
+from utils.loop_watchdog import LoopWatchdog
+from utils.app_command_sync import sync_if_changed
+
+COMMAND_SECONDS = REGISTRY.histogram("shibako_command_seconds", "Command latency from invoke to completion.", ("cog", "command", "status"))
+
+BOOT_STARTED = time.perf_counter() # Reference point for the boot timings printed in on_ready
 
 # Load environment variables from .env file
 load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 DEEPL_API_KEY = os.getenv("DEEPL_API_KEY")
+DEEPL_API_URL = os.getenv("DEEPL_API_URL", "https://api-free.deepl.com/v2/translate") # Free API endpoint by default
+DEEPL_TIMEOUT = float(os.getenv("DEEPL_TIMEOUT", "10")) # Seconds per DeepL request
+DEEPL_MAX_CONCURRENCY = int(os.getenv("DEEPL_MAX_CONCURRENCY", "4")) # DeepL requests allowed in flight at once
+DEEPL_QUEUE_SIZE = int(os.getenv("DEEPL_QUEUE_SIZE", "256")) # DeepL requests allowed to wait before new ones fail fast
+DEEPL_MAX_RETRIES = int(os.getenv("DEEPL_MAX_RETRIES", "3")) # Retries after a timeout, network error, 429 or 5xx
+DEEPL_RETRY_BASE_DELAY = float(os.getenv("DEEPL_RETRY_BASE_DELAY", "0.5")) # First backoff in seconds, doubled per retry (Retry-After wins)
+DEEPL_RETRY_MAX_WAIT = float(os.getenv("DEEPL_RETRY_MAX_WAIT", "20")) # Stop retrying once a request has waited this long
+DEEPL_BREAKER_THRESHOLD = int(os.getenv("DEEPL_BREAKER_THRESHOLD", "5")) # Failures in a row that open the circuit breaker
+DEEPL_BREAKER_COOLDOWN = float(os.getenv("DEEPL_BREAKER_COOLDOWN", "30")) # Seconds to fail fast before probing DeepL again
+DEEPL_BATCH_WINDOW = float(os.getenv("DEEPL_BATCH_WINDOW", "0.05")) # Seconds to collect translations before sending a batch
+DEEPL_BATCH_MAX_TEXTS = int(os.getenv("DEEPL_BATCH_MAX_TEXTS", "50")) # DeepL allows up to 50 texts per request
+DEEPL_BATCH_MAX_CHARS = int(os.getenv("DEEPL_BATCH_MAX_CHARS", "30000")) # Keeps each request well under DeepL's size limit
+KKS_POOL_MODE = os.getenv("KKS_POOL_MODE", "thread") # "thread" or "process"
+KKS_POOL_WORKERS = int(os.getenv("KKS_POOL_WORKERS", "2")) # Conversions that may run at once
+KKS_POOL_MAX_QUEUE = int(os.getenv("KKS_POOL_MAX_QUEUE", "16")) # Waiting conversions before replying "busy"
+KKS_POOL_TIMEOUT = float(os.getenv("KKS_POOL_TIMEOUT", "5")) # Seconds per conversion
+READINGS_CACHE_SIZE = int(os.getenv("READINGS_CACHE_SIZE", "256")) # Memoized romaji/furigana conversions
+TRIGGER_CHANNEL_RATE = float(os.getenv("TRIGGER_CHANNEL_RATE", "0.5")) # Trigger replies per second per channel
+TRIGGER_CHANNEL_BURST = int(os.getenv("TRIGGER_CHANNEL_BURST", "3"))
+TRIGGER_GUILD_RATE = float(os.getenv("TRIGGER_GUILD_RATE", "2")) # Trigger replies per second per guild
+TRIGGER_GUILD_BURST = int(os.getenv("TRIGGER_GUILD_BURST", "10"))
+TRIGGER_COALESCE_WINDOW = float(os.getenv("TRIGGER_COALESCE_WINDOW", "5")) # Seconds during which a repeated trigger gets no second reply
+TRIGGER_REPLY_QUEUE = int(os.getenv("TRIGGER_REPLY_QUEUE", "20")) # Delayed replies waiting per channel before the oldest is dropped
+COMMAND_CHANNEL_RATE = float(os.getenv("COMMAND_CHANNEL_RATE", "1")) # JpCog command replies per second per channel
+COMMAND_CHANNEL_BURST = int(os.getenv("COMMAND_CHANNEL_BURST", "5"))
+MESSAGE_CACHE_SIZE = int(os.getenv("MESSAGE_CACHE_SIZE", "512")) # Recently fetched replied-to messages kept by JpCog
+SHARD_MODE = os.getenv("SHARD_MODE", "single") # "single" or "auto" (cluster.py runs shard slices in several processes)
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None # Total shards for "auto"; empty/0 asks Discord for the recommended count
+MEMORY_PROFILE = os.getenv("MEMORY_PROFILE", "default") # "default" or "low" (trimmed intents, no member cache, no chunking)
+MAX_MESSAGES = int(os.getenv("MAX_MESSAGES", "1000")) # discord.py message cache size (replied-to messages are looked up here first)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0")) # Serve Prometheus metrics on this port, 0 disables (cluster workers add their id)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "0.5")) # Seconds without an event loop tick before the watchdog reports, 0 disables
+MEMORY_REPORT_INTERVAL = float(os.getenv("MEMORY_REPORT_INTERVAL", "0")) # Seconds between RSS/cache size reports, 0 disables
+DEEPL_USAGE_DB = os.getenv("DEEPL_USAGE_DB", "deepl_usage.sqlite3") # Billed characters per guild/user/day; empty string keeps them in memory
+DEEPL_ACCOUNT_LIMIT = int(os.getenv("DEEPL_ACCOUNT_LIMIT", "500000")) # Characters per billing period until /v2/usage tells us the real limit
+DEEPL_DAILY_LIMIT = int(os.getenv("DEEPL_DAILY_LIMIT", "0")) # Characters per UTC day across all guilds, 0 = unlimited
+DEEPL_GUILD_DAILY_LIMIT = int(os.getenv("DEEPL_GUILD_DAILY_LIMIT", "0")) # Characters per guild per day, 0 = unlimited (e.g. 20000)
+DEEPL_USER_DAILY_LIMIT = int(os.getenv("DEEPL_USER_DAILY_LIMIT", "0")) # Characters per user per day, 0 = unlimited (e.g. 3000)
+DEEPL_LOW_WATERMARK = float(os.getenv("DEEPL_LOW_WATERMARK", "0.05")) # Below this share of the account left, translations are shortened
+DEEPL_SHORTEN_TO = int(os.getenv("DEEPL_SHORTEN_TO", "300")) # Characters translated per request while the account is below DEEPL_LOW_WATERMARK
+DEEPL_EXHAUSTED_FOR = float(os.getenv("DEEPL_EXHAUSTED_FOR", "3600")) # Seconds a DeepL 456 (quota used up) keeps translations cache-only
+DEEPL_USAGE_SYNC_INTERVAL = float(os.getenv("DEEPL_USAGE_SYNC_INTERVAL", "900")) # Seconds between /v2/usage syncs, 0 disables
+DEEPL_USAGE_REFRESH = float(os.getenv("DEEPL_USAGE_REFRESH", "0")) # Seconds between re-reads of DEEPL_USAGE_DB written by other processes, 0 disables (cluster.py uses 5)
+TRANSLATE_SEGMENT_CHARS = int(os.getenv("TRANSLATE_SEGMENT_CHARS", "400")) # Long inputs go to DeepL in segments of about this many characters
+TRANSLATE_PROGRESSIVE_MIN_CHARS = int(os.getenv("TRANSLATE_PROGRESSIVE_MIN_CHARS", "800")) # !translate inputs this long get a reply that is edited as segments finish
+TRANSLATE_EDIT_INTERVAL = float(os.getenv("TRANSLATE_EDIT_INTERVAL", "1.0")) # Minimum seconds between edits of that reply
+APP_COMMAND_SYNC = os.getenv("APP_COMMAND_SYNC", "auto") # Slash commands/context menus: "auto" syncs when the tree changed, "always", or "off"
+APP_COMMAND_SYNC_FILE = os.getenv("APP_COMMAND_SYNC_FILE", "app_commands.sha256") # Fingerprint of the last synced command tree
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "2048")) # In-memory LRU entries
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", str(6 * 3600))) # Seconds, 0 = never expire
+TRANSLATION_CACHE_DB = os.getenv("TRANSLATION_CACHE_DB", "translation_cache.sqlite3") # Empty string disables the disk tier
+TRANSLATION_CACHE_DB_MAX_ROWS = int(os.getenv("TRANSLATION_CACHE_DB_MAX_ROWS", "50000"))
+TRANSLATION_CACHE_DB_TTL = float(os.getenv("TRANSLATION_CACHE_DB_TTL", str(30 * 86400))) # Seconds, 0 = never expire
 
-# Check if the bot token is loaded
-if BOT_TOKEN is None:
-    print("Error: BOT_TOKEN not found in .env file. Make sure you have a .env file with BOT_TOKEN set.")
-    exit()
+def require_token():
+    """Exits with a hint when BOT_TOKEN is missing; called only by entry points that log in to Discord."""
+    if BOT_TOKEN is None:
+        print("Error: BOT_TOKEN not found in .env file. Make sure you have a .env file with BOT_TOKEN set.")
+        exit()
 
 # --- Configuration Variables ---
 CONFIG_FILE = 'shibako_phrases.json' # Json file containing all shibako trigger phrases
-TRIGGER_MAP = {} # Dictionary to map triggers to their config
-RUDE_RESPONSE_CONFIG = {} # Store the global rude response settings
-SHIBA_EMOJI = "<:shiba:1363005589902589982>" # Default emoji string, can be overridden by config
-ERROR_MESSAGES = {} # Dictionary for user-facing error messages loaded from config
+PHRASES_WATCH_INTERVAL = float(os.getenv("PHRASES_WATCH_INTERVAL", "5")) # Seconds between checks for edits, 0 disables
+PHRASE_CONFIG = PhraseConfig.empty(CONFIG_FILE) # Snapshot of triggers, matcher, rude settings, emoji and error messages
 
 # --- Function to Load Configuration from JSON ---
 def load_config(filename):
     """Loads configuration from the JSON file."""
-    global TRIGGER_MAP, RUDE_RESPONSE_CONFIG, SHIBA_EMOJI, ERROR_MESSAGES # Allow modification of global vars
+    global PHRASE_CONFIG # Allow modification of global var
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
-
-        new_trigger_map = {}
-        # Populate the trigger map for fast lookups
-        for phrase_config in config_data.get('phrases', []):
-            # Store the necessary parts of the config for each trigger
-            config_details = {
-                "name": phrase_config.get("name", "unknown"),
-                "response": phrase_config.get("response", "..."), # Default response
-                "allow_rude": phrase_config.get("allow_rude_response", False)
-            }
-            for trigger in phrase_config.get('triggers', []):
-                # Ensure triggers are lowercase for case-insensitive matching
-                new_trigger_map[trigger.lower()] = config_details
-
-        TRIGGER_MAP = new_trigger_map
-        RUDE_RESPONSE_CONFIG = config_data.get('rude_response', {})
-        # Load custom emoji string from config, otherwise use default
-        SHIBA_EMOJI = config_data.get('shiba_emoji_string', SHIBA_EMOJI)
-        ERROR_MESSAGES = config_data.get('error_messages', {}) # Load error messages
+        PHRASE_CONFIG = load_phrase_config(filename, version=1)
 
         print(f"Loaded configuration from {filename}")
-        print(f"Found {len(TRIGGER_MAP)} triggers.")
-        if ERROR_MESSAGES:
-             print(f"Loaded {len(ERROR_MESSAGES)} error messages.")
+        print(f"Found {len(PHRASE_CONFIG.trigger_map)} triggers.")
+        if PHRASE_CONFIG.error_messages:
+             print(f"Loaded {len(PHRASE_CONFIG.error_messages)} error messages.")
         else:
              print("Warning: No error messages found in config.")
         return True # Indicate success
 
-    except FileNotFoundError:
-        print(f"Error: {filename} not found. Please ensure it exists.")
-        # Set defaults so the bot can potentially still run basic commands
-        TRIGGER_MAP = {}
-        RUDE_RESPONSE_CONFIG = {}
-        ERROR_MESSAGES = {}
-        return False # Indicate failure but allow continuation if desired
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from {filename}. Check file format.")
-        return False # Critical error, likely should exit
+    except ConfigError as e:
+        print(f"Error: {e}")
+        if e.errors != [str(e)]:
+            for problem in e.errors:
+                print(f"  - {problem}")
+        return False # Keep the empty snapshot so the bot can still run basic commands
     except Exception as e:
         print(f"An unexpected error occurred loading configuration: {e}")
         return False # Critical error
@@ -78,84 +118,291 @@ if not load_config(CONFIG_FILE):
 # --- ---
 
 # --- Bot Object Setup ---
-intents = discord.Intents.default()
-intents.message_content = True 
-bot = commands.Bot(command_prefix = '!', intents=intents)
-
-# Attach configuration data to bot so cogs have access to data:
-bot.trigger_map = TRIGGER_MAP
-bot.rude_response_config = RUDE_RESPONSE_CONFIG
-bot.error_messages = ERROR_MESSAGES
-bot.config = {
-    "shiba_emoji_string": SHIBA_EMOJI,
-    "deepl_api_key": DEEPL_API_KEY
-}
-
-# --- Event Handlers ---
-@bot.event
-async def on_ready():
-    """Event handler for when the bot logs in and is ready."""
-    print(f'We have logged in as {bot.user}')
-    print('Loading cogs...')
-
-    for filename in os.listdir('./cogs'):
-        if filename.endswith('.py') and not filename.startswith('_'):
-            try: 
-                await bot.load_extension(f'cogs.{filename[:-3]}')
-                print(f'Loaded cog: {filename}')
-            except Exception as e:
-                print(f'Failed to load cog {filename}: {e}')
-    
-    print('Bot is ready!')
-    print('-------------------')
-
-@bot.event
-async def on_message(message):
+class ShibakoBotMixin:
+    """
+    Everything Shibako adds on top of discord.py's bot classes.
+
+    Serves phrase configuration from a single swappable snapshot: cogs keep
+    using bot.trigger_map, bot.error_messages and friends; they all read
+    through `phrase_config`, which a hot reload replaces in one assignment.
+    """
+    def __init__(self, *args, phrase_config, config, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.phrase_config = phrase_config
+        self.config = config
+        self.boot_timings = {} # Seconds since BOOT_STARTED for each startup milestone
+        self.cluster_link = None # Set by cluster.py when this bot is one worker of a cluster
+        self.loop_watchdog = None # Started in setup_hook when loop_stall_threshold > 0
+
+    async def setup_hook(self):
+        """Runs once before connecting to the gateway (unlike on_ready, which fires on every reconnect)."""
+        stall_threshold = self.config.get('loop_stall_threshold', 0)
+        if stall_threshold and stall_threshold > 0:
+            self.loop_watchdog = LoopWatchdog(asyncio.get_running_loop(), threshold=stall_threshold)
+            self.loop_watchdog.start()
+
+        print('Loading cogs...')
+        extensions = [
+            f'cogs.{filename[:-3]}' for filename in sorted(os.listdir('./cogs'))
+            if filename.endswith('.py') and not filename.startswith('_')
+        ]
+        # Load every extension concurrently; one failing doesn't stop the others
+        results = await asyncio.gather(*(self.load_extension(name) for name in extensions), return_exceptions=True)
+        for name, result in zip(extensions, results):
+            if isinstance(result, Exception):
+                print(f'Failed to load cog {name}: {result}')
+            else:
+                print(f'Loaded cog: {name}')
+        self.boot_timings["extensions_loaded"] = time.perf_counter() - BOOT_STARTED
+
+    @property
+    def trigger_map(self):
+        return self.phrase_config.trigger_map
+
+    @property
+    def trigger_matcher(self):
+        return self.phrase_config.trigger_matcher
+
+    @property
+    def rude_response_config(self):
+        return self.phrase_config.rude_response_config
+
+    @property
+    def error_messages(self):
+        return self.phrase_config.error_messages
+
+    def swap_phrase_config(self, new_config):
+        """Installs a fully built snapshot; the single assignment is the swap."""
+        self.phrase_config = new_config
+        # The emoji also lives in bot.config for cogs that read it from there
+        self.config["shiba_emoji_string"] = new_config.shiba_emoji
+        # Lets cogs rebuild anything derived from the config (e.g. !phrases pages)
+        self.dispatch("phrase_config_swapped", new_config)
+
+    def shard_stats(self):
+        """Per-shard gateway latency (ms) and guild count for the shards this process runs."""
+        if isinstance(self, commands.AutoShardedBot):
+            shard_ids = self.shard_ids or list(range(self.shard_count or 0))
+            latencies = dict(self.latencies)
+        else:
+            shard_ids = [self.shard_id or 0]
+            latencies = {shard_ids[0]: self.latency}
+        stats = {shard_id: {"latency_ms": None, "guilds": 0} for shard_id in shard_ids}
+        for shard_id, latency in latencies.items():
+            if shard_id in stats and latency == latency: # NaN until the shard has connected
+                stats[shard_id]["latency_ms"] = round(latency * 1000, 1)
+        for guild in self.guilds:
+            if guild.shard_id in stats:
+                stats[guild.shard_id]["guilds"] += 1
+        return stats
+
+    async def close(self):
+        if self.loop_watchdog is not None:
+            self.loop_watchdog.stop()
+        await super().close()
+
+    async def invoke(self, ctx):
+        """Times every command (errors are handled inside, so this always returns)."""
+        started = time.perf_counter()
+        if self.loop_watchdog is not None and ctx.command is not None:
+            self.loop_watchdog.label_task(f"!{ctx.command.qualified_name}") # Stall reports name the command
+        try:
+            await super().invoke(ctx)
+        finally:
+            if self.loop_watchdog is not None:
+                self.loop_watchdog.clear_label()
+        if ctx.command is not None:
+            status = "error" if ctx.command_failed else "ok"
+            COMMAND_SECONDS.observe(time.perf_counter() - started, ctx.command.cog_name or "", ctx.command.qualified_name, status)
+
+    # --- Event Handlers ---
+    async def on_ready(self):
+        """Event handler for when the bot logs in and is ready (fires again after reconnects)."""
+        print(f'We have logged in as {self.user}')
+        if "gateway_ready" not in self.boot_timings:
+            self.boot_timings["gateway_ready"] = time.perf_counter() - BOOT_STARTED
+            print(f'Boot: cogs loaded in {self.boot_timings.get("extensions_loaded", 0):.2f}s, '
+                  f'gateway ready in {self.boot_timings["gateway_ready"]:.2f}s')
+            if kakasi_loader.state != KakasiLoader.PENDING: # PENDING means JpCog (which starts it) isn't loaded
+                self.loop.create_task(self.report_kakasi_warmup())
+            # Only one process registers commands; the gateway doesn't wait for it
+            if self.cluster_link is None or self.cluster_link.worker_id == 0:
+                self.loop.create_task(self.sync_app_commands())
+
+        print('Bot is ready!')
+        print('-------------------')
+
+    async def report_kakasi_warmup(self):
+        """Prints when the PyKakasi dictionaries finished loading, relative to boot."""
+        while kakasi_loader.state == KakasiLoader.LOADING:
+            await asyncio.sleep(0.1)
+        self.boot_timings["kakasi_" + kakasi_loader.state] = time.perf_counter() - BOOT_STARTED
+        print(f'Boot: PyKakasi {kakasi_loader.state} at {self.boot_timings["kakasi_" + kakasi_loader.state]:.2f}s')
+
+    async def sync_app_commands(self):
+        """Pushes slash commands and context menus to Discord, skipping the call when nothing changed since the last sync."""
+        mode = self.config.get('app_command_sync', 'auto')
+        if mode == "off":
+            return
+        try:
+            count = await sync_if_changed(
+                self.tree, self.config.get('app_command_sync_file', 'app_commands.sha256'),
+                application_id=self.application_id, force=mode == "always",
+            )
+        except (discord.HTTPException, discord.app_commands.AppCommandError) as e:
+            print(f"Error syncing application commands: {e}")
+            return
+        if count is None:
+            print("Application commands unchanged, sync skipped.")
+        else:
+            print(f"Synced {count} application commands.")
+
+    async def on_command_completion(self, ctx):
+        """Records time-to-first-response: when the first command after boot finished."""
+        if "first_response" not in self.boot_timings:
+            self.boot_timings["first_response"] = time.perf_counter() - BOOT_STARTED
+            print(f'Boot: first command (!{ctx.invoked_with}) answered at {self.boot_timings["first_response"]:.2f}s')
+
+    async def on_message(self, message):
+        """
+        Processes every message.
+        - Ignores messages from the bot itself.
+        - Allows ListenerCog (and other listeners) to act on the message.
+        - Then, processes the message for commands.
+        """
+        # Ignore messages sent by the bot itself to prevent loops
+        if message.author == self.user:
+            return
+
+        # The ListenerCog's on_message (and any other cog listeners for on_message)
+        # will be called automatically by the event dispatcher before this.
+        # The ListenerCog should handle its own logic for triggers and return if it processes a message.
+
+        # After listeners have had a chance, process for commands.
+        await self.process_commands(message)
+
+    # --- Centralized Error Handling ---
+    async def on_command_error(self, ctx: commands.Context, error: commands.CommandError): # Added type hints
+        """Handles errors that occur during command processing."""
+        if isinstance(error, commands.CommandNotFound):
+            # Optionally, you can send a message or just log it
+            # print(f"Command not found: {ctx.invoked_with}")
+            pass # Ignore command not found errors silently for the user
+        elif isinstance(error, commands.MissingRequiredArgument):
+            # Provide more specific help if possible
+            param_name = error.param.name if error.param else "an argument"
+            await ctx.send(f"{self.config['shiba_emoji_string']} You missed the '{param_name}' argument! Check `!tasukete {ctx.command.name}` for help.")
+        elif isinstance(error, commands.CommandInvokeError):
+            original = error.original
+            print(f'Error in command {ctx.command.qualified_name}: {original}')
+            await ctx.send(f"{self.config['shiba_emoji_string']} An error occurred while running the command: {original.__class__.__name__}")
+        elif isinstance(error, ResponseBudgetExceeded):
+            # Answering would only spend more of the budget (and risk a 429), so just log it
+            print(f"Dropped !{ctx.invoked_with} in channel {ctx.channel.id}: {error}")
+        elif isinstance(error, commands.CheckFailure):
+            await ctx.send(f"{self.config['shiba_emoji_string']} You don't have permission to use this command.")
+        else:
+            print(f'Unhandled command error in command {ctx.command if ctx.command else "UnknownCommand"}: {error}')
+            await ctx.send(f"{self.config['shiba_emoji_string']} An unexpected error occurred with that command.")
+
+class ShibakoBot(ShibakoBotMixin, commands.Bot):
+    """Single-process, single-shard Shibako."""
+
+class ShardedShibakoBot(ShibakoBotMixin, commands.AutoShardedBot):
+    """Shibako running several shards in one process (all of them, or a slice given by cluster.py)."""
+
+def build_bot_config():
+    """The bot.config dict shared by every cog. Each bot gets its own copy."""
+    return {
+        "shiba_emoji_string": PHRASE_CONFIG.shiba_emoji,
+        "phrases_file": CONFIG_FILE,
+        "phrases_watch_interval": PHRASES_WATCH_INTERVAL,
+        "deepl_api_key": DEEPL_API_KEY,
+        "deepl_api_url": DEEPL_API_URL,
+        "deepl_timeout": DEEPL_TIMEOUT,
+        "deepl_max_concurrency": DEEPL_MAX_CONCURRENCY,
+        "deepl_queue_size": DEEPL_QUEUE_SIZE,
+        "deepl_max_retries": DEEPL_MAX_RETRIES,
+        "deepl_retry_base_delay": DEEPL_RETRY_BASE_DELAY,
+        "deepl_retry_max_wait": DEEPL_RETRY_MAX_WAIT,
+        "deepl_breaker_threshold": DEEPL_BREAKER_THRESHOLD,
+        "deepl_breaker_cooldown": DEEPL_BREAKER_COOLDOWN,
+        "deepl_batch_window": DEEPL_BATCH_WINDOW,
+        "deepl_batch_max_texts": DEEPL_BATCH_MAX_TEXTS,
+        "deepl_batch_max_chars": DEEPL_BATCH_MAX_CHARS,
+        "kks_pool_mode": KKS_POOL_MODE,
+        "kks_pool_workers": KKS_POOL_WORKERS,
+        "kks_pool_max_queue": KKS_POOL_MAX_QUEUE,
+        "kks_pool_timeout": KKS_POOL_TIMEOUT,
+        "readings_cache_size": READINGS_CACHE_SIZE,
+        "trigger_channel_rate": TRIGGER_CHANNEL_RATE,
+        "trigger_channel_burst": TRIGGER_CHANNEL_BURST,
+        "trigger_guild_rate": TRIGGER_GUILD_RATE,
+        "trigger_guild_burst": TRIGGER_GUILD_BURST,
+        "trigger_coalesce_window": TRIGGER_COALESCE_WINDOW,
+        "trigger_reply_queue": TRIGGER_REPLY_QUEUE,
+        "command_channel_rate": COMMAND_CHANNEL_RATE,
+        "command_channel_burst": COMMAND_CHANNEL_BURST,
+        "message_cache_size": MESSAGE_CACHE_SIZE,
+        "translate_segment_chars": TRANSLATE_SEGMENT_CHARS,
+        "translate_progressive_min_chars": TRANSLATE_PROGRESSIVE_MIN_CHARS,
+        "translate_edit_interval": TRANSLATE_EDIT_INTERVAL,
+        "app_command_sync": APP_COMMAND_SYNC,
+        "app_command_sync_file": APP_COMMAND_SYNC_FILE,
+        "translation_cache_size": TRANSLATION_CACHE_SIZE,
+        "translation_cache_ttl": TRANSLATION_CACHE_TTL,
+        "translation_cache_db": TRANSLATION_CACHE_DB or None,
+        "translation_cache_db_max_rows": TRANSLATION_CACHE_DB_MAX_ROWS,
+        "translation_cache_db_ttl": TRANSLATION_CACHE_DB_TTL,
+        "deepl_usage_db": DEEPL_USAGE_DB or None,
+        "deepl_account_limit": DEEPL_ACCOUNT_LIMIT,
+        "deepl_daily_limit": DEEPL_DAILY_LIMIT,
+        "deepl_guild_daily_limit": DEEPL_GUILD_DAILY_LIMIT,
+        "deepl_user_daily_limit": DEEPL_USER_DAILY_LIMIT,
+        "deepl_low_watermark": DEEPL_LOW_WATERMARK,
+        "deepl_shorten_to": DEEPL_SHORTEN_TO,
+        "deepl_exhausted_for": DEEPL_EXHAUSTED_FOR,
+        "deepl_usage_sync_interval": DEEPL_USAGE_SYNC_INTERVAL,
+        "deepl_usage_refresh": DEEPL_USAGE_REFRESH,
+        "memory_report_interval": MEMORY_REPORT_INTERVAL,
+        "metrics_host": METRICS_HOST,
+        "metrics_port": METRICS_PORT,
+        "loop_stall_threshold": LOOP_STALL_THRESHOLD
+    }
+
+def create_bot(shard_mode=SHARD_MODE, shard_ids=None, shard_count=SHARD_COUNT, memory_profile=MEMORY_PROFILE, bot_class=None):
     """
-    Processes every message.
-    - Ignores messages from the bot itself.
-    - Allows ListenerCog (and other listeners) to act on the message.
-    - Then, processes the message for commands.
+    Builds a fully configured bot.
+    shard_mode "single" is one shard; "auto" runs shard_count shards here (SHARD_COUNT; None lets discord.py ask Discord).
+    Passing shard_ids/shard_count (as cluster.py does) runs just that slice of a larger shard set.
+    memory_profile "low" trims intents and caches down to what the cogs actually read (see utils/memory.py).
+    bot_class overrides the class (the replay harness passes a subclass with fake message plumbing).
     """
-    # Ignore messages sent by the bot itself to prevent loops
-    if message.author == bot.user:
-        return
-
-    # The ListenerCog's on_message (and any other cog listeners for on_message)
-    # will be called automatically by the event dispatcher before this.
-    # The ListenerCog should handle its own logic for triggers and return if it processes a message.
-
-    # After listeners have had a chance, process for commands.
-    await bot.process_commands(message)
-
-# --- Centralized Error Handling ---
-@bot.event
-async def on_command_error(ctx: commands.Context, error: commands.CommandError): # Added type hints
-    """Handles errors that occur during command processing."""
-    if isinstance(error, commands.CommandNotFound):
-        # Optionally, you can send a message or just log it
-        # print(f"Command not found: {ctx.invoked_with}")
-        pass # Ignore command not found errors silently for the user
-    elif isinstance(error, commands.MissingRequiredArgument):
-        # Provide more specific help if possible
-        param_name = error.param.name if error.param else "an argument"
-        await ctx.send(f"{bot.config['shiba_emoji_string']} You missed the '{param_name}' argument! Check `!tasukete {ctx.command.name}` for help.")
-    elif isinstance(error, commands.CommandInvokeError):
-        original = error.original
-        print(f'Error in command {ctx.command.qualified_name}: {original}')
-        await ctx.send(f"{bot.config['shiba_emoji_string']} An error occurred while running the command: {original.__class__.__name__}")
-    elif isinstance(error, commands.CheckFailure):
-        await ctx.send(f"{bot.config['shiba_emoji_string']} You don't have permission to use this command.")
-    else:
-        print(f'Unhandled command error in command {ctx.command if ctx.command else "UnknownCommand"}: {error}')
-        await ctx.send(f"{bot.config['shiba_emoji_string']} An unexpected error occurred with that command.")
+    bot_kwargs = dict(
+        command_prefix='!',
+        intents=build_intents(memory_profile),
+        phrase_config=PHRASE_CONFIG,
+        config=build_bot_config(),
+        **client_cache_options(memory_profile, max_messages=MAX_MESSAGES),
+    )
+
+    if bot_class is not None:
+        return bot_class(**bot_kwargs)
+    if shard_ids is not None:
+        return ShardedShibakoBot(shard_ids=list(shard_ids), shard_count=shard_count, **bot_kwargs)
+    if shard_mode == "auto":
+        return ShardedShibakoBot(shard_count=shard_count, **bot_kwargs)
+    return ShibakoBot(**bot_kwargs)
 
 # --- Run the Bot ---
 async def main():
+    # Attach configuration data to bot so cogs have access to data (see build_bot_config)
+    bot = create_bot()
     async with bot:
         await bot.start(BOT_TOKEN)
 
 if __name__ == "__main__":
+    require_token()
     try:
         asyncio.run(main())
     except discord.LoginFailure:
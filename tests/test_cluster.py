@@ -0,0 +1,103 @@
+"""plan_shards, FakeGateway and the launcher <-> worker pipe protocol of cluster.py."""
+import asyncio
+import multiprocessing
+
+import pytest
+
+from cluster import ClusterLauncher, ClusterLink, FakeGateway, plan_shards
+
+
+@pytest.mark.parametrize("shard_count, workers, expected", [
+    (4, 2, [[0, 1], [2, 3]]),
+    (5, 2, [[0, 1, 2], [3, 4]]),
+    (7, 3, [[0, 1, 2], [3, 4], [5, 6]]),
+    (2, 5, [[0], [1]]), # More workers than shards: no empty workers
+    (1, 3, [[0]]),
+    (1, 1, [[0]]),
+    (6, 0, [[0, 1, 2, 3, 4, 5]]),
+])
+def test_plan_shards(shard_count, workers, expected):
+    assert plan_shards(shard_count, workers) == expected
+
+
+@pytest.mark.parametrize("shard_count, workers", [(16, 3), (10, 4), (3, 3)])
+def test_plan_shards_covers_every_shard_once(shard_count, workers):
+    plan = plan_shards(shard_count, workers)
+    assert [shard_id for shard_ids in plan for shard_id in shard_ids] == list(range(shard_count))
+    sizes = [len(shard_ids) for shard_ids in plan]
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_fake_gateway_spreads_guilds_over_the_cluster():
+    plan = plan_shards(4, 2)
+    gateways = [FakeGateway(shard_ids, 4, 10, seed=0) for shard_ids in plan]
+    stats = [gateway.shard_stats() for gateway in gateways]
+    assert [sorted(worker) for worker in stats] == plan
+    assert sum(shard["guilds"] for worker in stats for shard in worker.values()) == 10
+    assert all(20 <= shard["latency_ms"] <= 120 for worker in stats for shard in worker.values())
+
+
+class FakeAdmin:
+    def __init__(self):
+        self.reloads = 0
+
+    async def reload_phrases(self):
+        self.reloads += 1
+
+
+class FakeBot:
+    def __init__(self):
+        self.admin = FakeAdmin()
+        self.closed = False
+
+    def get_cog(self, name):
+        return self.admin if name == "Admin" else None
+
+    async def close(self):
+        self.closed = True
+
+
+async def wait_for(condition, launcher=None, timeout=5):
+    """Lets the workers run (and the launcher poll them) until condition() holds."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("timed out waiting for the cluster")
+        if launcher is not None:
+            launcher.poll_workers()
+        await asyncio.sleep(0.01)
+
+
+def test_launcher_worker_protocol():
+    async def scenario():
+        launcher = ClusterLauncher(4, 2, fake_gateway=10)
+        bots, links, serving = [], [], []
+        for worker_id, shard_ids in enumerate(launcher.plan):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            launcher.conns[worker_id] = parent_conn
+            bot = FakeBot()
+            link = ClusterLink(bot, worker_id, child_conn, fake_gateway=FakeGateway(shard_ids, 4, 10, seed=worker_id))
+            bots.append(bot)
+            links.append(link)
+            serving.append(asyncio.create_task(link.serve()))
+        await asyncio.sleep(0) # Let serve() register its pipe readers
+
+        # !reload on worker 0: it reloaded itself, so only worker 1 is told to reload
+        links[0].request_reload()
+        await wait_for(lambda: bots[1].admin.reloads == 1, launcher)
+        assert bots[0].admin.reloads == 0
+
+        # Stats round trip, then the launcher shares the cluster view with every worker
+        launcher.broadcast("stats")
+        await wait_for(lambda: len(launcher.worker_stats) == 2, launcher)
+        assert sum(stats["guilds"] for stats in launcher.worker_stats.values()) == 10
+        assert sorted(launcher.worker_stats[1]["shards"]) == [2, 3]
+        launcher.report()
+        await wait_for(lambda: all(len(link.cluster_stats) == 2 for link in links))
+
+        launcher.shutdown(timeout=1)
+        await asyncio.wait_for(asyncio.gather(*serving), 5)
+        assert all(bot.closed for bot in bots)
+        assert not launcher.conns
+
+    asyncio.run(scenario())
@@ -0,0 +1,29 @@
+"""LoopWatchdog stall detection."""
+import asyncio
+import time
+
+from utils.loop_watchdog import LoopWatchdog
+
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+
+def test_a_blocking_call_is_reported_with_its_site():
+    async def scenario():
+        watchdog = LoopWatchdog(asyncio.get_running_loop(), threshold=0.05, summary_interval=60, max_logs=0)
+        watchdog.start()
+        try:
+            await asyncio.sleep(0.05)
+            block_the_loop(0.3)
+            await asyncio.sleep(0.1) # Let the watchdog see the loop tick again
+        finally:
+            watchdog.stop()
+        return watchdog
+
+    watchdog = asyncio.run(scenario())
+    assert watchdog.stalls >= 1
+    worst = watchdog.top_sites()[0]
+    assert "block_the_loop" in worst.site
+    assert worst.count >= 1 and worst.worst >= 0.2
+
@@ -0,0 +1,40 @@
+"""LRUCache eviction order and TTL."""
+from utils.lru_cache import LRUCache
+
+
+def test_least_recently_used_is_evicted():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1 # "b" is now the oldest
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), len(cache), cache.evictions) == (1, 3, 2, 1)
+
+
+def test_put_replaces_and_refreshes():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b")) == (10, None)
+
+
+def test_ttl_expires_entries():
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.put("a", 1)
+    stored_at, value = cache._data["a"]
+    cache._data["a"] = (stored_at - 61, value)
+    assert cache.get("a") is None
+    assert (len(cache), cache.evictions) == (0, 1)
+
+
+def test_pop_and_clear():
+    cache = LRUCache()
+    cache.put("a", 1)
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
+    cache.put("b", 2)
+    cache.clear()
+    assert len(cache) == 0
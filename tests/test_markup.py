@@ -0,0 +1,69 @@
+"""Markup placeholders and the DeepL XML round trip."""
+import pytest
+
+from utils.markup import (
+    PLACEHOLDER_BASE, from_xml, has_placeholders, missing_spans, restore, split_markup, strip_placeholders, to_xml,
+)
+
+MENTION = "<@123456789012345678>"
+EMOJI = "<:shiba:123456789012345678>"
+
+
+@pytest.mark.parametrize("text, spans, kinds", [
+    (f"hey {MENTION} look {EMOJI}", (MENTION, EMOJI), ("mention", "custom_emoji")),
+    ("run `pip install x` first", ("`pip install x`",), ("inline_code",)),
+    ("```py\nprint('hi')\n``` done", ("```py\nprint('hi')\n```",), ("code_block",)),
+    ("at <t:1700000000:R> ok", ("<t:1700000000:R>",), ("timestamp",)),
+    ("see https://en.wikipedia.org/wiki/Foo_(bar) ok", ("https://en.wikipedia.org/wiki/Foo_(bar)",), ("url",)),
+    ("(see https://example.com/a_(b)).", ("https://example.com/a_(b)",), ("url",)),
+    ("go to https://example.com/page.", ("https://example.com/page",), ("url",)),
+    ("just words", (), ()),
+])
+def test_split_markup(text, spans, kinds):
+    markup = split_markup(text)
+    assert markup.spans == spans
+    assert markup.kinds == kinds
+    assert restore(markup.text, markup.spans) == text
+    assert markup.saved == len(text) - len(markup.text)
+
+
+def test_code_wins_over_what_is_inside_it():
+    markup = split_markup(f"`{MENTION} https://example.com`")
+    assert markup.kinds == ("inline_code",)
+
+
+def test_private_use_input_is_left_alone():
+    text = f"{chr(PLACEHOLDER_BASE)} {MENTION}"
+    markup = split_markup(text)
+    assert (markup.text, markup.spans) == (text, ())
+
+
+def test_linguistic_drops_placeholders():
+    markup = split_markup(f"{MENTION} こんにちは {EMOJI}")
+    assert has_placeholders(markup.text)
+    assert markup.linguistic == strip_placeholders(markup.text) == " こんにちは "
+
+
+@pytest.mark.parametrize("text", [
+    "plain text",
+    "Tom & Jerry <3 \"quotes\" and 'apostrophes'",
+    f"{MENTION} said <b>hi</b> & left {EMOJI}",
+    "日本語 & <タグ> " + MENTION,
+])
+def test_xml_round_trip(text):
+    markup = split_markup(text)
+    xml = to_xml(markup.text)
+    assert not has_placeholders(xml)
+    assert restore(from_xml(xml), markup.spans) == text
+
+
+def test_from_xml_accepts_expanded_tags_and_reordering():
+    markup = split_markup(f"{MENTION} likes {EMOJI}")
+    answer = '<x i="1"></x> は <x i="0"/> が好き &amp; more'
+    assert restore(from_xml(answer), markup.spans) == f"{EMOJI} は {MENTION} が好き & more"
+
+
+def test_missing_spans():
+    markup = split_markup(f"{MENTION} and {EMOJI}")
+    assert missing_spans(from_xml('<x i="1"/> only'), markup.spans) == [0]
+    assert missing_spans(markup.text, markup.spans) == []
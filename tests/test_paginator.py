@@ -0,0 +1,60 @@
+"""paginate / with_page_numbers."""
+import pytest
+
+from utils.paginator import paginate, with_page_numbers
+
+
+def test_short_text_is_one_page():
+    assert paginate("hello", header="```\n", footer="\n```") == ["```\nhello\n```"]
+    assert paginate("") == [""]
+
+
+def test_pages_break_on_lines_and_respect_the_limit():
+    text = "\n".join(f"line {index}" for index in range(100))
+    pages = paginate(text, header="[", footer="]", limit=60)
+    assert all(len(page) <= 60 for page in pages)
+    assert all(page.startswith("[") and page.endswith("]") for page in pages)
+    assert "\n".join(page[1:-1] for page in pages) == text
+
+
+def test_long_lines_break_on_spaces():
+    text = " ".join(f"word{index}" for index in range(50))
+    pages = paginate(text, limit=40)
+    assert all(len(page) <= 40 for page in pages)
+    assert " ".join(pages) == text
+
+
+def test_a_huge_token_is_hard_cut():
+    pages = paginate("x" * 95, limit=40)
+    assert [len(page) for page in pages] == [40, 40, 15]
+
+
+def test_header_and_footer_need_room():
+    with pytest.raises(ValueError):
+        paginate("text", header="x" * 10, footer="y" * 10, limit=20)
+
+
+def test_with_page_numbers():
+    assert with_page_numbers(["only"]) == ["only"]
+    assert with_page_numbers(["a", "b"]) == ["a\n(page 1/2)", "b\n(page 2/2)"]
+
+
+def test_wrapped_lines_keep_their_indentation():
+    line = "    " + " ".join(f"item{index}" for index in range(30))
+    pages = paginate(f"header\n{line}", limit=50)
+    pieces = "\n".join(pages).split("\n")[1:]
+    assert len(pieces) > 2
+    assert all(piece.startswith("    item") and len(piece) <= 50 for piece in pieces)
+    assert " ".join(piece.strip() for piece in pieces) == line.strip()
+
+
+def test_spacing_inside_a_wrapped_line_is_kept():
+    line = "name:      value " * 10
+    pieces = paginate(line, limit=60)
+    assert all("name:      value" in piece for piece in pieces)
+
+
+def test_a_huge_indented_token_keeps_the_indentation():
+    pages = paginate("  " + "x" * 90, limit=40)
+    assert [len(page) for page in pages] == [40, 40, 16]
+    assert all(page.startswith("  x") for page in pages)
@@ -0,0 +1,112 @@
+"""QuotaAccountant decisions and the reserve -> record -> release cycle."""
+import asyncio
+import os
+
+import pytest
+
+from utils.quota import CACHE_ONLY, FULL, SHORTENED, QuotaAccountant, SQLiteUsageStore, shorten_text
+
+
+def accountant(**limits):
+    limits.setdefault("account_limit", 0)
+    return QuotaAccountant(SQLiteUsageStore(), **limits)
+
+
+def test_unlimited_is_always_full():
+    quota = accountant()
+    decision = quota.check(1, 2, 100000)
+    assert (decision.mode, decision.limit) == (FULL, 100000)
+
+
+def test_decisions_follow_the_tightest_budget():
+    quota = accountant(daily_limit=10000, guild_daily_limit=5000, user_daily_limit=1000)
+    assert quota.check(1, 2, 500).mode == FULL
+    decision = quota.check(1, 2, 800) # 500 already reserved for this user
+    assert (decision.mode, decision.limit, decision.reason) == (SHORTENED, 500, "user")
+    decision = quota.check(1, 2, 100)
+    assert (decision.mode, decision.limit, decision.reason) == (CACHE_ONLY, 0, "user")
+    assert decision.reservation is None
+
+
+def test_shortened_uses_the_room_left_when_the_account_is_healthy():
+    quota = accountant(daily_limit=5000, shorten_to=300)
+    decision = quota.check(1, 2, 6000)
+    assert (decision.mode, decision.limit, decision.reason) == (SHORTENED, 5000, "daily")
+
+
+def test_low_account_caps_at_shorten_to():
+    quota = accountant(account_limit=100000, shorten_to=300)
+    quota.account_used = 99000
+    decision = quota.check(1, 2, 6000)
+    assert (decision.mode, decision.limit, decision.reason) == (SHORTENED, 300, "account")
+
+
+def test_reservations_stop_concurrent_requests_overspending():
+    quota = accountant(user_daily_limit=1000)
+    first = quota.check(1, 2, 700)
+    second = quota.check(1, 2, 700)
+    assert first.mode == FULL
+    assert (second.mode, second.limit) == (SHORTENED, 300)
+    assert quota.remaining(1, 2)["user"] == 0
+
+
+def test_record_draws_from_the_reservation_and_release_returns_the_rest():
+    async def scenario():
+        quota = accountant(daily_limit=1000, user_daily_limit=1000)
+        decision = quota.check(1, 2, 600)
+        await quota.record(1, 2, 400, decision.reservation)
+        assert quota.remaining(1, 2) == {"account": None, "daily": 400, "guild": None, "user": 400}
+        quota.release(decision.reservation)
+        quota.release(decision.reservation) # Safe to call twice
+        assert quota.remaining(1, 2)["user"] == 600
+        assert (quota.reserved_total, quota.guild_reserved, quota.user_reserved) == (0, {}, {})
+        assert quota.store.day_totals(quota.day) == (400, {1: 400}, {2: 400})
+
+    asyncio.run(scenario())
+
+
+def test_exhaustion_expires():
+    quota = accountant(account_limit=1000, exhausted_for=60)
+    quota.mark_exhausted()
+    assert quota.check(1, 2, 10).mode == CACHE_ONLY
+    quota.exhausted_until -= 61
+    assert quota.check(1, 2, 10).mode == FULL
+
+
+def test_usage_sync_replaces_the_estimate():
+    quota = accountant(account_limit=1000)
+    quota.spent_since_sync = 500
+    quota.apply_usage(200, 2000)
+    assert quota.account_remaining == 1800
+    quota.apply_usage(2000, 2000)
+    assert quota.exhausted
+
+
+def test_refresh_reads_what_other_processes_spent(tmp_path):
+    async def scenario():
+        path = os.fspath(tmp_path / "usage.sqlite3")
+        here = QuotaAccountant(SQLiteUsageStore(path), account_limit=10000, user_daily_limit=1000, shared_refresh=0.01)
+        other = QuotaAccountant(SQLiteUsageStore(path), account_limit=10000, user_daily_limit=1000, shared_refresh=0.01)
+        await here.load()
+        await other.load()
+        decision = other.check(5, 2, 600)
+        await other.record(5, 2, 600, decision.reservation)
+
+        await asyncio.sleep(0.02)
+        await here.refresh()
+        assert here.remaining(1, 2)["user"] == 400
+        assert here.account_remaining == 9400
+        here.store.close()
+        other.store.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("text, limit, expected", [
+    ("short", 10, "short"),
+    ("First sentence. Second sentence here.", 25, "First sentence."),
+    ("no sentence ends in this text", 20, "no sentence ends in"),
+    ("abcdefghijklmnop", 5, "abcde"),
+])
+def test_shorten_text(text, limit, expected):
+    assert shorten_text(text, limit) == expected
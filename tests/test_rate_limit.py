@@ -0,0 +1,56 @@
+"""TokenBucket, BucketMap and ReplyLimiter (time is passed in explicitly)."""
+from utils.rate_limit import BucketMap, ReplyLimiter, TokenBucket
+
+
+def test_token_bucket_spends_and_refills():
+    bucket = TokenBucket(rate=1, capacity=2, now=0)
+    assert bucket.try_acquire(now=0)
+    assert bucket.try_acquire(now=0)
+    assert not bucket.try_acquire(now=0)
+    assert bucket.try_acquire(now=1)
+    assert not bucket.try_acquire(now=1)
+    bucket.refund(5)
+    assert bucket.tokens == 2 # Never above capacity
+
+
+def test_token_bucket_refill_is_capped():
+    bucket = TokenBucket(rate=10, capacity=3, now=0)
+    assert not bucket.try_acquire(cost=4, now=100)
+    assert bucket.tokens == 3
+
+
+def test_bucket_map_forgets_least_recent_keys():
+    buckets = BucketMap(rate=0, capacity=1, max_keys=2)
+    assert buckets.try_acquire("a", now=0)
+    assert buckets.try_acquire("b", now=0)
+    assert buckets.try_acquire("c", now=0) # Pushes out "a"
+    assert len(buckets) == 2
+    assert buckets.try_acquire("a", now=0) # Back with a full bucket
+    assert not buckets.try_acquire("c", now=0)
+
+
+def test_reply_limiter_coalesces_repeats():
+    limiter = ReplyLimiter(channel_rate=100, channel_burst=100, guild_rate=100, guild_burst=100, coalesce_window=5)
+    assert limiter.allow(1, 10, "hello", now=0)
+    assert not limiter.allow(1, 10, "hello", now=4)
+    assert limiter.allow(2, 10, "hello", now=4) # Other channel
+    assert limiter.allow(1, 10, "bye", now=4) # Other phrase
+    assert limiter.allow(1, 10, "hello", now=5)
+    assert limiter.stats()["coalesced"] == 1
+
+
+def test_reply_limiter_guild_refusal_refunds_the_channel():
+    limiter = ReplyLimiter(channel_rate=0, channel_burst=2, guild_rate=0, guild_burst=1)
+    assert limiter.allow(1, 10, "a", now=0)
+    assert not limiter.allow(2, 10, "a", now=0) # Guild empty
+    assert limiter.channels.get(2, now=0).tokens == 2
+    stats = limiter.stats()
+    assert stats["suppressed_guild"] == 1
+    assert stats["suppressed_by_phrase"] == {"a": 1}
+
+
+def test_reply_limiter_channel_budget():
+    limiter = ReplyLimiter(channel_rate=0, channel_burst=1, guild_rate=0, guild_burst=10)
+    assert limiter.allow(1, None, "a", now=0) # DMs have no guild bucket
+    assert not limiter.allow(1, None, "b", now=0)
+    assert limiter.stats()["suppressed_channel"] == 1
@@ -0,0 +1,38 @@
+"""
+Routing regressions: every row of benchmarks/data/script_corpus.jsonl must keep
+its labeled DeepL source language and, for mixed messages, its segment route.
+"""
+import json
+import os
+
+import pytest
+
+from utils.script_classifier import classify, route, translation_direction
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "data", "script_corpus.jsonl")
+
+
+def load_corpus():
+    with open(CORPUS_FILE, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+CORPUS = load_corpus()
+LABELED = [row for row in CORPUS if "source_lang" in row]
+ROUTED = [row for row in CORPUS if "route" in row]
+
+
+@pytest.mark.parametrize("row", LABELED, ids=[row["text"][:40] for row in LABELED])
+def test_source_lang(row):
+    profile = classify(row["text"])
+    assert translation_direction(profile.language, profile.confidence)[0] == row["source_lang"]
+
+
+@pytest.mark.parametrize("row", ROUTED, ids=[row["text"][:40] for row in ROUTED])
+def test_route(row):
+    plan = [[source, target] for _, source, target in route(row["text"])]
+    assert plan == row["route"]
+
+
+def test_corpus_covers_mixed_messages():
+    assert any(len(row["route"]) > 1 for row in ROUTED)
@@ -0,0 +1,64 @@
+"""TranslationBatcher grouping, deduplication and who gets billed."""
+import asyncio
+
+from utils.translation_batcher import TranslationBatcher
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    async def translate_many(self, texts, source_lang, target_lang, tag_handling=None, priority=None):
+        self.calls.append((list(texts), source_lang, target_lang, tag_handling, priority))
+        return [text.upper() for text in texts]
+
+
+def test_concurrent_requests_share_one_call_and_one_bill():
+    async def scenario():
+        client = FakeClient()
+        batcher = TranslationBatcher(client, window=0.01)
+        results = await asyncio.gather(
+            batcher.translate_billed("hi", "EN", "JA"),
+            batcher.translate_billed("hi", "EN", "JA"),
+            batcher.translate_billed("yo", "EN", "JA"),
+            batcher.translate("hi", "JA", "EN"), # Other language pair, other batch
+        )
+        assert results == [("HI", True), ("HI", False), ("YO", True), "HI"]
+        assert sorted(call[0] for call in client.calls) == [["hi"], ["hi", "yo"]]
+        assert batcher.stats() == {"requests": 4, "batches": 2, "shared": 1, "pending": 0}
+
+    asyncio.run(scenario())
+
+
+def test_a_cancelled_first_caller_passes_the_bill_on():
+    async def scenario():
+        batcher = TranslationBatcher(FakeClient(), window=0.01)
+        first = asyncio.create_task(batcher.translate_billed("hi", "EN", "JA"))
+        second = asyncio.create_task(batcher.translate_billed("hi", "EN", "JA"))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == ("HI", True)
+
+    asyncio.run(scenario())
+
+
+def test_the_character_cap_flushes_early():
+    async def scenario():
+        client = FakeClient()
+        batcher = TranslationBatcher(client, window=10, max_chars=5)
+        assert await asyncio.wait_for(batcher.translate("abcdef", "EN", "JA"), 1) == "ABCDEF"
+
+    asyncio.run(scenario())
+
+
+def test_a_failed_batch_fails_every_caller():
+    class FailingClient:
+        async def translate_many(self, *args, **kwargs):
+            raise RuntimeError("boom")
+
+    async def scenario():
+        batcher = TranslationBatcher(FailingClient(), window=0.01)
+        results = await asyncio.gather(batcher.translate("a", "EN", "JA"), batcher.translate("b", "EN", "JA"), return_exceptions=True)
+        assert [str(result) for result in results] == ["boom", "boom"]
+
+    asyncio.run(scenario())
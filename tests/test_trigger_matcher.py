@@ -0,0 +1,58 @@
+"""TriggerMatcher: normalization, match modes, word boundaries and precedence."""
+import pytest
+
+from utils.trigger_matcher import TriggerMatcher, normalize_message
+
+
+def build(*triggers):
+    matcher = TriggerMatcher()
+    for trigger, mode in triggers:
+        matcher.add(trigger, trigger, mode)
+    matcher.compile()
+    return matcher
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Hi  Shibako!!", "hi shibako"),
+    ("ｈｉ shibako", "hi shibako"),
+    ("  hello?! ", "hello"),
+    ("...", ""),
+])
+def test_normalize_message(text, expected):
+    assert normalize_message(text) == expected
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("good morning", "good morning"),
+    ("GOOD MORNING!", "good morning"),
+    ("good morning everyone", None), # Exact only
+    ("sit down please", "sit"),
+    ("position", None), # Word boundary
+    ("please sit", None), # Prefix must start the message
+    ("i love shiba inu", "shiba"),
+    ("shibainu", None),
+    ("今日はありがとう", "ありがとう"), # No word boundaries for Japanese
+    ("", None),
+])
+def test_match_modes(message, expected):
+    matcher = build(("good morning", "exact"), ("sit", "prefix"), ("shiba", "contains"), ("ありがとう", "contains"))
+    assert matcher.match(message) == expected
+
+
+def test_exact_beats_prefix_beats_contains_and_longer_wins():
+    matcher = build(("hello", "contains"), ("hello there", "contains"), ("hello", "prefix"), ("hello there", "exact"))
+    assert matcher.match("hello there") == "hello there" # exact
+    assert matcher.match("hello there friend") == "hello" # prefix before contains
+    assert matcher.match("oh hello there") == "hello there" # longest contains
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        TriggerMatcher().add("x", {}, "regex")
+
+
+def test_from_phrases_defaults_to_exact():
+    matcher = TriggerMatcher.from_phrases([({"triggers": ["hi"]}, "greeting"), ({"triggers": ["bye"], "match": "contains"}, "farewell")])
+    assert matcher.trigger_count == 2
+    assert matcher.match("hi there") is None
+    assert matcher.match("ok bye now") == "farewell"
@@ -0,0 +1,45 @@
+import hashlib
+import json
+import os
+
+
+def tree_fingerprint(tree, application_id=None):
+    """SHA-256 of the global command payload Discord would receive from tree.sync() (plus the app it belongs to)."""
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda data: (data.get("type", 1), data["name"]))
+    blob = json.dumps({"application_id": application_id, "commands": payload}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _read_fingerprint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _write_fingerprint(path, fingerprint):
+    """Replaces the stored fingerprint in one step, so a crash never leaves half a file."""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(fingerprint + "\n")
+    os.replace(temporary, path)
+
+
+async def sync_if_changed(tree, state_file, application_id=None, force=False):
+    """
+    Syncs the global command tree only when it differs from what was last synced.
+
+    The fingerprint of the last successful sync lives in `state_file`; an
+    unchanged tree costs no API call at all. Returns the number of commands
+    synced, or None when the sync was skipped.
+    """
+    fingerprint = tree_fingerprint(tree, application_id)
+    if not force and _read_fingerprint(state_file) == fingerprint:
+        return None
+    synced = await tree.sync()
+    try:
+        _write_fingerprint(state_file, fingerprint)
+    except OSError as e:
+        print(f"Warning: could not store the command tree fingerprint in {state_file}: {e}")
+    return len(synced)
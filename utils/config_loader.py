@@ -0,0 +1,161 @@
+import json
+import os
+
+from utils.trigger_matcher import TriggerMatcher, MATCH_MODES
+
+DEFAULT_SHIBA_EMOJI = "<:shiba:1363005589902589982>"
+
+
+class ConfigError(Exception):
+    """Raised when shibako_phrases.json can't be read or fails validation. `errors` lists every problem found."""
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or [message]
+
+
+class PhraseConfig:
+    """
+    Immutable snapshot of shibako_phrases.json plus everything built from it.
+
+    The bot holds exactly one of these in `bot.phrase_config`. A reload builds
+    a complete new snapshot and replaces the reference in one assignment, so a
+    handler that reads `bot.phrase_config` once always sees a consistent set
+    of triggers, matcher, rude settings and error messages.
+    """
+    __slots__ = ("version", "source", "mtime", "trigger_map", "trigger_matcher",
+                 "rude_response_config", "shiba_emoji", "error_messages")
+
+    def __init__(self, version, source, mtime, trigger_map, trigger_matcher, rude_response_config, shiba_emoji, error_messages):
+        self.version = version
+        self.source = source
+        self.mtime = mtime
+        self.trigger_map = trigger_map
+        self.trigger_matcher = trigger_matcher
+        self.rude_response_config = rude_response_config
+        self.shiba_emoji = shiba_emoji
+        self.error_messages = error_messages
+
+    @classmethod
+    def empty(cls, source=None):
+        """Fallback snapshot used when no config could be loaded at startup."""
+        return cls(0, source, None, {}, None, {}, DEFAULT_SHIBA_EMOJI, {})
+
+
+def validate_config_data(config_data):
+    """Returns a list of human-readable problems with the parsed JSON (empty if it's fine)."""
+    errors = []
+    if not isinstance(config_data, dict):
+        return ["Top level must be a JSON object."]
+
+    phrases = config_data.get("phrases", [])
+    if not isinstance(phrases, list):
+        errors.append("'phrases' must be a list.")
+        phrases = []
+    for index, phrase in enumerate(phrases):
+        label = f"phrases[{index}]"
+        if not isinstance(phrase, dict):
+            errors.append(f"{label} must be an object.")
+            continue
+        label = f"phrases[{index}] ({phrase.get('name', 'unnamed')})"
+        triggers = phrase.get("triggers", [])
+        if not isinstance(triggers, list) or not all(isinstance(trigger, str) for trigger in triggers):
+            errors.append(f"{label}: 'triggers' must be a list of strings.")
+        if not isinstance(phrase.get("response", "..."), str):
+            errors.append(f"{label}: 'response' must be a string.")
+        if phrase.get("match", "exact") not in MATCH_MODES:
+            errors.append(f"{label}: 'match' must be one of {', '.join(MATCH_MODES)}.")
+
+    rude = config_data.get("rude_response", {})
+    if not isinstance(rude, dict):
+        errors.append("'rude_response' must be an object.")
+    elif not isinstance(rude.get("chance", 0.0), (int, float)) or not 0 <= rude.get("chance", 0.0) <= 1:
+        errors.append("'rude_response.chance' must be a number between 0 and 1.")
+
+    error_messages = config_data.get("error_messages", {})
+    if not isinstance(error_messages, dict) or not all(isinstance(value, str) for value in error_messages.values()):
+        errors.append("'error_messages' must map keys to strings.")
+
+    if not isinstance(config_data.get("shiba_emoji_string", DEFAULT_SHIBA_EMOJI), str):
+        errors.append("'shiba_emoji_string' must be a string.")
+    return errors
+
+
+def load_phrase_config(filename, version=1):
+    """
+    Reads, validates and compiles the phrases file into a PhraseConfig.
+
+    This is blocking work (file I/O plus building the matcher); reloads run it
+    with asyncio.to_thread. Raises ConfigError on any problem.
+    """
+    try:
+        mtime = os.stat(filename).st_mtime
+        with open(filename, 'r', encoding='utf-8') as f:
+            config_data = json.load(f)
+    except FileNotFoundError:
+        raise ConfigError(f"{filename} not found. Please ensure it exists.") from None
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"Could not decode JSON from {filename}: {e}") from None
+
+    errors = validate_config_data(config_data)
+    if errors:
+        raise ConfigError(f"{filename} failed validation ({len(errors)} problems).", errors)
+
+    trigger_map = {}
+    compiled_phrases = [] # (phrase config, config details) pairs for the matcher
+    # Populate the trigger map for fast lookups
+    for phrase_config in config_data.get('phrases', []):
+        # Store the necessary parts of the config for each trigger
+        config_details = {
+            "name": phrase_config.get("name", "unknown"),
+            "response": phrase_config.get("response", "..."), # Default response
+            "allow_rude": phrase_config.get("allow_rude_response", False)
+        }
+        compiled_phrases.append((phrase_config, config_details))
+        for trigger in phrase_config.get('triggers', []):
+            # Ensure triggers are lowercase for case-insensitive matching
+            trigger_map[trigger.lower()] = config_details
+
+    # Compile every trigger (exact/prefix/contains) into one matcher
+    trigger_matcher = TriggerMatcher.from_phrases(compiled_phrases)
+
+    return PhraseConfig(
+        version=version,
+        source=filename,
+        mtime=mtime,
+        trigger_map=trigger_map,
+        trigger_matcher=trigger_matcher,
+        rude_response_config=config_data.get('rude_response', {}),
+        shiba_emoji=config_data.get('shiba_emoji_string', DEFAULT_SHIBA_EMOJI),
+        error_messages=config_data.get('error_messages', {}),
+    )
+
+
+def diff_configs(old, new):
+    """Summarizes what changed between two snapshots, one line per change."""
+    changes = []
+    added = sorted(set(new.trigger_map) - set(old.trigger_map))
+    removed = sorted(set(old.trigger_map) - set(new.trigger_map))
+    if added:
+        changes.append(f"+ triggers: {', '.join(added)}")
+    if removed:
+        changes.append(f"- triggers: {', '.join(removed)}")
+
+    changed_responses = sorted({
+        new.trigger_map[trigger]["name"]
+        for trigger in set(old.trigger_map) & set(new.trigger_map)
+        if old.trigger_map[trigger] != new.trigger_map[trigger]
+    })
+    if changed_responses:
+        changes.append(f"~ phrases: {', '.join(changed_responses)}")
+
+    changed_messages = sorted(
+        key for key in set(old.error_messages) | set(new.error_messages)
+        if old.error_messages.get(key) != new.error_messages.get(key)
+    )
+    if changed_messages:
+        changes.append(f"~ error_messages: {', '.join(changed_messages)}")
+    if old.rude_response_config != new.rude_response_config:
+        changes.append("~ rude_response")
+    if old.shiba_emoji != new.shiba_emoji:
+        changes.append("~ shiba_emoji_string")
+    return changes
@@ -0,0 +1,111 @@
+import asyncio
+import concurrent.futures
+import time
+from collections import deque
+
+
+class ConversionBusy(Exception):
+    """Raised when the pool already has max_queue jobs waiting."""
+
+
+class ConversionTimeout(Exception):
+    """Raised when a job doesn't finish within the pool's timeout."""
+
+
+def _timed_call(fn, args):
+    """Runs fn(*args) in the worker and reports when it actually started (for queue-wait metrics)."""
+    started = time.time()
+    return started, fn(*args)
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ConversionPool:
+    """
+    Bounded worker pool for CPU-heavy conversions (pykakasi) that must stay off the event loop.
+
+    `mode` is "thread" or "process". At most `max_workers` jobs run at once and
+    at most `max_queue` more may wait; beyond that run() raises ConversionBusy
+    straight away instead of piling up work. Each job gets `timeout` seconds.
+    In process mode `fn` and its arguments must be picklable (module-level functions).
+    """
+    def __init__(self, mode="thread", max_workers=2, max_queue=16, timeout=5.0, sample_size=1000):
+        if mode == "process":
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+        elif mode == "thread":
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shibako-kks")
+        else:
+            raise ValueError(f"Unknown conversion pool mode: {mode!r}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._outstanding = 0 # Jobs submitted to the executor that haven't finished yet
+
+        # Metrics
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failed = 0
+        self._latencies = deque(maxlen=sample_size) # Submit -> result, seconds
+        self._queue_waits = deque(maxlen=sample_size) # Submit -> start in worker, seconds
+
+    @property
+    def queue_depth(self):
+        """Jobs waiting for a free worker."""
+        return max(0, self._outstanding - self.max_workers)
+
+    def _release(self, _future):
+        self._outstanding -= 1
+
+    async def run(self, fn, *args):
+        """Runs fn(*args) in the pool. Raises ConversionBusy or ConversionTimeout."""
+        if self._outstanding >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ConversionBusy(f"{self._outstanding} conversions already queued or running")
+
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        job = self._executor.submit(_timed_call, fn, args)
+        self._outstanding += 1
+        # Release the slot only when the worker is really done, even if we stop waiting earlier
+        job.add_done_callback(lambda future: loop.call_soon_threadsafe(self._release, future))
+
+        try:
+            started, result = await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise ConversionTimeout(f"Conversion took longer than {self.timeout}s") from None
+        except Exception:
+            self.failed += 1
+            raise
+
+        self.completed += 1
+        self._latencies.append(time.time() - submitted)
+        self._queue_waits.append(max(0.0, started - submitted))
+        return result
+
+    def stats(self):
+        """Returns job counters plus p50/p99 latency and queue wait in milliseconds."""
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "failed": self.failed,
+            "latency_p50_ms": _percentile(self._latencies, 0.50) * 1000,
+            "latency_p99_ms": _percentile(self._latencies, 0.99) * 1000,
+            "queue_wait_p50_ms": _percentile(self._queue_waits, 0.50) * 1000,
+            "queue_wait_p99_ms": _percentile(self._queue_waits, 0.99) * 1000,
+        }
+
+    def shutdown(self):
+        """Stops the workers; queued jobs are cancelled."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
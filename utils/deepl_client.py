@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import aiohttp
+
+from utils.metrics import REGISTRY
+
+DEFAULT_DEEPL_URL = "https://api-free.deepl.com/v2/translate" # Free API endpoint
+
+DEEPL_SECONDS = REGISTRY.histogram("shibako_deepl_request_seconds", "DeepL request latency (one request may carry several texts).")
+DEEPL_TEXTS = REGISTRY.counter("shibako_deepl_texts_total", "Texts sent to DeepL.")
+DEEPL_ERRORS = REGISTRY.counter("shibako_deepl_errors_total", "Failed DeepL requests by HTTP status or failure kind.", ("code",))
+
+
+class DeepLError(Exception):
+    """Raised when a DeepL request fails (network error, timeout or bad HTTP status)."""
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status # HTTP status code, None for network errors/timeouts
+        self.retry_after = retry_after # Seconds from the Retry-After header (429/503), if DeepL sent one
+
+
+class DeepLFormatError(DeepLError):
+    """Raised when DeepL answers with a body we don't understand."""
+
+
+def _retry_after(response):
+    """Parses a Retry-After header given in seconds; HTTP-date values are ignored."""
+    try:
+        return max(0.0, float(response.headers.get('Retry-After', '')))
+    except ValueError:
+        return None
+
+
+class DeepLClient:
+    """
+    Shared async DeepL client.
+
+    One aiohttp session with a keep-alive connection pool is reused for every
+    request, so we don't pay a TLS handshake per command. A semaphore caps how
+    many requests are in flight at once and each request has its own timeout.
+    """
+    def __init__(self, api_key, url=DEFAULT_DEEPL_URL, timeout=10.0, max_concurrency=4, pool_size=8):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    async def start(self):
+        """Opens the pooled HTTP session (must be called from the running event loop)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        """Closes the session and its pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def usage_url(self):
+        """The /v2/usage endpoint next to the configured /v2/translate one."""
+        base, _, _ = self.url.rpartition("/translate")
+        return f"{base}/usage" if base else self.url.rstrip("/") + "/usage"
+
+    async def usage(self):
+        """Returns (character_count, character_limit) for the current billing period."""
+        if self._session is None:
+            await self.start()
+        headers = {'Authorization': f'DeepL-Auth-Key {self.api_key}'}
+        try:
+            async with self._session.get(self.usage_url, headers=headers) as response:
+                if response.status >= 400:
+                    body = await response.text()
+                    raise DeepLError(f"DeepL usage returned HTTP {response.status}: {body[:200]}", status=response.status)
+                try:
+                    usage = await response.json(content_type=None)
+                    return int(usage['character_count']), int(usage['character_limit'])
+                except (ValueError, KeyError, TypeError) as e:
+                    raise DeepLFormatError(f"Unexpected DeepL usage format: {e}", status=response.status) from e
+        except asyncio.TimeoutError as e:
+            raise DeepLError("DeepL usage request timed out") from e
+        except aiohttp.ClientError as e:
+            raise DeepLError(f"DeepL usage request failed: {e}") from e
+
+    async def translate(self, text, source_lang, target_lang):
+        """Translates a single text and returns the translated string."""
+        return (await self.translate_many([text], source_lang, target_lang))[0]
+
+    async def translate_many(self, texts, source_lang, target_lang, tag_handling=None, priority=None):
+        """
+        Translates several texts in one request; results come back in the same order.
+        source_lang=None lets DeepL detect the language.
+        priority is ignored; it is accepted so DeepLDispatcher and the client are interchangeable.
+        tag_handling="xml" makes DeepL keep XML tags in place (the texts must be escaped XML).
+        """
+        if self._session is None:
+            await self.start()
+
+        headers = {'Authorization': f'DeepL-Auth-Key {self.api_key}'}
+        # DeepL accepts the text parameter repeated once per input
+        data = [('text', text) for text in texts]
+        data += [
+            ('target_lang', target_lang),
+            ('preserve_formatting', '0'), # You might want to adjust this
+        ]
+        if source_lang: # None lets DeepL detect the source language
+            data.append(('source_lang', source_lang))
+        if tag_handling:
+            data.append(('tag_handling', tag_handling))
+
+        async with self._semaphore:
+            DEEPL_TEXTS.inc(amount=len(texts))
+            started = time.perf_counter()
+            try:
+                async with self._session.post(self.url, data=data, headers=headers) as response:
+                    if response.status >= 400:
+                        body = await response.text()
+                        DEEPL_ERRORS.inc(str(response.status))
+                        raise DeepLError(
+                            f"DeepL returned HTTP {response.status}: {body[:200]}",
+                            status=response.status, retry_after=_retry_after(response),
+                        )
+                    try:
+                        response_json = await response.json(content_type=None)
+                        translations = [item['text'] for item in response_json['translations']]
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        DEEPL_ERRORS.inc("format")
+                        raise DeepLFormatError(f"Unexpected DeepL response format: {e}", status=response.status) from e
+                    if len(translations) != len(texts):
+                        DEEPL_ERRORS.inc("format")
+                        raise DeepLFormatError(
+                            f"DeepL returned {len(translations)} translations for {len(texts)} texts", status=response.status
+                        )
+                    return translations
+            except asyncio.TimeoutError as e:
+                DEEPL_ERRORS.inc("timeout")
+                raise DeepLError("DeepL request timed out") from e
+            except aiohttp.ClientError as e:
+                DEEPL_ERRORS.inc("network")
+                raise DeepLError(f"DeepL request failed: {e}") from e
+            finally:
+                DEEPL_SECONDS.observe(time.perf_counter() - started)
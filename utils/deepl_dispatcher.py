@@ -0,0 +1,303 @@
+import asyncio
+import itertools
+import random
+import time
+
+from utils.deepl_client import DeepLError, DeepLFormatError
+from utils.metrics import REGISTRY
+
+# Request priorities, lower goes first
+INTERACTIVE = 0 # Someone is waiting on a command reply (!translate / !tl)
+NORMAL = 1 # Part of a bigger reply (!full)
+BULK = 2 # Background or batch work nobody is watching
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BULK: "bulk"}
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+BREAKER_STATES = (CLOSED, HALF_OPEN, OPEN) # Index is the exported gauge value
+
+DEEPL_RETRIES = REGISTRY.counter("shibako_deepl_retries_total", "DeepL requests retried, by HTTP status or failure kind.", ("code",))
+DEEPL_REJECTED = REGISTRY.counter("shibako_deepl_rejected_total", "Translations failed without calling DeepL, by reason.", ("reason",))
+DEEPL_QUEUE_WAIT = REGISTRY.histogram("shibako_deepl_queue_wait_seconds", "Time from submit to the first DeepL attempt, by priority.", ("priority",))
+
+
+class DeepLUnavailable(DeepLError):
+    """Raised without calling DeepL: the circuit breaker is open or the queue is full."""
+    def __init__(self, message, reason, retry_after=None):
+        super().__init__(message, retry_after=retry_after)
+        self.reason = reason # "breaker" or "queue_full"
+
+
+def is_retryable(error):
+    """Timeouts, network errors, 429 and 5xx are worth another try; bad requests and 456 (quota) are not."""
+    if isinstance(error, DeepLFormatError):
+        return False
+    return error.status is None or error.status == 429 or error.status >= 500
+
+
+def counts_as_outage(error):
+    """Failures that say DeepL itself is unhealthy. 429 only means we are too fast."""
+    return is_retryable(error) and error.status != 429
+
+
+class CircuitBreaker:
+    """
+    Fails fast while DeepL keeps failing.
+
+    `failure_threshold` outage failures in a row open the breaker. After
+    `cooldown` seconds it is half-open: one probe request goes through, and
+    its result closes the breaker again or reopens it for another cooldown.
+    """
+    def __init__(self, failure_threshold=5, cooldown=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0 # Consecutive outage failures
+        self.opened_at = None
+        self.trips = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return CLOSED
+        if self.clock() - self.opened_at >= self.cooldown:
+            return HALF_OPEN
+        return OPEN
+
+    def retry_in(self):
+        """Seconds until the breaker lets a probe through (0 unless open)."""
+        if self.state != OPEN:
+            return 0.0
+        return self.cooldown - (self.clock() - self.opened_at)
+
+    def record_success(self):
+        if self.opened_at is not None:
+            print("DeepL circuit breaker closed: probe request succeeded.")
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.opened_at is None and self.failures >= self.failure_threshold):
+            self.opened_at = self.clock()
+            self.trips += 1
+            print(f"DeepL circuit breaker open after {self.failures} failures; failing fast for {self.cooldown:.0f}s.")
+
+    def stats(self):
+        return {"state": self.state, "failures": self.failures, "trips": self.trips, "retry_in": round(self.retry_in(), 1)}
+
+
+class _Job:
+    __slots__ = ("texts", "source_lang", "target_lang", "tag_handling", "priority", "future", "attempts", "submitted", "started")
+
+    def __init__(self, texts, source_lang, target_lang, tag_handling, priority, future):
+        self.texts = texts
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.tag_handling = tag_handling
+        self.priority = priority
+        self.future = future
+        self.attempts = 0
+        self.submitted = time.monotonic()
+        self.started = False
+
+
+class DeepLDispatcher:
+    """
+    Sits in front of DeepLClient and decides when each request may run.
+
+    Requests wait in a priority queue (INTERACTIVE before NORMAL before BULK,
+    first come first served within a priority) and `workers` tasks send them,
+    so at most that many are in flight. Retryable failures are put back on
+    the queue after an exponential backoff with jitter, or after DeepL's
+    Retry-After; a 429 also pauses every worker for that long. Nothing is
+    retried once a request has waited `max_wait` seconds in total. While the
+    circuit breaker is open, translate_many raises DeepLUnavailable at once.
+    """
+    def __init__(self, client, workers=4, max_queue=256, max_retries=3, base_delay=0.5, max_delay=30.0,
+                 max_wait=20.0, breaker=None):
+        self.client = client
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.breaker = breaker or CircuitBreaker()
+        self._queue = None
+        self._order = itertools.count()
+        self._tasks = []
+        self._active = set() # Jobs a worker has taken off the queue (waiting for its turn or in flight)
+        self._retrying = {} # Task sleeping before putting a job back on the queue -> that job
+        self._resume_at = 0.0 # Monotonic time before which no request is sent (Retry-After)
+        self._probe = None # Future for the half-open probe while it is in flight
+
+        # Counters
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.rejected = 0
+        self.queued_by_priority = {priority: 0 for priority in PRIORITY_NAMES}
+
+    async def start(self):
+        """Starts the worker tasks (must be called from the running event loop)."""
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker(), name=f"shibako-deepl-{i}") for i in range(self.workers)]
+
+    async def close(self):
+        """Stops the workers; every job not finished yet (queued, in flight or in backoff) fails with DeepLUnavailable."""
+        stranded = list(self._active) + list(self._retrying.values())
+        tasks = self._tasks + list(self._retrying)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._active.clear()
+        self._retrying.clear()
+        while self._queue is not None and not self._queue.empty():
+            stranded.append(self._queue.get_nowait()[2])
+        for job in stranded:
+            self._fail(job, DeepLUnavailable("DeepL dispatcher shut down", "shutdown"))
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def translate(self, text, source_lang, target_lang, priority=NORMAL, tag_handling=None):
+        return (await self.translate_many([text], source_lang, target_lang, priority, tag_handling))[0]
+
+    async def translate_many(self, texts, source_lang, target_lang, priority=NORMAL, tag_handling=None):
+        """Queues one DeepL request and waits for its translations (same interface as DeepLClient; pass priority/tag_handling by keyword)."""
+        if not self._tasks:
+            await self.start()
+        if self.breaker.state == OPEN:
+            self._reject("breaker")
+            retry_in = self.breaker.retry_in()
+            raise DeepLUnavailable(f"DeepL circuit breaker is open (retrying in {retry_in:.0f}s)", "breaker", retry_after=retry_in)
+        if self._queue.qsize() >= self.max_queue:
+            self._reject("queue_full")
+            raise DeepLUnavailable(f"{self._queue.qsize()} DeepL requests already queued", "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(texts, source_lang, target_lang, tag_handling, priority, future)
+        self._queue.put_nowait((priority, next(self._order), job))
+        self.queued_by_priority[priority] = self.queued_by_priority.get(priority, 0) + 1
+        return await future
+
+    def _reject(self, reason):
+        self.rejected += 1
+        DEEPL_REJECTED.inc(reason)
+
+    def _fail(self, job, error):
+        if not job.future.done():
+            self.failed += 1
+            job.future.set_exception(error)
+
+    async def _requeue_after(self, delay, order, job):
+        """Puts a failed job back in its original place in the queue once the backoff is over."""
+        await asyncio.sleep(delay)
+        self._queue.put_nowait((job.priority, order, job))
+
+    def _backoff(self, job, error):
+        """Seconds before the next attempt: Retry-After if DeepL sent it, else exponential with full jitter."""
+        if error.retry_after is not None:
+            return min(error.retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (job.attempts - 1)))
+
+    async def _wait_for_turn(self):
+        """Holds a worker while a Retry-After pause is running or another request is probing the breaker."""
+        while True:
+            pause = self._resume_at - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            if self._probe is not None:
+                await asyncio.shield(self._probe)
+                continue
+            return
+
+    async def _worker(self):
+        while True:
+            _, order, job = await self._queue.get()
+            if job.future.done(): # The caller stopped waiting
+                continue
+            self._active.add(job)
+            try:
+                await self._attempt(job, order)
+            finally:
+                self._active.discard(job)
+
+    async def _attempt(self, job, order):
+        """Sends one job once it is its turn; failures are retried or failed in _handle_error."""
+        await self._wait_for_turn()
+
+        state = self.breaker.state
+        if state == OPEN:
+            self._reject("breaker")
+            self._fail(job, DeepLUnavailable("DeepL circuit breaker is open", "breaker", retry_after=self.breaker.retry_in()))
+            return
+        probe = None
+        if state == HALF_OPEN:
+            probe = self._probe = asyncio.get_running_loop().create_future()
+
+        if not job.started:
+            job.started = True
+            DEEPL_QUEUE_WAIT.observe(time.monotonic() - job.submitted, PRIORITY_NAMES.get(job.priority, str(job.priority)))
+        job.attempts += 1
+        try:
+            translations = await self.client.translate_many(job.texts, job.source_lang, job.target_lang, tag_handling=job.tag_handling)
+        except DeepLError as e:
+            self._handle_error(job, order, e)
+        except Exception as e:
+            self._fail(job, e)
+        else:
+            self.breaker.record_success()
+            self.completed += 1
+            if not job.future.done():
+                job.future.set_result(translations)
+        finally:
+            if probe is not None:
+                self._probe = None
+                probe.set_result(None)
+
+    def _handle_error(self, job, order, error):
+        if counts_as_outage(error):
+            self.breaker.record_failure()
+
+        delay = self._backoff(job, error) if is_retryable(error) else None
+        if error.status == 429 and delay is not None:
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+
+        if (delay is None or job.attempts > self.max_retries or self.breaker.state == OPEN
+                or time.monotonic() - job.submitted + delay > self.max_wait):
+            self._fail(job, error)
+            return
+
+        self.retries += 1
+        DEEPL_RETRIES.inc(str(error.status) if error.status else "network")
+        task = asyncio.create_task(self._requeue_after(delay, order, job))
+        self._retrying[task] = job
+        task.add_done_callback(lambda done: self._retrying.pop(done, None))
+
+    def stats(self):
+        breaker = self.breaker.stats()
+        return {
+            "breaker": breaker["state"],
+            "breaker_failures": breaker["failures"],
+            "breaker_trips": breaker["trips"],
+            "breaker_retry_in": breaker["retry_in"],
+            "queue_depth": self.queue_depth,
+            "waiting_retry": len(self._retrying),
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "queued_by_priority": {PRIORITY_NAMES.get(p, str(p)): n for p, n in self.queued_by_priority.items()},
+        }
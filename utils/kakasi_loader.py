@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+import pykakasi # For Romaji/Furigana conversion
+
+
+class KakasiLoader:
+    """
+    Builds the pykakasi converter in a background thread instead of at import time.
+
+    pykakasi loads large dictionaries when constructed, so the bot can come
+    online and answer other commands while this warms up. `state` tells
+    commands whether the converter is usable yet.
+    """
+    PENDING = "pending"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self):
+        self.state = self.PENDING
+        self.instance = None
+        self.error = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self):
+        return self.state == self.READY
+
+    def start(self):
+        """Starts warming up in a daemon thread (no-op if already started)."""
+        with self._lock:
+            if self.state != self.PENDING:
+                return
+            self.state = self.LOADING
+        threading.Thread(target=self._load, name="shibako-kakasi-warmup", daemon=True).start()
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            self.instance = pykakasi.kakasi()
+            self.load_seconds = time.perf_counter() - started
+            self.state = self.READY
+            print(f"PyKakasi converter warmed up in {self.load_seconds:.2f}s.")
+        except Exception as e:
+            self.error = e
+            self.state = self.FAILED
+            print(f"Error initializing PyKakasi: {e}")
+            print("Furigana and Romaji conversion will not be available.")
+        finally:
+            self._done.set()
+
+    def get(self, timeout=None):
+        """
+        Returns the converter, loading it in the calling thread if nobody started it
+        (e.g. in a fresh pool process). Raises RuntimeError if loading failed.
+        """
+        with self._lock:
+            load_here = self.state == self.PENDING
+            if load_here:
+                self.state = self.LOADING
+        if load_here:
+            self._load()
+        self._done.wait(timeout)
+        if self.state != self.READY:
+            raise RuntimeError(f"PyKakasi is not available ({self.state}): {self.error}")
+        return self.instance
+
+
+# One loader per process; pool worker processes get their own copy
+kakasi_loader = KakasiLoader()
+
+
+def _reset_after_fork():
+    # A child forked mid-warmup has no warmup thread, so let it load on first use instead
+    if kakasi_loader.state == KakasiLoader.LOADING:
+        kakasi_loader.__init__()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
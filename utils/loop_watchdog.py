@@ -0,0 +1,181 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+from utils.metrics import REGISTRY
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STALL_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LOOP_STALLS = REGISTRY.counter("shibako_loop_stalls_total", "Event loop stalls by handler and blocking repo frame.", ("handler", "site"))
+LOOP_STALL_SECONDS = REGISTRY.histogram("shibako_loop_stall_seconds", "How long each detected stall blocked the loop.", buckets=STALL_BUCKETS)
+
+
+def _is_repo_frame(filename):
+    filename = os.path.abspath(filename)
+    return filename.startswith(REPO_ROOT + os.sep) and "site-packages" not in filename and filename != os.path.abspath(__file__)
+
+
+class StallSite:
+    """Aggregated stalls for one (handler, blocking frame) pair."""
+    __slots__ = ("handler", "site", "count", "total", "worst", "stack")
+
+    def __init__(self, handler, site, stack):
+        self.handler = handler
+        self.site = site
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.stack = stack # Formatted stack from the first time we saw it
+
+
+class LoopWatchdog:
+    """
+    Watches an asyncio loop from a separate thread and reports when it stops ticking.
+
+    The loop bumps a timestamp every threshold/4 seconds. When the thread sees
+    no bump for `threshold` seconds it grabs the loop thread's current stack
+    (sys._current_frames), the running task's name (discord.py names event
+    tasks "discord.py: on_message") plus any label set with label_task(), and
+    the deepest frame inside this repo - usually the blocking call. At most
+    `max_logs` stalls are printed in full per `summary_interval`; the rest
+    are only counted and summarized.
+    """
+    def __init__(self, loop, threshold=0.5, summary_interval=60.0, max_logs=3):
+        self.loop = loop
+        self.threshold = threshold
+        self.tick_interval = threshold / 4
+        self.summary_interval = summary_interval
+        self.max_logs = max_logs
+        self.sites = {} # (handler, site) -> StallSite, since start; written by the watchdog thread, guarded by _sites_lock
+        self._sites_lock = threading.Lock()
+        self.stalls = 0
+        self._labels = weakref.WeakKeyDictionary() # task -> label such as "!romaji"
+        self._last_tick = time.perf_counter()
+        self._loop_thread_id = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._handle = None
+        self._window_stalls = 0 # Since the last summary
+        self._window_worst = 0.0
+        self._window_sites = {}
+        self._logged = 0
+
+    # --- Loop side ---
+    def start(self):
+        """Starts the heartbeat and the watchdog thread (call from the loop's thread)."""
+        if self._thread is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.perf_counter()
+        self._handle = self.loop.call_soon(self._tick)
+        self._thread = threading.Thread(target=self._run, name="shibako-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout=self.threshold)
+        self._thread = None
+
+    def _tick(self):
+        self._last_tick = time.perf_counter()
+        self._handle = self.loop.call_later(self.tick_interval, self._tick)
+
+    def label_task(self, label, task=None):
+        """Names what the current task is doing (e.g. the command) so stall reports can say so."""
+        task = task or asyncio.current_task()
+        if task is not None:
+            self._labels[task] = label
+
+    def clear_label(self, task=None):
+        task = task or asyncio.current_task()
+        if task is not None:
+            self._labels.pop(task, None)
+
+    # --- Watchdog thread ---
+    def _run(self):
+        next_summary = time.perf_counter() + self.summary_interval
+        stalled_tick = None # _last_tick value of the stall we already captured
+        pending = None # StallSite of that stall, until we know how long it lasted
+        while not self._stop.wait(self.tick_interval):
+            now = time.perf_counter()
+            last_tick = self._last_tick
+            if stalled_tick is not None and last_tick != stalled_tick:
+                self._finish(pending, last_tick - stalled_tick)
+                stalled_tick = pending = None
+            if stalled_tick is None and now - last_tick > self.threshold:
+                pending = self._capture(now - last_tick)
+                stalled_tick = last_tick if pending is not None else None
+            if now >= next_summary:
+                self._summarize()
+                next_summary = now + self.summary_interval
+
+    def _current_task(self):
+        try:
+            return asyncio.current_task(self.loop)
+        except RuntimeError:
+            return None
+
+    def _capture(self, stalled_for):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame)
+        del frame
+        task = self._current_task()
+        handler = task.get_name() if task is not None else "(no task: callback or loop internals)"
+        label = self._labels.get(task) if task is not None else None
+        if label:
+            handler = f"{handler} [{label}]"
+
+        repo_frames = [entry for entry in stack if _is_repo_frame(entry.filename)]
+        blocking = repo_frames[-1] if repo_frames else stack[-1]
+        site = f"{os.path.relpath(blocking.filename, REPO_ROOT)}:{blocking.lineno} in {blocking.name}"
+
+        key = (handler, site)
+        with self._sites_lock:
+            stall_site = self.sites.get(key)
+            if stall_site is None:
+                stall_site = self.sites[key] = StallSite(handler, site, "".join(traceback.format_list(stack[-12:])))
+        self.stalls += 1
+        self._window_stalls += 1
+        self._window_sites[key] = self._window_sites.get(key, 0) + 1
+        LOOP_STALLS.inc(handler, site)
+
+        if self._logged < self.max_logs:
+            self._logged += 1
+            print(f"Warning: Event loop blocked for {stalled_for:.2f}s+ in {handler} at {site}")
+            print(stall_site.stack.rstrip())
+        return stall_site
+
+    def _finish(self, stall_site, duration):
+        with self._sites_lock:
+            stall_site.count += 1
+            stall_site.total += duration
+            stall_site.worst = max(stall_site.worst, duration)
+        self._window_worst = max(self._window_worst, duration)
+        LOOP_STALL_SECONDS.observe(duration)
+
+    def _summarize(self):
+        if self._window_stalls:
+            top = sorted(self._window_sites.items(), key=lambda item: -item[1])[:3]
+            where = "; ".join(f"{handler} at {site} x{count}" for (handler, site), count in top)
+            print(f"Event loop stalls in the last {self.summary_interval:.0f}s: {self._window_stalls} "
+                  f"(worst {self._window_worst:.2f}s, {self._window_stalls - self._logged} not logged). Top: {where}")
+        self._window_stalls = 0
+        self._window_worst = 0.0
+        self._window_sites = {}
+        self._logged = 0
+
+    def top_sites(self, limit=10):
+        """Stall sites seen since start, worst offenders (by total blocked time) first (called from the loop)."""
+        with self._sites_lock: # The watchdog thread adds sites and updates their totals
+            sites = list(self.sites.values())
+            return sorted(sites, key=lambda site: -site.total)[:limit]
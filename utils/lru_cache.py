@@ -0,0 +1,41 @@
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Bounded in-memory LRU with an optional per-entry TTL (seconds, 0 = no expiry)."""
+    def __init__(self, max_size=1024, ttl=0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict() # key -> (stored_at, value)
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self.ttl and time.monotonic() - stored_at > self.ttl:
+            del self._data[key]
+            self.evictions += 1
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        """Removes key and returns its value (None if absent), like get but without the TTL check."""
+        entry = self._data.pop(key, None)
+        return None if entry is None else entry[1]
+
+    def clear(self):
+        self._data.clear()
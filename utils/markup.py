@@ -0,0 +1,122 @@
+import re
+from typing import NamedTuple, Tuple
+from xml.sax.saxutils import escape, unescape
+
+from utils.readings import ReadingResult, ReadingToken
+
+# Spans that are not language: they are cut out before kakasi/DeepL and put back afterwards.
+# Alternatives are tried in order, so code wins over anything that happens to be inside it.
+_SPAN_PATTERNS = (
+    ("code_block", r"```.*?```"),
+    ("inline_code", r"`[^`\n]+`"),
+    ("custom_emoji", r"<a?:\w{2,32}:\d{15,21}>"),
+    ("mention", r"<@[!&]?\d{15,21}>|<#\d{15,21}>|</[\w -]{1,32}:\d{15,21}>|@everyone|@here"),
+    ("timestamp", r"<t:-?\d{1,13}(?::[tTdDfFR])?>"),
+    # Bare URLs may contain balanced parentheses (wiki/Foo_(bar)) but never end on punctuation or an unmatched ")"
+    ("url", r"<https?://[^\s>]+>|https?://(?:\([^\s<()]*\)|[^\s<()])*(?:\([^\s<()]*\)|[^\s<().,:;!?\"'\]])"),
+)
+_SPAN_RE = re.compile("|".join(f"(?P<{kind}>{pattern})" for kind, pattern in _SPAN_PATTERNS), re.DOTALL)
+
+# Each span becomes one private-use character: neutral to the script classifier, a token of its own in pykakasi
+PLACEHOLDER_BASE = 0xE000
+PLACEHOLDER_LIMIT = 0xF8FF
+_PLACEHOLDER_RE = re.compile(f"[{chr(PLACEHOLDER_BASE)}-{chr(PLACEHOLDER_LIMIT)}]")
+_PLACEHOLDER_SPLIT_RE = re.compile(f"([{chr(PLACEHOLDER_BASE)}-{chr(PLACEHOLDER_LIMIT)}])")
+
+# What DeepL sees instead of a placeholder (with tag_handling=xml it keeps tags where they belong)
+_XML_TAG_RE = re.compile(r'<x i="(\d+)"\s*/>|<x i="(\d+)"\s*></x>')
+_XML_ENTITIES = {'"': "&quot;", "'": "&apos;"}
+_XML_UNESCAPE = {value: key for key, value in _XML_ENTITIES.items()}
+
+
+class Markup(NamedTuple):
+    """A message with its non-linguistic spans swapped for placeholder characters."""
+    original: str
+    text: str # `original` with each span replaced by one placeholder character
+    spans: Tuple[str, ...] # The cut-out spans; spans[i] belongs to chr(PLACEHOLDER_BASE + i)
+    kinds: Tuple[str, ...] # Span kind per span ("url", "mention", ...)
+
+    @property
+    def linguistic(self):
+        """Just the language in the message, placeholders removed."""
+        return strip_placeholders(self.text) if self.spans else self.text
+
+    @property
+    def saved(self):
+        """Characters that no longer go to the converter/translator."""
+        return len(self.original) - len(self.text)
+
+
+def split_markup(text):
+    """Cuts code, custom emoji, mentions, timestamps and URLs out of text (see Markup)."""
+    if _PLACEHOLDER_RE.search(text): # Someone typed private-use characters; leave the message alone
+        return Markup(text, text, (), ())
+    spans = []
+    kinds = []
+
+    def placeholder(match):
+        if len(spans) > PLACEHOLDER_LIMIT - PLACEHOLDER_BASE:
+            return match.group(0)
+        spans.append(match.group(0))
+        kinds.append(match.lastgroup)
+        return chr(PLACEHOLDER_BASE + len(spans) - 1)
+
+    prepared = _SPAN_RE.sub(placeholder, text)
+    return Markup(text, prepared, tuple(spans), tuple(kinds))
+
+
+def has_placeholders(text):
+    return _PLACEHOLDER_RE.search(text) is not None
+
+
+def strip_placeholders(text):
+    return _PLACEHOLDER_RE.sub("", text)
+
+
+def split_placeholders(text):
+    """Splits text into linguistic pieces and single placeholder characters (odd indexes), in order."""
+    return _PLACEHOLDER_SPLIT_RE.split(text)
+
+
+def restore(text, spans):
+    """Puts the original spans back in place of their placeholder characters."""
+    if not spans:
+        return text
+    return _PLACEHOLDER_RE.sub(lambda match: spans[ord(match.group(0)) - PLACEHOLDER_BASE], text)
+
+
+def restore_readings(result, markup):
+    """A ReadingResult for markup.text with the spans back in every token (spans read as themselves)."""
+    if not markup.spans:
+        return result
+    spans = markup.spans
+    tokens = tuple(
+        ReadingToken(restore(token.orig, spans), restore(token.hira, spans), restore(token.hepburn, spans))
+        for token in result.tokens
+    )
+    return ReadingResult(markup.original, tokens)
+
+
+# --- DeepL (tag_handling=xml) ---
+def to_xml(text):
+    """Escapes text for DeepL's XML tag handling and turns placeholders into <x i="n"/> tags."""
+    escaped = escape(text, _XML_ENTITIES)
+    return _PLACEHOLDER_RE.sub(lambda match: f'<x i="{ord(match.group(0)) - PLACEHOLDER_BASE}"/>', escaped)
+
+
+def from_xml(text):
+    """Inverse of to_xml for DeepL's answer: tags back to placeholders, entities unescaped."""
+    pieces = []
+    position = 0
+    for match in _XML_TAG_RE.finditer(text):
+        pieces.append(unescape(text[position:match.start()], _XML_UNESCAPE))
+        pieces.append(chr(PLACEHOLDER_BASE + int(match.group(1) or match.group(2))))
+        position = match.end()
+    pieces.append(unescape(text[position:], _XML_UNESCAPE))
+    return "".join(pieces)
+
+
+def missing_spans(text, spans):
+    """Indexes of spans whose placeholder is not in text (DeepL dropped the tag)."""
+    present = {ord(char) - PLACEHOLDER_BASE for char in _PLACEHOLDER_RE.findall(text)}
+    return [index for index in range(len(spans)) if index not in present]
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import discord
+
+MEMORY_PROFILES = ("default", "low")
+
+
+def build_intents(profile="default"):
+    """
+    Gateway intents for a memory profile.
+
+    "default" is discord.py's defaults plus message content. "low" subscribes
+    only to what Shibako reads: guilds (channels and permissions), guild and
+    DM messages (commands, triggers, edit/delete invalidation) and message
+    content. No members, presences, reactions, typing, voice or invites.
+    """
+    if profile not in MEMORY_PROFILES:
+        raise ValueError(f"Unknown memory profile {profile!r}, expected one of {MEMORY_PROFILES}")
+    if profile == "low":
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.guild_messages = True
+        intents.dm_messages = True
+    else:
+        intents = discord.Intents.default()
+    intents.message_content = True
+    return intents
+
+
+def client_cache_options(profile="default", max_messages=1000):
+    """Extra commands.Bot kwargs for a memory profile."""
+    if profile == "low":
+        return {
+            "max_messages": max_messages, # Still enough for MessageResolver's client-cache lookups
+            "member_cache_flags": discord.MemberCacheFlags.none(), # Authors come with each message; keep none
+            "chunk_guilds_at_startup": False,
+        }
+    return {"max_messages": max_messages}
+
+
+def rss_bytes():
+    """Current resident set size of this process, or None where it can't be read."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # Peak rather than current, the best macOS offers
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def cache_sizes(bot):
+    """Entry counts of discord.py's caches plus every cog's own (cogs opt in with a cache_sizes() method)."""
+    sizes = {
+        "guilds": len(bot.guilds),
+        "channels": sum(len(guild.channels) for guild in bot.guilds),
+        "members": sum(len(guild.members) for guild in bot.guilds),
+        "users": len(bot.users),
+        "messages": len(bot.cached_messages),
+    }
+    for cog in bot.cogs.values():
+        cog_sizes = getattr(cog, "cache_sizes", None)
+        if cog_sizes is not None:
+            sizes.update(cog_sizes())
+    return sizes
+
+
+def memory_report(bot):
+    """One-line summary of RSS, RSS per guild and cache sizes."""
+    rss = rss_bytes()
+    sizes = cache_sizes(bot)
+    parts = [f"rss={'n/a' if rss is None else f'{rss / 2**20:.1f}MiB'}"]
+    if rss is not None and sizes["guilds"]:
+        parts.append(f"per_guild={rss / sizes['guilds'] / 1024:.1f}KiB")
+    parts += [f"{name}={count}" for name, count in sizes.items()]
+    return " ".join(parts)
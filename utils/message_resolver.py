@@ -0,0 +1,68 @@
+import asyncio
+
+import discord
+
+from utils.lru_cache import LRUCache
+
+
+class MessageResolver:
+    """
+    Finds the message a command replied to, using REST only as a last resort.
+
+    Resolution order: the reference's already-resolved message, the client's
+    message cache, our own LRU of recently fetched messages, then
+    channel.fetch_message. Concurrent lookups of the same ID share one fetch.
+    The LRU must be told about edits and deletes (see invalidate()).
+    """
+    SOURCES = ("reference", "client_cache", "lru", "shared_fetch", "rest")
+
+    def __init__(self, bot, max_size=512, ttl=600):
+        self.bot = bot
+        self.fetched = LRUCache(max_size=max_size, ttl=ttl) # message id -> discord.Message
+        self._in_flight = {} # message id -> asyncio.Task fetching it
+        self.counts = dict.fromkeys(self.SOURCES, 0)
+
+    async def resolve(self, channel, reference):
+        """Returns the referenced discord.Message. Raises whatever fetch_message raises if it can't be found."""
+        resolved = reference.resolved
+        if isinstance(resolved, discord.Message):
+            self.counts["reference"] += 1
+            return resolved
+
+        message_id = reference.message_id
+        cached = discord.utils.get(self.bot.cached_messages, id=message_id)
+        if cached is not None:
+            self.counts["client_cache"] += 1
+            return cached
+
+        cached = self.fetched.get(message_id)
+        if cached is not None:
+            self.counts["lru"] += 1
+            return cached
+
+        task = self._in_flight.get(message_id)
+        if task is not None:
+            self.counts["shared_fetch"] += 1
+        else:
+            self.counts["rest"] += 1
+            task = asyncio.create_task(self._fetch(channel, message_id))
+            self._in_flight[message_id] = task
+        # Shield so one cancelled command doesn't cancel the fetch other commands are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch(self, channel, message_id):
+        try:
+            message = await channel.fetch_message(message_id)
+            self.fetched.put(message_id, message)
+            return message
+        finally:
+            self._in_flight.pop(message_id, None)
+
+    def invalidate(self, message_id):
+        """Drops a message from our LRU (call on edit and delete events)."""
+        self.fetched.pop(message_id)
+
+    def stats(self):
+        total = sum(self.counts.values())
+        saved = total - self.counts["rest"]
+        return dict(self.counts, lookups=total, rest_saved=saved, hit_rate=saved / total if total else 0.0)
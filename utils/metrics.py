@@ -0,0 +1,167 @@
+import bisect
+import math
+import time
+
+from aiohttp import web
+
+# Seconds; covers a cached reply (sub-millisecond) up to a slow DeepL call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic count per label combination. inc() is one dict update."""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        values = self.values
+        values[label_values] = values.get(label_values, 0) + amount
+
+    def set(self, value, *label_values):
+        """Mirrors a count kept elsewhere (e.g. a cache's own hit counter) at scrape time."""
+        self.values[label_values] = value
+
+    def samples(self):
+        for label_values, value in self.values.items():
+            yield self.name, self.labels, label_values, (), value
+
+
+class Gauge(Counter):
+    """A value that can go up and down (latency, queue depth, hit rate)."""
+    kind = "gauge"
+
+
+class Histogram:
+    """Bucketed observations per label combination, rendered cumulatively as Prometheus expects."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {} # label values -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for label_values, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                yield self.name + "_bucket", self.labels, label_values, (("le", _format_value(bound)),), cumulative
+            yield self.name + "_sum", self.labels, label_values, (), series[-1]
+            yield self.name + "_count", self.labels, label_values, (), cumulative
+
+
+class MetricsRegistry:
+    """
+    Holds every metric and renders them in the Prometheus text format.
+
+    Hot paths only touch plain dicts; anything that is cheaper to read than to
+    track (cache stats, bot.latency) is pulled by collectors at scrape time.
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = [] # Called with no arguments right before rendering
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, help_text, labels, **kwargs)
+        elif not isinstance(metric, cls) or metric.labels != tuple(labels):
+            raise ValueError(f"Metric {name} already registered as a different {metric.kind}")
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def remove_collector(self, collector):
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    def render(self):
+        for collector in list(self.collectors):
+            try:
+                collector()
+            except Exception as e:
+                print(f"Error (metrics): Collector {collector!r} failed: {e}")
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, label_names, label_values, extra, value in metric.samples():
+                lines.append(f"{name}{_label_text(label_names, label_values, extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# One registry per process; modules register their metrics at import time
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    """Serves a registry at http://host:port/metrics."""
+    def __init__(self, registry=REGISTRY, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def _handle(self, request):
+        started = time.perf_counter()
+        body = self.registry.render()
+        SCRAPE_SECONDS.observe(time.perf_counter() - started)
+        return web.Response(text=body, content_type="text/plain", charset="utf-8", headers={"X-Content-Type-Options": "nosniff"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+SCRAPE_SECONDS = REGISTRY.histogram("shibako_metrics_scrape_seconds", "Time spent rendering /metrics.")
@@ -0,0 +1,160 @@
+import re
+
+import discord
+
+PAGE_LIMIT = 1900 # Stay under Discord's 2000 character limit, leaving room for the page counter
+_CHUNK_RE = re.compile(r" *[^ ]+")
+
+
+def _split_long_line(line, limit):
+    """
+    Splits one over-long line at spaces, hard-cutting only single huge tokens. Spacing inside the
+    line is kept, and continuation pieces get the line's own indentation so indented reports stay aligned.
+    """
+    indent = line[:len(line) - len(line.lstrip(" "))]
+    if len(indent) > limit // 2: # Never let indentation crowd out the text
+        indent = ""
+    pieces = []
+    current = ""
+    for chunk in _CHUNK_RE.findall(line): # Each word with the spaces before it
+        if current and len(current) + len(chunk) > limit:
+            pieces.append(current)
+            current = ""
+            chunk = indent + chunk.lstrip(" ") # The space we broke at goes away
+        if current:
+            current += chunk
+            continue
+        while len(chunk) > limit:
+            pieces.append(chunk[:limit])
+            chunk = indent + chunk[limit:]
+        current = chunk
+    if current:
+        pieces.append(current)
+    return pieces or [""]
+
+
+def paginate(text, header="", footer="", limit=PAGE_LIMIT):
+    """
+    Splits text into pages of at most `limit` characters, each wrapped in header/footer.
+
+    Pages break on line boundaries where possible and on spaces otherwise, so
+    nothing is cut mid-word unless a single token is longer than a page.
+    """
+    room = limit - len(header) - len(footer)
+    if room <= 0:
+        raise ValueError("Header and footer leave no room for page content")
+
+    pages = []
+    current = []
+    current_length = 0
+    for line in text.split("\n"):
+        for piece in (_split_long_line(line, room) if len(line) > room else [line]):
+            added = len(piece) + (1 if current else 0)
+            if current and current_length + added > room:
+                pages.append(header + "\n".join(current) + footer)
+                current = []
+                current_length = 0
+                added = len(piece)
+            current.append(piece)
+            current_length += added
+    if current or not pages:
+        pages.append(header + "\n".join(current) + footer)
+    return pages
+
+
+def with_page_numbers(pages):
+    """Adds a "(page i/n)" line to every page when there is more than one."""
+    if len(pages) <= 1:
+        return list(pages)
+    return [f"{page}\n(page {number}/{len(pages)})" for number, page in enumerate(pages, start=1)]
+
+
+class PaginatorView(discord.ui.View):
+    """Previous/next buttons that flip a message through pre-rendered pages; only `author_id` may use them (anyone if None)."""
+    def __init__(self, pages, start_page=0, timeout=300, author_id=None):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.page = start_page
+        self.author_id = author_id
+        self.message = None # Set by the sender so the buttons can be disabled on timeout
+        self._sync_buttons()
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if self.author_id is None or interaction.user.id == self.author_id:
+            return True
+        await interaction.response.send_message("Only the person who ran the command can turn these pages.", ephemeral=True)
+        return False
+
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= len(self.pages) - 1
+
+    async def _show(self, interaction):
+        self._sync_buttons()
+        await interaction.response.edit_message(content=self.pages[self.page], view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = min(len(self.pages) - 1, self.page + 1)
+        await self._show(interaction)
+
+    async def on_timeout(self):
+        if self.message is None:
+            return
+        try:
+            await self.message.edit(view=None)
+        except discord.HTTPException:
+            pass # Message deleted or no permission; the buttons just stop working
+
+
+def _author_id(messageable):
+    """The command author's id when messageable is a commands.Context, else None."""
+    author = getattr(messageable, "author", None)
+    return author.id if author is not None else None
+
+
+async def send_updatable_pages(messageable, pages, author_id=None, **send_kwargs):
+    """Like send_pages, but returns (message, view) for update_pages; view is None for a single page."""
+    if len(pages) == 1:
+        return await messageable.send(pages[0], **send_kwargs), None
+    view = PaginatorView(pages, author_id=author_id if author_id is not None else _author_id(messageable))
+    view.message = await messageable.send(pages[0], view=view, **send_kwargs)
+    return view.message, view
+
+
+async def update_pages(message, pages, view=None, author_id=None):
+    """
+    Replaces the pages of a message sent by send_updatable_pages, staying on the page the reader is on.
+    Buttons (for author_id) are added if the message now needs more than one page. Returns the (new) view.
+    """
+    if view is None and len(pages) == 1:
+        await message.edit(content=pages[0])
+        return None
+    if view is None:
+        view = PaginatorView(pages, author_id=author_id)
+        view.message = message
+    else:
+        view.pages = pages
+        view.page = min(view.page, len(pages) - 1)
+        view._sync_buttons()
+    await message.edit(content=pages[view.page], view=view)
+    return view
+
+
+async def send_pages(messageable, pages, start_page=0, author_id=None, **send_kwargs):
+    """
+    Sends pages[start_page], with buttons when there is more than one page. Returns the sent message.
+    Only author_id (default: the command author when messageable is a Context) can turn the pages.
+    send_kwargs go to messageable.send (an interaction followup needs ephemeral=True, wait=True).
+    """
+    start_page = max(0, min(start_page, len(pages) - 1))
+    if len(pages) == 1:
+        return await messageable.send(pages[0], **send_kwargs)
+    view = PaginatorView(pages, start_page=start_page, author_id=author_id if author_id is not None else _author_id(messageable))
+    view.message = await messageable.send(pages[start_page], view=view, **send_kwargs)
+    return view.message
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import discord
+
+from utils.paginator import paginate, PAGE_LIMIT
+
+
+class ProgressiveReply:
+    """
+    A reply that is posted straight away and edited as more of it is ready.
+
+    update() may be called as often as results arrive; the messages are
+    edited at most once per `edit_interval` seconds with the newest text.
+    Text that no longer fits in one message continues in follow-up messages,
+    which are sent when the text grows into them. finish() shows the final
+    text at once.
+    """
+    def __init__(self, ctx, edit_interval=1.0, limit=PAGE_LIMIT):
+        self.ctx = ctx
+        self.edit_interval = edit_interval
+        self.limit = limit
+        self.messages = []
+        self._shown = [] # Content currently visible in each message
+        self._latest = None
+        self._applied = None # Last text handed to _apply (shown, or failed to show)
+        self._placeholder = None
+        self._last_edit = 0.0
+        self._flush_task = None
+        self._lock = asyncio.Lock()
+        self.edits = 0
+        self.first_output_at = None # perf_counter() when something other than the placeholder first became visible
+
+    async def start(self, placeholder):
+        """Posts the placeholder reply."""
+        self._placeholder = placeholder
+        self._latest = self._applied = placeholder
+        self.messages.append(await self.ctx.reply(placeholder))
+        self._shown.append(placeholder)
+        self._last_edit = time.monotonic()
+
+    def update(self, text):
+        """Shows text soon; only the newest text is shown if several updates arrive within one interval."""
+        self._latest = text
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def finish(self, text):
+        """Shows the final text now, skipping any throttled edit still waiting."""
+        self._latest = text
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        await self._apply(text)
+
+    async def _flush(self):
+        while self._latest != self._applied:
+            wait = self._last_edit + self.edit_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self._apply(self._latest)
+
+    async def _apply(self, text):
+        async with self._lock:
+            self._applied = text
+            pages = paginate(text, limit=self.limit)
+            for index, page in enumerate(pages):
+                try:
+                    if index >= len(self.messages):
+                        self.messages.append(await self.ctx.send(page))
+                        self._shown.append(page)
+                    elif self._shown[index] != page:
+                        await self.messages[index].edit(content=page)
+                        self._shown[index] = page
+                        self.edits += 1
+                except discord.HTTPException as e:
+                    print(f"Error (ProgressiveReply): could not show part {index + 1}: {e}")
+                    return
+            for message in self.messages[len(pages):]: # The text got shorter (rare); drop messages it no longer needs
+                try:
+                    await message.delete()
+                except discord.HTTPException:
+                    pass
+            del self.messages[len(pages):]
+            del self._shown[len(pages):]
+            self._last_edit = time.monotonic()
+            if self.first_output_at is None and text != self._placeholder:
+                self.first_output_at = time.perf_counter()
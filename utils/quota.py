@@ -0,0 +1,338 @@
+import asyncio
+import datetime
+import re
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional
+
+# Decision modes, from best to worst
+FULL = "full"
+SHORTENED = "shortened"
+CACHE_ONLY = "cache_only"
+
+_SENTENCE_END_RE = re.compile(r"[。！？!?.]")
+
+
+class QuotaExceeded(Exception):
+    """Raised when a translation would need DeepL but the budget only allows cached results."""
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason # Which budget ran out: "account", "daily", "guild" or "user"
+
+
+class QuotaReservation:
+    """Characters check() set aside for one request; record() draws on them, release() returns the rest."""
+    __slots__ = ("guild_id", "user_id", "characters")
+
+    def __init__(self, guild_id, user_id, characters):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.characters = characters
+
+
+class QuotaDecision(NamedTuple):
+    """What a translation request may spend: `mode` plus the character limit for SHORTENED."""
+    mode: str
+    limit: int
+    reason: str
+    reservation: Optional[QuotaReservation] = None # None for CACHE_ONLY
+
+
+def today():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
+
+
+def shorten_text(text, limit):
+    """Cuts text to at most `limit` characters, preferring a sentence end, then a space."""
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    sentence_ends = [match.end() for match in _SENTENCE_END_RE.finditer(head)]
+    if sentence_ends and sentence_ends[-1] >= limit // 2:
+        return head[:sentence_ends[-1]]
+    space = head.rfind(" ")
+    if space >= limit // 2:
+        return head[:space]
+    return head
+
+
+class SQLiteUsageStore:
+    """
+    Billed DeepL characters per UTC day, guild and user.
+
+    All methods are blocking; QuotaAccountant calls them through
+    asyncio.to_thread. path=None keeps the table in memory (lost on restart).
+    """
+    def __init__(self, path=None):
+        self.path = path or ":memory:"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        if path:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS deepl_usage ("
+            " day TEXT NOT NULL,"
+            " guild_id INTEGER NOT NULL," # 0 for DMs
+            " user_id INTEGER NOT NULL,"
+            " characters INTEGER NOT NULL,"
+            " requests INTEGER NOT NULL,"
+            " PRIMARY KEY (day, guild_id, user_id))"
+        )
+        self._conn.commit()
+
+    def add(self, day, guild_id, user_id, characters):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO deepl_usage VALUES (?, ?, ?, ?, 1)"
+                " ON CONFLICT (day, guild_id, user_id) DO UPDATE SET"
+                " characters = characters + excluded.characters, requests = requests + 1",
+                (day, guild_id, user_id, characters),
+            )
+            self._conn.commit()
+
+    def day_totals(self, day):
+        """Returns (total, {guild_id: chars}, {user_id: chars}) for one day."""
+        with self._lock:
+            rows = self._conn.execute("SELECT guild_id, user_id, characters FROM deepl_usage WHERE day = ?", (day,)).fetchall()
+        guilds, users = {}, {}
+        for guild_id, user_id, characters in rows:
+            guilds[guild_id] = guilds.get(guild_id, 0) + characters
+            users[user_id] = users.get(user_id, 0) + characters
+        return sum(guilds.values()), guilds, users
+
+    def total_since(self, day):
+        with self._lock:
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(characters), 0) FROM deepl_usage WHERE day >= ?", (day,)).fetchone()
+        return total
+
+    def top(self, column, since_day, limit=5):
+        """Top consumers by `column` ("guild_id" or "user_id") since a day: [(id, chars, requests)]."""
+        if column not in ("guild_id", "user_id"):
+            raise ValueError(f"Unknown usage column {column!r}")
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT {column}, SUM(characters), SUM(requests) FROM deepl_usage WHERE day >= ?"
+                f" GROUP BY {column} ORDER BY SUM(characters) DESC LIMIT ?",
+                (since_day, limit),
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class QuotaAccountant:
+    """
+    Tracks DeepL character spend and decides how much each translation may use.
+
+    Today's per-guild, per-user and overall totals live in memory, so check()
+    is a few dict lookups; every billed request is also written to the usage
+    store. The account total comes from DeepL's /v2/usage (synced
+    periodically) plus whatever was spent since the last sync.
+
+    check() answers FULL while every budget has room, SHORTENED once the
+    account is below `low_watermark` (translate at most `shorten_to`
+    characters) or a budget has less room than the text needs (translate as
+    much as fits), and CACHE_ONLY when a budget is empty. A limit of 0 means
+    unlimited.
+
+    check() also reserves the characters it allows, so concurrent requests
+    can't all pass against the same totals; record() turns reserved
+    characters into spent ones and release() returns what was not used.
+
+    When several processes share one usage database (cluster workers),
+    refresh() re-reads today's totals from it at most every `shared_refresh`
+    seconds, so every budget counts what all of them spent.
+    """
+    def __init__(self, store, account_limit=500000, daily_limit=0, guild_daily_limit=0, user_daily_limit=0,
+                 low_watermark=0.05, shorten_to=300, min_shortened=40, exhausted_for=3600, shared_refresh=0):
+        self.store = store
+        self.account_limit = account_limit
+        self.daily_limit = daily_limit
+        self.guild_daily_limit = guild_daily_limit
+        self.user_daily_limit = user_daily_limit
+        self.low_watermark = low_watermark
+        self.shorten_to = shorten_to
+        self.min_shortened = min_shortened
+        self.exhausted_for = exhausted_for # Seconds a 456 keeps us cache-only when no usage sync clears it sooner
+        self.shared_refresh = shared_refresh # Seconds between re-reads of a store other processes write to (0 = never)
+        self.refreshed_at = None
+        self._unwritten = [] # (guild_id, user_id, characters) recorded here but not yet in the store
+
+        self.account_used = 0 # From the last /v2/usage sync...
+        self.spent_since_sync = 0 # ...plus what we billed after it
+        self.synced_at = None
+        self.exhausted_until = None # time.time() until which we are cache-only (DeepL answered 456 or /v2/usage says so)
+
+        self.day = today()
+        self.day_total = 0
+        self.guild_today = {}
+        self.user_today = {}
+        self.decisions = {FULL: 0, SHORTENED: 0, CACHE_ONLY: 0}
+
+        # Characters reserved by requests still in flight (not tied to a day: a request may cross midnight)
+        self.reserved_total = 0
+        self.guild_reserved = {}
+        self.user_reserved = {}
+
+    async def load(self):
+        """Restores today's totals (and a month-to-date account estimate) from the store."""
+        await self._read_day_totals()
+        if self.synced_at is None:
+            self.spent_since_sync = await asyncio.to_thread(self.store.total_since, self.day[:8] + "01")
+
+    async def refresh(self):
+        """
+        Re-reads today's totals from a shared store once `shared_refresh` seconds have passed.
+        What other processes spent since the last read is added to the account estimate too.
+        """
+        if not self.shared_refresh or (self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.shared_refresh):
+            return
+        self._roll_day()
+        day, before = self.day, self.day_total
+        try:
+            await self._read_day_totals()
+        except sqlite3.Error as e:
+            print(f"Error (QuotaAccountant) reading usage from {self.store.path}: {e}")
+            return
+        if self.day == day:
+            self.spent_since_sync += max(0, self.day_total - before) # Our own spend was already counted by record()
+
+    async def _read_day_totals(self):
+        """Today's totals from the store plus whatever record() has not finished writing to it yet."""
+        self.refreshed_at = time.monotonic()
+        self.day = today()
+        day_total, guild_today, user_today = await asyncio.to_thread(self.store.day_totals, self.day)
+        for guild_id, user_id, characters in self._unwritten:
+            day_total += characters
+            guild_today[guild_id] = guild_today.get(guild_id, 0) + characters
+            user_today[user_id] = user_today.get(user_id, 0) + characters
+        self.day_total, self.guild_today, self.user_today = day_total, guild_today, user_today
+
+    def _roll_day(self):
+        current = today()
+        if current != self.day:
+            self.day = current
+            self.day_total = 0
+            self.guild_today = {}
+            self.user_today = {}
+
+    @property
+    def exhausted(self):
+        if self.exhausted_until is not None and time.time() >= self.exhausted_until:
+            self.exhausted_until = None # Expired: the next request finds out whether DeepL has quota again
+        return self.exhausted_until is not None
+
+    @property
+    def account_remaining(self):
+        if self.exhausted:
+            return 0
+        return max(0, self.account_limit - self.account_used - self.spent_since_sync - self.reserved_total)
+
+    def remaining(self, guild_id, user_id):
+        """Characters left in each budget: {"account": n, "daily": n, "guild": n, "user": n} (None = unlimited)."""
+        self._roll_day()
+        guild_id = guild_id or 0
+        return {
+            "account": self.account_remaining if self.account_limit else None,
+            "daily": max(0, self.daily_limit - self.day_total - self.reserved_total) if self.daily_limit else None,
+            "guild": (max(0, self.guild_daily_limit - self.guild_today.get(guild_id, 0) - self.guild_reserved.get(guild_id, 0))
+                      if self.guild_daily_limit else None),
+            "user": (max(0, self.user_daily_limit - self.user_today.get(user_id, 0) - self.user_reserved.get(user_id, 0))
+                     if self.user_daily_limit else None),
+        }
+
+    def check(self, guild_id, user_id, characters):
+        """
+        Returns the QuotaDecision for translating `characters` characters for this guild/user and
+        reserves `decision.limit` of them; the caller must release(decision.reservation) when done.
+        """
+        budgets = {name: left for name, left in self.remaining(guild_id, user_id).items() if left is not None}
+        reason, room = min(budgets.items(), key=lambda item: item[1]) if budgets else ("", characters)
+        low = self.account_limit and self.account_remaining < self.account_limit * self.low_watermark
+
+        if room >= characters and not low:
+            decision = QuotaDecision(FULL, characters, "")
+        elif room >= min(characters, self.min_shortened):
+            # A low account saves what is left for many short requests; a budget that is merely too small is used up
+            limit = min(characters, room, self.shorten_to) if low else min(characters, room)
+            decision = QuotaDecision(SHORTENED, limit, "account" if low else reason)
+        else:
+            decision = QuotaDecision(CACHE_ONLY, 0, reason)
+        self.decisions[decision.mode] += 1
+        if decision.mode != CACHE_ONLY:
+            reservation = QuotaReservation(guild_id or 0, user_id, decision.limit)
+            self._reserve(reservation.guild_id, user_id, decision.limit)
+            decision = decision._replace(reservation=reservation)
+        return decision
+
+    def _reserve(self, guild_id, user_id, characters):
+        self.reserved_total += characters
+        self.guild_reserved[guild_id] = self.guild_reserved.get(guild_id, 0) + characters
+        self.user_reserved[user_id] = self.user_reserved.get(user_id, 0) + characters
+        for reserved, key in ((self.guild_reserved, guild_id), (self.user_reserved, user_id)):
+            if not reserved[key]:
+                del reserved[key]
+
+    def release(self, reservation):
+        """Returns the characters of a reservation that were not spent (safe to call more than once)."""
+        if reservation is None or not reservation.characters:
+            return
+        self._reserve(reservation.guild_id, reservation.user_id, -reservation.characters)
+        reservation.characters = 0
+
+    async def record(self, guild_id, user_id, characters, reservation=None):
+        """Books characters DeepL billed for this guild/user, drawing them from `reservation` first."""
+        self._roll_day()
+        guild_id = guild_id or 0
+        if reservation is not None:
+            drawn = min(characters, reservation.characters)
+            reservation.characters -= drawn
+            self._reserve(reservation.guild_id, reservation.user_id, -drawn)
+        self.day_total += characters
+        self.guild_today[guild_id] = self.guild_today.get(guild_id, 0) + characters
+        self.user_today[user_id] = self.user_today.get(user_id, 0) + characters
+        self.spent_since_sync += characters
+        entry = (guild_id, user_id, characters)
+        self._unwritten.append(entry)
+        try:
+            await asyncio.to_thread(self.store.add, self.day, guild_id, user_id, characters)
+        except sqlite3.Error as e:
+            print(f"Error (QuotaAccountant) writing usage to {self.store.path}: {e}")
+        finally:
+            self._unwritten.remove(entry)
+
+    def mark_exhausted(self):
+        """DeepL said the quota is used up (HTTP 456); stop calling it for `exhausted_for` seconds or until a sync says otherwise."""
+        if not self.exhausted:
+            print(f"DeepL quota exhausted (HTTP 456); translations are cache-only for {self.exhausted_for / 60:.0f} min or until the next usage sync.")
+        self.exhausted_until = time.time() + self.exhausted_for
+
+    def apply_usage(self, character_count, character_limit):
+        """Takes DeepL's own numbers from /v2/usage as the truth."""
+        self.account_used = character_count
+        if character_limit:
+            self.account_limit = character_limit
+        self.spent_since_sync = 0
+        self.synced_at = time.time()
+        used_up = bool(character_limit) and character_count >= character_limit
+        self.exhausted_until = time.time() + self.exhausted_for if used_up else None
+
+    async def top_consumers(self, column, days=30, limit=5):
+        since = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        return await asyncio.to_thread(self.store.top, column, since, limit)
+
+    def stats(self):
+        return {
+            "account_limit": self.account_limit,
+            "account_remaining": self.account_remaining,
+            "synced_at": self.synced_at,
+            "exhausted": self.exhausted,
+            "today": self.day_total,
+            "reserved": self.reserved_total,
+            "decisions": dict(self.decisions),
+        }
+
+    def close(self):
+        self.store.close()
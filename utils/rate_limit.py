@@ -0,0 +1,124 @@
+import time
+from collections import OrderedDict
+
+from discord.ext import commands
+
+
+class ResponseBudgetExceeded(commands.CheckFailure):
+    """Raised before a command runs when its channel has used up the command response budget."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second refill up to `capacity`."""
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def try_acquire(self, cost=1, now=None):
+        """Takes `cost` tokens if available and returns True, otherwise returns False and takes nothing."""
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+    def refund(self, cost=1):
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+
+class BucketMap:
+    """One TokenBucket per key (channel or guild id), keeping only the most recently used `max_keys`."""
+    def __init__(self, rate, capacity, max_keys=10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def get(self, key, now=None):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False) # A forgotten key simply starts again with a full bucket
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def try_acquire(self, key, cost=1, now=None):
+        return self.get(key, now).try_acquire(cost, now)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class ReplyLimiter:
+    """
+    Gatekeeper for triggered replies.
+
+    A reply has to pass three checks: it must not repeat the same trigger in
+    the same channel within `coalesce_window` seconds, and both the channel
+    bucket and the guild bucket need enough tokens. Every suppressed reply is
+    counted by reason.
+    """
+    def __init__(self, channel_rate, channel_burst, guild_rate, guild_burst, coalesce_window=0.0, max_keys=10000):
+        self.channels = BucketMap(channel_rate, channel_burst, max_keys)
+        self.guilds = BucketMap(guild_rate, guild_burst, max_keys)
+        self.coalesce_window = coalesce_window
+        self._last_reply = OrderedDict() # (channel id, phrase name) -> time of the last reply
+        self.max_keys = max_keys
+
+        self.allowed = 0
+        self.coalesced = 0
+        self.suppressed_channel = 0
+        self.suppressed_guild = 0
+        self.suppressed_by_phrase = {} # phrase name -> count
+
+    def _suppress(self, phrase_name):
+        self.suppressed_by_phrase[phrase_name] = self.suppressed_by_phrase.get(phrase_name, 0) + 1
+        return False
+
+    def allow(self, channel_id, guild_id, phrase_name, cost=1, now=None):
+        """Returns True if the reply may be sent (and spends its tokens), False if it should be dropped."""
+        now = time.monotonic() if now is None else now
+
+        if self.coalesce_window:
+            key = (channel_id, phrase_name)
+            last = self._last_reply.get(key)
+            if last is not None and now - last < self.coalesce_window:
+                self.coalesced += 1
+                return self._suppress(phrase_name)
+
+        channel_bucket = self.channels.get(channel_id, now)
+        if not channel_bucket.try_acquire(cost, now):
+            self.suppressed_channel += 1
+            return self._suppress(phrase_name)
+        if guild_id is not None and not self.guilds.try_acquire(guild_id, cost, now):
+            channel_bucket.refund(cost) # Nothing was sent, so the channel keeps its tokens
+            self.suppressed_guild += 1
+            return self._suppress(phrase_name)
+
+        if self.coalesce_window:
+            self._last_reply[key] = now
+            self._last_reply.move_to_end(key)
+            if len(self._last_reply) > self.max_keys:
+                self._last_reply.popitem(last=False)
+        self.allowed += 1
+        return True
+
+    def stats(self):
+        return {
+            "allowed": self.allowed,
+            "coalesced": self.coalesced,
+            "suppressed_channel": self.suppressed_channel,
+            "suppressed_guild": self.suppressed_guild,
+            "suppressed_by_phrase": dict(self.suppressed_by_phrase),
+        }
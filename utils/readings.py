@@ -0,0 +1,42 @@
+from typing import NamedTuple, Tuple
+
+
+class ReadingToken(NamedTuple):
+    """One pykakasi token: the original text, its hiragana reading and its Hepburn romaji."""
+    orig: str
+    hira: str
+    hepburn: str
+
+
+class ReadingResult(NamedTuple):
+    """Single-pass conversion result shared by !romaji, !furigana and !full."""
+    text: str
+    tokens: Tuple[ReadingToken, ...]
+
+
+def build_readings(text, kks_result):
+    """Compacts raw pykakasi output into a ReadingResult (missing readings fall back to the original)."""
+    tokens = tuple(
+        ReadingToken(item['orig'], item.get('hira') or item['orig'], item.get('hepburn') or item['orig'])
+        for item in kks_result
+    )
+    return ReadingResult(text, tokens)
+
+
+# --- Renderers ---
+def render_romaji(result):
+    """Hepburn romaji with the tokens separated by spaces."""
+    return " ".join(token.hepburn for token in result.tokens)
+
+
+def render_furigana(result):
+    """Original text with Original「ひらがな」 wherever the reading differs."""
+    return "".join(
+        f"{token.orig}「{token.hira}」" if token.orig != token.hira else token.orig
+        for token in result.tokens
+    )
+
+
+def full_body(text, furigana_text, romaji_text, translation):
+    """The lines of !full output: original, furigana, romaji, a blank line, then the translation."""
+    return f"{text}\n{furigana_text}\n{romaji_text}\n\n{translation}" # Added a newline before translation for clarity
@@ -0,0 +1,92 @@
+import asyncio
+from collections import deque
+
+import discord
+
+
+class ReplyScheduler:
+    """
+    Queues delayed channel sends on the event loop instead of blocking it.
+
+    Each channel gets its own worker task that drains that channel's queue in
+    order, sleeping before each send to keep the "pause" effect. Different
+    channels never wait on each other. Workers exit once their queue is empty,
+    so idle channels cost nothing. A channel holds at most `max_queue` sends;
+    past that the oldest one is dropped (and counted in `dropped`).
+    """
+    def __init__(self, default_delay: float = 1.0, max_queue: int = 20):
+        self.default_delay = default_delay
+        self.max_queue = max_queue
+        self._queues = {}   # channel id -> deque of (channel, content, delay)
+        self._workers = {}  # channel id -> running worker task
+        self._closed = False
+
+        # Simple counters so callers (and benchmarks) can see what happened
+        self.sent = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.dropped = 0
+
+    def schedule(self, channel, content: str, delay: float = None):
+        """Queues `content` to be sent to `channel` after `delay` seconds (in channel order)."""
+        if self._closed:
+            return
+        if delay is None:
+            delay = self.default_delay
+
+        channel_id = channel.id
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = self._queues[channel_id] = deque(maxlen=self.max_queue)
+        if len(queue) == queue.maxlen:
+            self.dropped += 1 # The deque pushes out its oldest entry
+        queue.append((channel, content, delay))
+
+        if channel_id not in self._workers:
+            self._workers[channel_id] = asyncio.create_task(
+                self._drain(channel_id), name=f"shibako-reply-{channel_id}"
+            )
+
+    def pending(self) -> int:
+        """Returns how many sends are still waiting across all channels."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def _drain(self, channel_id):
+        """Worker loop: sends everything queued for one channel, in order."""
+        queue = self._queues[channel_id]
+        try:
+            while queue:
+                entry = queue[0]
+                channel, content, delay = entry
+                if delay > 0:
+                    await asyncio.sleep(delay) # Keep the pause effect without blocking the loop
+                if not queue or queue[0] is not entry:
+                    continue # Dropped as the oldest while we slept
+                queue.popleft()
+                try:
+                    await channel.send(content)
+                    self.sent += 1
+                except discord.errors.Forbidden:
+                    self.failed += 1
+                    print(f"Error (ReplyScheduler): Cannot send triggered response in channel {channel_id}. Missing permissions?")
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Error (ReplyScheduler) sending triggered response: {e}")
+        finally:
+            # Only drop our bookkeeping if nobody replaced it meanwhile
+            if self._workers.get(channel_id) is asyncio.current_task():
+                del self._workers[channel_id]
+                if not queue:
+                    self._queues.pop(channel_id, None)
+
+    async def close(self):
+        """Cancels every pending send and waits for the workers to stop."""
+        self._closed = True
+        workers = list(self._workers.values())
+        self.cancelled += self.pending()
+        for task in workers:
+            task.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
@@ -0,0 +1,184 @@
+import re
+from bisect import bisect_right
+from typing import NamedTuple
+
+# Script classes; NEUTRAL characters (digits, punctuation, spaces, emoji, symbols) are not counted
+NEUTRAL = 0
+LATIN = 1
+KANA = 2
+KANJI = 3
+OTHER = 4 # Letters of any other script (Hangul, Cyrillic, Greek, Thai, ...)
+
+# Languages the bot routes between
+JA = "ja"
+EN = "en"
+UNKNOWN = "unknown"
+
+# Below this confidence DeepL is not told the source language and detects it itself
+AUTO_DETECT_BELOW = 0.25
+
+# (first code point, last code point, script) for every non-neutral range; sorted, non-overlapping
+_RANGES = (
+    (0x0041, 0x005A, LATIN), (0x0061, 0x007A, LATIN),
+    (0x00C0, 0x00D6, LATIN), (0x00D8, 0x00F6, LATIN), (0x00F8, 0x024F, LATIN), # Latin-1 letters, Latin Extended-A/B
+    (0x0370, 0x03FF, OTHER), (0x0400, 0x052F, OTHER), # Greek, Cyrillic
+    (0x0590, 0x05FF, OTHER), (0x0600, 0x06FF, OTHER), # Hebrew, Arabic
+    (0x0900, 0x0DFF, OTHER), (0x0E00, 0x0E7F, OTHER), # Indic scripts, Thai
+    (0x1100, 0x11FF, OTHER), # Hangul Jamo
+    (0x1E00, 0x1EFF, LATIN), # Latin Extended Additional (Vietnamese)
+    (0x3005, 0x3007, KANJI), # 々 〆 〇
+    (0x3041, 0x309F, KANA), (0x30A0, 0x30FF, KANA), # Hiragana, Katakana (ー included)
+    (0x3130, 0x318F, OTHER), # Hangul Compatibility Jamo
+    (0x31F0, 0x31FF, KANA), # Katakana Phonetic Extensions
+    (0x3400, 0x4DBF, KANJI), (0x4E00, 0x9FFF, KANJI), # CJK Extension A, CJK Unified Ideographs
+    (0xAC00, 0xD7AF, OTHER), # Hangul syllables
+    (0xF900, 0xFAFF, KANJI), # CJK Compatibility Ideographs
+    (0xFF21, 0xFF3A, LATIN), (0xFF41, 0xFF5A, LATIN), # Fullwidth Latin
+    (0xFF66, 0xFF9F, KANA), # Halfwidth Katakana
+    (0x20000, 0x3134F, KANJI), # CJK Extensions B-G
+)
+
+# A run containing one of these is a sentence, not an interjection like "OK," or "Hey"
+_TERMINATOR_RE = re.compile(r"[.!?。！？…]")
+
+# Flattened for bisect: _STARTS[i] is where _SCRIPTS[i] begins; gaps between ranges are NEUTRAL
+_STARTS = []
+_SCRIPTS = []
+for _first, _last, _script in _RANGES:
+    _STARTS += [_first, _last + 1]
+    _SCRIPTS += [_script, NEUTRAL]
+_STARTS.insert(0, 0)
+_SCRIPTS.insert(0, NEUTRAL)
+
+# ASCII is most of the traffic, so it skips the bisect
+_ASCII = tuple(_SCRIPTS[bisect_right(_STARTS, code) - 1] for code in range(128))
+
+
+def script_of(char):
+    """The script class of one character."""
+    code = ord(char)
+    if code < 128:
+        return _ASCII[code]
+    return _SCRIPTS[bisect_right(_STARTS, code) - 1]
+
+
+class ScriptProfile(NamedTuple):
+    """Share of each script among the letters of a text, plus the language it most likely is."""
+    kana: float
+    kanji: float
+    latin: float
+    other: float
+    letters: int # Characters that were not NEUTRAL
+    language: str # JA, EN or UNKNOWN
+    confidence: float # 0..1: how dominant the winning script is, discounted for very short texts
+
+    @property
+    def japanese(self):
+        return self.kana + self.kanji
+
+
+def _decide(kana, kanji, latin, other):
+    """Picks the language from raw letter counts; returns (language, confidence, shares)."""
+    letters = kana + kanji + latin + other
+    if not letters:
+        return UNKNOWN, 0.0, (0.0, 0.0, 0.0, 0.0)
+    shares = (kana / letters, kanji / letters, latin / letters, other / letters)
+    # Kana and kanji carry about a word's worth of meaning per few characters, Latin letters much less,
+    # so Japanese wins ties against an embedded English word or two
+    japanese = (kana + kanji) * 3
+    if japanese >= latin and kana + kanji >= other:
+        language, dominant = JA, shares[0] + shares[1]
+    elif latin >= other:
+        language, dominant = EN, shares[2]
+    else:
+        language, dominant = UNKNOWN, shares[3]
+    return language, dominant * letters / (letters + 2), shares
+
+
+def classify(text):
+    """Counts scripts in one pass over text and returns its ScriptProfile."""
+    counts = [0, 0, 0, 0, 0]
+    ascii_table = _ASCII
+    starts = _STARTS
+    scripts = _SCRIPTS
+    for char in text:
+        code = ord(char)
+        if code < 128:
+            counts[ascii_table[code]] += 1
+        else:
+            counts[scripts[bisect_right(starts, code) - 1]] += 1
+    language, confidence, shares = _decide(counts[KANA], counts[KANJI], counts[LATIN], counts[OTHER])
+    return ScriptProfile(*shares, letters=sum(counts) - counts[NEUTRAL], language=language, confidence=confidence)
+
+
+def translation_direction(language, confidence=1.0):
+    """
+    (source_lang, target_lang) for DeepL: Japanese goes to English, everything else is translated into Japanese.
+    source_lang is None (DeepL detects it) for UNKNOWN scripts and for guesses below AUTO_DETECT_BELOW.
+    """
+    target_lang = "EN" if language == JA else "JA"
+    if language == UNKNOWN or confidence < AUTO_DETECT_BELOW:
+        return None, target_lang
+    return ("JA" if language == JA else "EN"), target_lang
+
+
+def _runs(text):
+    """Splits text into [language, start, end, letters] runs of Japanese vs Latin letters; other characters join the run before them."""
+    runs = []
+    for index, char in enumerate(text):
+        code = ord(char)
+        script = _ASCII[code] if code < 128 else _SCRIPTS[bisect_right(_STARTS, code) - 1]
+        if script == LATIN or script == KANA or script == KANJI:
+            language = EN if script == LATIN else JA
+            if runs and runs[-1][0] == language:
+                runs[-1][3] += 1
+            else:
+                runs.append([language, index if runs else 0, index, 1]) # Leading neutral text joins the first run
+        if runs:
+            runs[-1][2] = index + 1
+    return runs
+
+
+def segments(text, min_latin=12, min_japanese=4):
+    """
+    Splits a mixed-language message into [(segment, language)] pieces, in order.
+
+    A Latin run shorter than `min_latin` letters (an English word inside a
+    Japanese sentence) or a Japanese run shorter than `min_japanese`
+    characters is folded into the run before it, so only whole sentences in
+    the other language start a new segment. A short first run is folded into
+    the one after it, unless it ends a sentence of its own.
+    """
+    def long_enough(run):
+        return run[3] >= (min_latin if run[0] == EN else min_japanese)
+
+    merged = []
+    for run in _runs(text):
+        if merged and run[0] == merged[-1][0]:
+            merged[-1][2] = run[2]
+            merged[-1][3] += run[3]
+        elif merged and not long_enough(run):
+            merged[-1][2] = run[2]
+        else:
+            merged.append(run)
+    if len(merged) > 1 and not long_enough(merged[0]) and not _TERMINATOR_RE.search(text[:merged[0][2]]):
+        merged[1][1] = 0 # A short opener ("OK, ...") belongs to what follows
+        del merged[0]
+    return [(text[start:end], language) for language, start, end, _ in merged]
+
+
+def route(text):
+    """
+    Plans the DeepL calls for a message: [(segment, source_lang, target_lang)].
+
+    One entry for ordinary messages; a message that mixes whole English and
+    Japanese sentences gets one entry per segment, each translated the other way.
+    Text without letters (digits, emoji, punctuation) needs no DeepL call and gets no entry.
+    """
+    pieces = segments(text)
+    if len(pieces) <= 1:
+        profile = classify(text)
+        if not profile.letters:
+            return []
+        return [(text, *translation_direction(profile.language, profile.confidence))]
+    return [(piece.strip(), *translation_direction(language)) for piece, language in pieces]
@@ -0,0 +1,38 @@
+import re
+
+# A sentence ends after 。！？!? (plus closing quotes/brackets), after a "." or "…" followed by
+# whitespace, or at a line break. The whitespace after the end stays with the sentence.
+_SENTENCE_END_RE = re.compile(r"(?:[。！？!?]+[」』）)\"'”’]*|[.…]+[\"'”’)]*(?=\s|$)|\n)\s*")
+
+
+def split_sentences(text):
+    """Splits text into sentences; joining the result gives back text exactly."""
+    sentences = []
+    position = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        if match.end() > position:
+            sentences.append(text[position:match.end()])
+            position = match.end()
+    if position < len(text):
+        sentences.append(text[position:])
+    return sentences
+
+
+def segment(text, target_chars=400):
+    """
+    Groups whole sentences into segments of about `target_chars` characters.
+
+    A segment is only closed at a sentence end, so a single sentence longer
+    than target_chars becomes a segment of its own. Joining the result gives
+    back text exactly.
+    """
+    segments = []
+    current = ""
+    for sentence in split_sentences(text):
+        if current and len(current) + len(sentence) > target_chars:
+            segments.append(current)
+            current = ""
+        current += sentence
+    if current:
+        segments.append(current)
+    return segments
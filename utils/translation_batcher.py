@@ -0,0 +1,116 @@
+import asyncio
+
+from utils.deepl_dispatcher import NORMAL
+
+
+class _PendingBatch:
+    """Translations waiting to be sent together for one language pair."""
+    __slots__ = ("items", "chars", "timer")
+
+    def __init__(self):
+        self.items = [] # (text, future)
+        self.chars = 0
+        self.timer = None
+
+
+class TranslationBatcher:
+    """
+    Collects concurrent translation requests into multi-text DeepL calls.
+
+    Requests are grouped by language pair, priority and tag handling. A group is sent when its
+    window expires or when it would exceed the text-count or character cap,
+    whichever comes first. Each caller gets back only its own result (or the
+    exception the batch failed with). Identical texts in one batch are sent
+    once; translate_billed() tells the callers which of them DeepL billed.
+    """
+    def __init__(self, client, window=0.05, max_texts=50, max_chars=30000):
+        self.client = client
+        self.window = window
+        self.max_texts = max_texts
+        self.max_chars = max_chars
+        self._pending = {} # (source_lang, target_lang, priority, tag_handling) -> _PendingBatch
+        self._in_flight = set()
+
+        # Counters for reporting how much batching saved
+        self.requests = 0
+        self.batches = 0
+        self.shared = 0 # Requests answered with another request's translation
+
+    async def translate(self, text, source_lang, target_lang, priority=NORMAL, tag_handling=None):
+        """Queues one text for the next batch of its language pair and waits for its translation."""
+        return (await self.translate_billed(text, source_lang, target_lang, priority, tag_handling))[0]
+
+    async def translate_billed(self, text, source_lang, target_lang, priority=NORMAL, tag_handling=None):
+        """
+        Like translate, but returns (translation, billed). billed is False when an identical text
+        in the same batch was sent instead, so DeepL charged that caller and not this one.
+        """
+        key = (source_lang, target_lang, priority, tag_handling)
+        batch = self._pending.get(key)
+
+        # Send what we have first if this text would push the batch over the character cap
+        if batch is not None and batch.items and batch.chars + len(text) > self.max_chars:
+            self._flush(key)
+            batch = None
+
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch()
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._flush, key)
+
+        future = asyncio.get_running_loop().create_future()
+        batch.items.append((text, future))
+        batch.chars += len(text)
+        self.requests += 1
+
+        if len(batch.items) >= self.max_texts or batch.chars >= self.max_chars:
+            self._flush(key)
+
+        return await future
+
+    def _flush(self, key):
+        """Takes the pending batch for `key` off the queue and starts sending it."""
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.create_task(self._send(key, batch.items))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, key, items):
+        source_lang, target_lang, priority, tag_handling = key
+        # Identical texts in the same window only need translating once
+        unique_texts = list(dict.fromkeys(text for text, _ in items))
+        self.batches += 1
+        try:
+            translations = await self.client.translate_many(unique_texts, source_lang, target_lang, priority=priority, tag_handling=tag_handling)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        results = dict(zip(unique_texts, translations))
+        billed = set() # Texts whose charge went to a caller already (one that is still waiting, so it can record it)
+        for text, future in items:
+            if future.done():
+                continue
+            self.shared += text in billed
+            future.set_result((results[text], text not in billed))
+            billed.add(text)
+
+    async def close(self):
+        """Sends anything still pending and waits for in-flight batches to finish."""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "shared": self.shared,
+            "pending": sum(len(batch.items) for batch in self._pending.values()),
+        }
@@ -0,0 +1,189 @@
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from utils.lru_cache import LRUCache
+
+_WHITESPACE_RE = re.compile(r"\s+")
+AUTO_SOURCE = "auto" # Cache key for translations where DeepL detected the source language
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes text for cache keys: NFKC, collapsed whitespace, trimmed ends."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class SQLiteTranslationStore:
+    """
+    Persistent translation store on local disk.
+
+    All methods are blocking; TranslationCache calls them through
+    asyncio.to_thread so the event loop never waits on disk I/O.
+    """
+    def __init__(self, path, max_rows=50000, ttl=0):
+        self.path = path
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " source_lang TEXT NOT NULL,"
+            " target_lang TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (source_lang, target_lang, text))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self._conn.commit()
+
+    def get(self, text, source_lang, target_lang):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation, created_at FROM translations WHERE source_lang = ? AND target_lang = ? AND text = ?",
+                (source_lang, target_lang, text),
+            ).fetchone()
+            if row is None:
+                return None
+            translation, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._conn.execute(
+                    "DELETE FROM translations WHERE source_lang = ? AND target_lang = ? AND text = ?",
+                    (source_lang, target_lang, text),
+                )
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE translations SET last_used = ? WHERE source_lang = ? AND target_lang = ? AND text = ?",
+                (now, source_lang, target_lang, text),
+            )
+            self._conn.commit()
+            return translation
+
+    def put(self, text, source_lang, target_lang, translation):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                (source_lang, target_lang, text, translation, now, now),
+            )
+            self._conn.commit()
+
+    def prune(self):
+        """Drops expired rows, then the least recently used rows above max_rows. Returns rows removed."""
+        removed = 0
+        with self._lock:
+            if self.ttl:
+                removed += self._conn.execute(
+                    "DELETE FROM translations WHERE created_at < ?", (time.time() - self.ttl,)
+                ).rowcount
+            if self.max_rows:
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+                if count > self.max_rows:
+                    removed += self._conn.execute(
+                        "DELETE FROM translations WHERE rowid IN"
+                        " (SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                        (count - self.max_rows,),
+                    ).rowcount
+            self._conn.commit()
+        return removed
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TranslationCache:
+    """
+    Two-tier cache for DeepL results: an in-memory LRU in front of an optional SQLite store.
+
+    Keys are the normalized text plus the source/target language pair. Disk hits
+    are promoted into memory so repeated phrases stay on the fast path.
+    """
+    def __init__(self, max_size=2048, ttl=6 * 3600, db_path=None, db_max_rows=50000, db_ttl=30 * 86400, prune_every=500):
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.disk = SQLiteTranslationStore(db_path, max_rows=db_max_rows, ttl=db_ttl) if db_path else None
+        self.prune_every = prune_every
+        self._puts_since_prune = 0
+
+        # Counters for hit/miss reporting
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, text, source_lang, target_lang):
+        """Returns the cached translation or None."""
+        translation, tier = await self._lookup(text, source_lang, target_lang)
+        if tier == "memory":
+            self.memory_hits += 1
+        elif tier == "disk":
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+        return translation
+
+    async def peek(self, text, source_lang, target_lang):
+        """Like get, but left out of the hit/miss counters (for looking ahead before translating)."""
+        return (await self._lookup(text, source_lang, target_lang))[0]
+
+    async def _lookup(self, text, source_lang, target_lang):
+        """Returns (translation, "memory" | "disk") or (None, None)."""
+        source_lang = source_lang or AUTO_SOURCE
+        key = (source_lang, target_lang, normalize_text(text))
+        translation = self.memory.get(key)
+        if translation is not None:
+            return translation, "memory"
+
+        if self.disk is not None:
+            try:
+                translation = await asyncio.to_thread(self.disk.get, key[2], source_lang, target_lang)
+            except sqlite3.Error as e:
+                print(f"Error (TranslationCache) reading from {self.disk.path}: {e}")
+                translation = None
+            if translation is not None:
+                self.memory.put(key, translation) # Promoted, so the get() that follows a peek() is a memory hit
+                return translation, "disk"
+        return None, None
+
+    async def put(self, text, source_lang, target_lang, translation):
+        """Stores a translation in both tiers."""
+        source_lang = source_lang or AUTO_SOURCE
+        key = (source_lang, target_lang, normalize_text(text))
+        self.memory.put(key, translation)
+        if self.disk is None:
+            return
+        try:
+            await asyncio.to_thread(self.disk.put, key[2], source_lang, target_lang, translation)
+            self._puts_since_prune += 1
+            if self.prune_every and self._puts_since_prune >= self.prune_every:
+                self._puts_since_prune = 0
+                await asyncio.to_thread(self.disk.prune)
+        except sqlite3.Error as e:
+            print(f"Error (TranslationCache) writing to {self.disk.path}: {e}")
+
+    def stats(self):
+        """Returns hit/miss counters and tier sizes."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
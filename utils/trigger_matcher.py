@@ -0,0 +1,142 @@
+import re
+import unicodedata
+from collections import deque
+
+MATCH_MODES = ("exact", "prefix", "contains")
+_MODE_RANK = {"exact": 0, "prefix": 1, "contains": 2} # Lower wins when several triggers match
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """
+    Normalizes a message or trigger for matching.
+
+    NFKC folds full-width/half-width forms, then the text is casefolded,
+    whitespace runs become one space and trailing punctuation is dropped, so
+    "Hi  Shibako!!" and "ｈｉ shibako" both become "hi shibako".
+    """
+    text = _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text).casefold()).strip()
+    end = len(text)
+    while end and unicodedata.category(text[end - 1]).startswith("P"):
+        end -= 1
+    return text[:end].rstrip()
+
+
+def _is_word_char(char):
+    # Only Latin letters/digits need word boundaries; Japanese has no spaces between words
+    return char.isascii() and char.isalnum()
+
+
+class TriggerMatcher:
+    """
+    Compiled trigger index for ListenerCog.
+
+    Exact triggers are a dict lookup on the normalized message. Prefix and
+    contains triggers live in one Aho-Corasick automaton, so a message is
+    scanned once no matter how many triggers exist. Prefix/contains matches
+    must sit on word boundaries for Latin text ("sit" doesn't fire on
+    "position").
+    """
+    def __init__(self):
+        self._exact = {}
+        self._goto = [{}]    # node -> {char: next node}
+        self._fail = [0]     # node -> failure link
+        self._out = [[]]     # node -> patterns ending here: (length, mode, config)
+        self._out_link = [0] # node -> nearest failure ancestor that has outputs (0 = none)
+        self._compiled = True
+        self.trigger_count = 0
+
+    @classmethod
+    def from_phrases(cls, phrases):
+        """Builds a matcher from the "phrases" list of shibako_phrases.json plus a ready config per phrase."""
+        matcher = cls()
+        for phrase_config, config_details in phrases:
+            mode = phrase_config.get("match", "exact")
+            for trigger in phrase_config.get("triggers", []):
+                matcher.add(trigger, config_details, mode)
+        matcher.compile()
+        return matcher
+
+    def add(self, trigger, config, mode="exact"):
+        """Adds one trigger. Call compile() after the last add()."""
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode {mode!r} for trigger {trigger!r}")
+        normalized = normalize_message(trigger)
+        if not normalized:
+            return
+        self.trigger_count += 1
+        if mode == "exact":
+            self._exact[normalized] = config # Last definition wins, like the trigger map
+            return
+
+        node = 0
+        for char in normalized:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._out_link.append(0)
+            node = next_node
+        self._out[node].append((len(normalized), mode, config))
+        self._compiled = False
+
+    def compile(self):
+        """Computes failure and output links (breadth-first)."""
+        queue = deque(self._goto[0].values())
+        for child in queue:
+            self._fail[child] = 0
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out_link[child] = target if self._out[target] else self._out_link[target]
+                queue.append(child)
+        self._compiled = True
+
+    def match(self, message):
+        """Returns the config of the best matching trigger, or None. Runs in O(len(message))."""
+        text = normalize_message(message)
+        if not text:
+            return None
+
+        exact = self._exact.get(text)
+        if exact is not None:
+            return exact
+        if len(self._goto) == 1: # No prefix/contains triggers
+            return None
+        if not self._compiled:
+            self.compile()
+
+        goto, fail, out, out_link = self._goto, self._fail, self._out, self._out_link
+        best = None # (rank, -length, start, config)
+        node = 0
+        length = len(text)
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            hit = node if out[node] else out_link[node]
+            while hit:
+                for pattern_length, mode, config in out[hit]:
+                    start = index - pattern_length + 1
+                    if mode == "prefix" and start != 0:
+                        continue
+                    # Word boundaries on both sides for Latin text
+                    if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+                        continue
+                    if index + 1 < length and _is_word_char(text[index + 1]) and _is_word_char(char):
+                        continue
+                    candidate = (_MODE_RANK[mode], -pattern_length, start)
+                    if best is None or candidate < best[:3]:
+                        best = candidate + (config,)
+                hit = out_link[hit]
+
+        return best[3] if best else None